@@ -0,0 +1,6 @@
+"""
+Benchmarks for the 1_langchain demos.
+
+Run from the `1_langchain` folder so the demo modules and ./docs resolve, e.g.:
+    python -m benchmarks.bench_pdf_extraction --max-workers 4
+"""
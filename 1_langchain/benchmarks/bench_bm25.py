@@ -0,0 +1,62 @@
+"""
+BM25 query latency on a synthetic corpus (default 100k chunks of ~120 words).
+
+    python -m benchmarks.bench_bm25 --chunks 100000 --queries 500
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.util import latency_summary
+from hybrid_retrieval import BM25Index
+
+IDENTIFIERS = ["NullPointerException", "Array.prototype.map", "ERR_CONN_RESET", "HashMap.computeIfAbsent",
+               "Promise.allSettled", "ClassCastException", "ECONNREFUSED", "Object.freeze"]
+
+
+def corpus(n: int, words: int, vocab: int, rng: random.Random):
+    lexicon = [f"w{i}" for i in range(vocab)]
+    for i in range(n):
+        toks = rng.choices(lexicon, k=words)
+        if i % 50 == 0:
+            toks.append(rng.choice(IDENTIFIERS))
+        yield f"c{i}", " ".join(toks), {"source": "synthetic.pdf", "page": i // 10, "chunk_idx": i % 10}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=100_000)
+    ap.add_argument("--words", type=int, default=120)
+    ap.add_argument("--vocab", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+    rng = random.Random(0)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bm25_"), "bm25.jsonl")
+    index = BM25Index(path)
+    ids, texts, metas = zip(*corpus(args.chunks, args.words, args.vocab, rng))
+    index.add(ids, texts, metas)
+    index.save()
+    t0 = time.perf_counter()
+    index.build()  # builds and persists the postings
+    print(f"build: {args.chunks} chunks in {time.perf_counter() - t0:.1f}s")
+    t0 = time.perf_counter()
+    index = BM25Index(path)
+    index.search("warmup", k=1)
+    print(f"restart (load JSONL + mmap postings): {time.perf_counter() - t0:.1f}s")
+
+    lat = []
+    for _ in range(args.queries):
+        q = " ".join(rng.choices([f"w{i}" for i in range(200)], k=5) + [rng.choice(IDENTIFIERS)])
+        t0 = time.perf_counter()
+        index.search(q, k=20)
+        lat.append(time.perf_counter() - t0)
+    s = latency_summary(lat)
+    print(f"query: p50 {s['p50_ms']:.2f} ms  p95 {s['p95_ms']:.2f} ms  p99 {s['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
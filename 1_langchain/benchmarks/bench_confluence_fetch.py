@@ -0,0 +1,88 @@
+"""
+Confluence page download throughput against a local mock server (pages/sec).
+
+    python -m benchmarks.bench_confluence_fetch --pages 1000 --latency-ms 40 --server-rate 60
+
+`sequential` is the old `fetch_all_pages` loop: a fresh client, one batch at a time,
+`time.sleep(0.2)` between batches. The other rows use one pooled `ConfluenceFetcher`
+at increasing concurrency; `throttled` counts 429s the server sent back and `rate` the
+fetcher's adapted request rate at the end. The last two rows sync a cold and a warm
+`ConfluenceMirror`.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import requests
+
+from benchmarks.fakes import synthetic_pages
+from benchmarks.mock_confluence import MockConfluenceServer
+from confluence_fetcher import ConfluenceFetcher
+from confluence_mirror import ConfluenceMirror
+
+PARAMS = {"type": "page", "expand": "body.storage,space"}
+
+
+def sequential(url: str, max_pages: int, batch_size: int = 50) -> int:
+    pages, start = [], 0
+    with requests.Session() as session:
+        while len(pages) < max_pages:
+            res = session.get(f"{url}/rest/api/content", params={**PARAMS, "limit": batch_size, "start": start})
+            res.raise_for_status()
+            results = res.json().get("results", [])
+            if not results:
+                break
+            pages.extend(results)
+            start += len(results)
+            time.sleep(0.2)
+    return len(pages[:max_pages])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=1000)
+    ap.add_argument("--latency-ms", type=float, default=40.0, help="server time per request")
+    ap.add_argument("--max-limit", type=int, default=25, help="server clamps `limit` to this")
+    ap.add_argument("--server-rate", type=float, default=60.0, help="requests/second before 429 (0 = none)")
+    ap.add_argument("--rate", type=float, default=50.0, help="client request rate limit (0 = none)")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = ap.parse_args()
+
+    pages, _ = synthetic_pages(args.pages, words=200)
+    server = MockConfluenceServer(pages, latency=args.latency_ms / 1000, max_limit=args.max_limit,
+                                  server_rate=args.server_rate or None)
+    with server:
+        print(f"{args.pages} pages, {args.latency_ms:.0f}ms/request, limit<={args.max_limit}, "
+              f"server rate {args.server_rate or 'unlimited'}/s")
+        print(f"{'mode':>14} {'seconds':>8} {'pages/s':>9} {'requests':>9} {'throttled':>9} {'rate':>6}")
+
+        r0 = server.requests
+        t0 = time.perf_counter()
+        n = sequential(server.url, args.pages)
+        dt = time.perf_counter() - t0
+        print(f"{'sequential':>14} {dt:>8.2f} {n / dt:>9.1f} {server.requests - r0:>9} {'-':>9} {'-':>6}")
+
+        for c in args.concurrency:
+            conf = ConfluenceFetcher(server.url, concurrency=c, rate=args.rate, backoff=0.1)
+            t0 = time.perf_counter()
+            n = len(conf.fetch_all("rest/api/content", PARAMS))
+            dt = time.perf_counter() - t0
+            s = conf.stats()
+            print(f"{f'pooled x{c}':>14} {dt:>8.2f} {n / dt:>9.1f} {s['requests']:>9} {s['throttled']:>9} "
+                  f"{s['rate']:>6.1f}")
+            conf.close()
+
+        conf = ConfluenceFetcher(server.url, concurrency=max(args.concurrency), rate=args.rate, backoff=0.1)
+        mirror = ConfluenceMirror(os.path.join(tempfile.mkdtemp(prefix="confluence_mirror_"), "mirror.sqlite"))
+        for label in ("mirror cold", "mirror warm"):
+            r0 = conf.requests
+            s = mirror.sync(conf, to_text=lambda html: html)
+            print(f"{label:>14} {s.seconds:>8.2f} {s.listed / s.seconds:>9.1f} {conf.requests - r0:>9} "
+                  f"{conf.throttled:>9} {conf.limiter.rate:>6.1f}")
+        conf.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Load test for confluence_service against a mock Confluence (HTTP) and fake LLM/embedder.
+
+    python -m benchmarks.bench_confluence_service --clients 32 --requests 400
+
+Each row runs `--requests` questions from `--clients` client threads against a service
+allowing `concurrency` questions in flight. Questions repeat (`--distinct`), so the CQL
+cache serves most CQL round trips; the `no cache` row turns it off at the highest
+concurrency. Topic words are answered from CQL, sentences from the local page index.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from http.client import HTTPConnection
+from typing import Dict, List
+from urllib.parse import urlparse
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_pages
+from benchmarks.mock_confluence import MockConfluenceServer
+from benchmarks.util import latency_summary
+
+
+def load(url: str, questions: List[str], clients: int) -> Dict[str, float]:
+    host = urlparse(url).netloc
+    todo = list(questions)
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = [0]
+
+    def client():
+        conn = HTTPConnection(host, timeout=120)  # keep-alive per client
+        while True:
+            with lock:
+                if not todo:
+                    break
+                q = todo.pop()
+            t0 = time.perf_counter()
+            conn.request("POST", "/ask", body=json.dumps({"question": q}), headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+                errors[0] += resp.status != 200
+        conn.close()
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    return {"qps": len(latencies) / wall, "errors": errors[0], **latency_summary(latencies)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=300)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--distinct", type=int, default=60, help="distinct questions in the mix")
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--confluence-ms", type=float, default=80.0, help="mock Confluence latency per request")
+    ap.add_argument("--embed-ms", type=float, default=30.0, help="fake embedding latency per request")
+    ap.add_argument("--llm-ms", type=float, default=300.0, help="fake LLM latency per call")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_confluence_service_"))  # mirror, index and caches start empty
+    import confluence_service
+    import rag_confluence_example as rag
+    from confluence_fetcher import ConfluenceFetcher
+
+    rng = random.Random(args.seed)
+    pages, topics = synthetic_pages(args.pages, seed=args.seed)
+    distinct = [rng.choice(topics) if rng.random() < 0.5 else f"how do we roll out {rng.choice(topics)} safely"
+                for _ in range(args.distinct)]
+
+    server = MockConfluenceServer(pages, latency=args.confluence_ms / 1000)
+    with server:
+        fetcher = ConfluenceFetcher(server.url, concurrency=16, rate=0)
+        emb = FakeEmbeddings(request_latency=args.embed_ms / 1000)
+        chat = FakeChatModel(latency=args.llm_ms / 1000)
+        rag.confluence_client = lambda: fetcher
+        rag.embeddings = lambda: emb
+        rag.ChatOpenAI = lambda **kwargs: chat
+        t0 = time.perf_counter()
+        rag.ready_index(fetcher)
+        print(f"{args.pages} pages mirrored and indexed in {time.perf_counter() - t0:.2f}s; "
+              f"Confluence {args.confluence_ms:.0f}ms, embed {args.embed_ms:.0f}ms, LLM {args.llm_ms:.0f}ms")
+        print(f"{'mode':>12} {'q/s':>7} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'conf_req/q':>10} "
+              f"{'cql_hit':>7} {'errors':>6}")
+
+        runs = [(f"x{c}", c, True) for c in args.concurrency] + [("no cache", max(args.concurrency), False)]
+        for label, concurrency, cached in runs:
+            rag.cql_cache.clear()
+            rag.cql_cache.ttl_seconds = rag.CQL_CACHE_TTL if cached else 0
+            before = dict(rag.cql_cache.stats())
+            r0 = server.requests
+            questions = [rng.choice(distinct) for _ in range(args.requests)]
+            with confluence_service.ConfluenceQAService(port=0, concurrency=concurrency) as service, \
+                    redirect_stdout(io.StringIO()):
+                res = load(service.url, questions, args.clients)
+            s = rag.cql_cache.stats()
+            hits = s["exact_hits"] - before["exact_hits"]
+            print(f"{label:>12} {res['qps']:>7.1f} {res['p50_ms']:>8.0f} {res['p95_ms']:>8.0f} {res['p99_ms']:>8.0f} "
+                  f"{(server.requests - r0) / len(questions):>10.2f} {hits / len(questions):>7.0%} {res['errors']:>6}")
+        fetcher.close()
+
+
+if __name__ == "__main__":
+    main()
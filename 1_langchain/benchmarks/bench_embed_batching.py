@@ -0,0 +1,63 @@
+"""
+Load test: one embed_query request per question vs. asyncio micro-batching.
+
+`--sessions` concurrent sessions each ask `--questions` questions back to back
+against a local fake embedder that charges a fixed per-request latency plus a
+small per-text cost (roughly the shape of a hosted embeddings API).
+
+    python -m benchmarks.bench_embed_batching --sessions 64 --questions 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.util import latency_summary
+from embed_batcher import EmbeddingMicroBatcher
+
+
+async def run(mode: str, sessions: int, questions: int, emb: FakeEmbeddings, window_ms: float, max_batch: int):
+    batcher = EmbeddingMicroBatcher(emb, max_batch=max_batch, max_wait_ms=window_ms)
+    latencies = []
+
+    async def embed(q: str):
+        if mode == "batched":
+            return await batcher.embed_query(q)
+        return await asyncio.to_thread(emb.embed_query, q)
+
+    async def session(sid: int):
+        for i in range(questions):
+            t0 = time.perf_counter()
+            await embed(f"session {sid} question {i} about the refund policy")
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session(s) for s in range(sessions)))
+    wall = time.perf_counter() - t0
+    return wall, latencies
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=64)
+    ap.add_argument("--questions", type=int, default=20)
+    ap.add_argument("--request-ms", type=float, default=40.0, help="fake per-request latency")
+    ap.add_argument("--per-text-ms", type=float, default=0.2, help="fake per-text latency")
+    ap.add_argument("--window-ms", type=float, default=5.0)
+    ap.add_argument("--max-batch", type=int, default=64)
+    args = ap.parse_args()
+
+    total = args.sessions * args.questions
+    print(f"{args.sessions} sessions x {args.questions} questions, fake embedder "
+          f"{args.request_ms:.0f} ms/request + {args.per_text_ms} ms/text")
+    print(f"{'mode':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'backend calls':>14}")
+    for mode in ("unbatched", "batched"):
+        emb = FakeEmbeddings(request_latency=args.request_ms / 1000, per_text_latency=args.per_text_ms / 1000)
+        wall, lat = asyncio.run(run(mode, args.sessions, args.questions, emb, args.window_ms, args.max_batch))
+        s = latency_summary(lat)
+        print(f"{mode:>9} {total / wall:>8.1f} {s['p50_ms']:>8.1f} {s['p99_ms']:>8.1f} {emb.calls:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup benchmark: how long does `import rag_pinecone_pdf_demo` take?
+
+Each run imports the module in a fresh interpreter with the service keys pointed
+at nothing, so any network call or eager client construction at import time shows
+up as a failure or a blown budget. Exits non-zero when the best run is over budget.
+
+    python -m benchmarks.bench_import_time --budget-ms 1500 --runs 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+def time_import(module: str, env: dict) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], env=env, check=True)
+    return time.perf_counter() - t0
+
+
+def slowest_imports(module: str, env: dict, top: int):
+    """Top cumulative entries from `python -X importtime`."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cum_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--module", default="rag_pinecone_pdf_demo")
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    # unreachable endpoints: an import that talks to a service fails loudly here
+    env.update({
+        "OPENAI_API_KEY": "", "PINECONE_API_KEY": "",
+        "HTTP_PROXY": "http://127.0.0.1:9", "HTTPS_PROXY": "http://127.0.0.1:9",
+    })
+
+    baseline = min(time_import("sys", env) for _ in range(args.runs))
+    runs = [time_import(args.module, env) for _ in range(args.runs)]
+    best_ms = max(0.0, (min(runs) - baseline) * 1000)
+
+    print(f"interpreter start: {baseline * 1000:.0f} ms")
+    print(f"import {args.module}: best {best_ms:.0f} ms, "
+          f"median {(sorted(runs)[len(runs) // 2] - baseline) * 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports (cumulative):")
+    for cum_us, name in slowest_imports(args.module, env, args.top):
+        print(f"  {cum_us / 1000:8.1f} ms  {name}")
+
+    if best_ms > args.budget_ms:
+        raise SystemExit(f"FAIL: import took {best_ms:.0f} ms > budget {args.budget_ms:.0f} ms")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
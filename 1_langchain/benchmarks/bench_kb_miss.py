@@ -0,0 +1,104 @@
+"""
+Cost of a cache miss in react_pattern_with_knowledgebase, per KB_MISS_MODE.
+
+    python -m benchmarks.bench_kb_miss --misses 50 --llm-ms 400
+
+Every question is new, so each one takes the miss path:
+
+    direct   precheck lookup, one LLM call, upsert written behind the answer
+    agent    precheck lookup, then the ReAct agent (kb_lookup -> llm_answer -> kb_upsert),
+             played by FakeReActChatModel, which follows the guidance step by step
+
+Reported per miss: latency until the answer is returned, LLM calls, prompt and
+completion tokens (token_count) and embedding calls. `store_ms` is how long the
+direct mode's queued writes took to land after the last answer.
+"""
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Any, Dict
+
+from benchmarks.fakes import FakeEmbeddings, FakeReActChatModel
+from benchmarks.util import latency_summary
+
+
+LEXICON = [f"w{i}" for i in range(20000)]
+
+
+def run(kbmod, mode: str, args) -> Dict[str, Any]:
+    from langchain.agents import AgentType, initialize_agent
+    from langchain_chroma import Chroma
+
+    from kb_store import KBStore
+
+    emb = FakeEmbeddings(request_latency=args.embed_ms / 1000)
+    chat = FakeReActChatModel(latency=args.llm_ms / 1000)
+    kbmod.emb = emb
+    kbmod.kb = Chroma(collection_name=f"bench_kb_miss_{mode}_{os.getpid()}", embedding_function=emb)
+    kbmod.store = KBStore(f"kb_miss_{mode}.sqlite", vectorstore=kbmod.kb)
+    kbmod.llm = chat
+    kbmod.agent = initialize_agent(
+        tools=[kbmod.kb_get_by_id, kbmod.kb_get_by_ids, kbmod.kb_lookup, kbmod.llm_answer, kbmod.kb_upsert],
+        llm=chat,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=False,
+        handle_parsing_errors=True,
+    )
+
+    rng = random.Random(args.seed)  # unrelated word salads, so every question really misses
+    questions = [" ".join(rng.choices(LEXICON, k=8)) + "?" for _ in range(args.misses)]
+    lat, routes = [], set()
+    e0 = emb.calls
+    with redirect_stdout(io.StringIO()):
+        for q in questions:
+            t0 = time.perf_counter()
+            _, route = kbmod.answer(q, miss_mode=mode)
+            lat.append(time.perf_counter() - t0)
+            routes.add(route)
+        t0 = time.perf_counter()
+        kbmod.flush_writes()
+        store_ms = (time.perf_counter() - t0) * 1000
+    cached = sum(kbmod.store.get_exact(kbmod.norm(q)) is not None for q in questions)
+    n = len(questions)
+    return {
+        **latency_summary(lat),
+        "llm_calls": chat.calls / n,
+        "prompt_tokens": chat.prompt_tokens / n,
+        "completion_tokens": chat.completion_tokens / n,
+        "embed_calls": (emb.calls - e0) / n,
+        "store_ms": store_ms,
+        "cached": cached / n,
+        "routes": ",".join(sorted(routes)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--misses", type=int, default=50)
+    ap.add_argument("--modes", nargs="+", default=["direct", "agent"])
+    ap.add_argument("--embed-ms", type=float, default=30.0, help="fake embedding latency per request")
+    ap.add_argument("--llm-ms", type=float, default=400.0, help="fake LLM latency per call")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_kb_miss_"))  # store, Chroma dir and embedding cache start empty
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    with redirect_stdout(io.StringIO()):
+        import react_pattern_with_knowledgebase as kbmod
+
+    print(f"{args.misses} misses per mode; embed {args.embed_ms:.0f}ms, LLM {args.llm_ms:.0f}ms per call")
+    print(f"{'mode':>7} {'p50_ms':>7} {'p95_ms':>7} {'llm/miss':>8} {'prompt_tok':>10} {'compl_tok':>9} "
+          f"{'embed/miss':>10} {'store_ms':>8} {'cached':>6}")
+    for mode in args.modes:
+        r = run(kbmod, mode, args)
+        print(f"{mode:>7} {r['p50_ms']:>7.0f} {r['p95_ms']:>7.0f} {r['llm_calls']:>8.1f} {r['prompt_tokens']:>10.0f} "
+              f"{r['completion_tokens']:>9.0f} {r['embed_calls']:>10.2f} {r['store_ms']:>8.0f} {r['cached']:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
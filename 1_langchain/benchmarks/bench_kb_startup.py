@@ -0,0 +1,108 @@
+"""
+Startup cost of the durable KB store (kb_store.py) at realistic sizes.
+
+    python -m benchmarks.bench_kb_startup --entries 1000000
+
+Writes `--entries` synthetic question/answer records into a fresh SQLite store, then
+opens it in a fresh interpreter per mode and reports load time, resident memory added
+by the load and p50 lookup latency (exact question, one id, a batch of 100 ids):
+
+    keys     KBStore: hash -> id and id maps in memory, answers read by primary key
+    full     every question and answer held in dicts (what the old in-process maps
+             would need to serve the same entries)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PKG_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, random, sys, time
+from benchmarks.util import latency_summary, peak_rss_mb
+from kb_store import KBStore, q_hash
+
+path, mode, n = sys.argv[1], sys.argv[2], int(sys.argv[3])
+before = peak_rss_mb()
+t0 = time.perf_counter()
+if mode == "keys":
+    store = KBStore(path)
+    exact = lambda q: store.get_exact(q).answer
+    by_id = lambda i: store.get(i).answer
+    batch = store.get_many
+else:
+    import sqlite3
+    q2a, id2a = {}, {}
+    for rid, q, a in sqlite3.connect(path).execute("SELECT id, q_norm, answer FROM kb_records"):
+        q2a[q] = a
+        id2a[rid] = a
+    exact, by_id = q2a.__getitem__, id2a.__getitem__
+    batch = lambda ids: {i: id2a[i] for i in ids}
+load_s = time.perf_counter() - t0
+rss = peak_rss_mb() - before
+
+rng = random.Random(0)
+lat = {"exact": [], "id": [], "batch": []}
+for _ in range(2000):
+    i = rng.randrange(n)
+    t = time.perf_counter(); exact(f"what is the policy for topic{i} in region w{i % 37}"); lat["exact"].append(time.perf_counter() - t)
+    t = time.perf_counter(); by_id(str(10000 + i)); lat["id"].append(time.perf_counter() - t)
+    ids = [str(10000 + rng.randrange(n)) for _ in range(100)]
+    t = time.perf_counter(); batch(ids); lat["batch"].append(time.perf_counter() - t)
+print(json.dumps({"load_s": load_s, "rss_mb": rss,
+                  **{f"{k}_p50_us": latency_summary(v)["p50_ms"] * 1000 for k, v in lat.items()}}))
+"""
+
+
+def build(path: str, n: int) -> float:
+    sys.path.insert(0, str(PKG_ROOT))
+    from kb_store import KBStore, q_hash
+
+    KBStore(path)  # creates the schema
+    conn = sqlite3.connect(path)
+    now = time.time()
+    t0 = time.perf_counter()
+
+    def rows():
+        for i in range(n):
+            q = f"what is the policy for topic{i} in region w{i % 37}"
+            a = f"answer {i}: " + "the policy is documented in the handbook, section " * 4
+            yield str(10000 + i), q_hash(q), q, q, a, now
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO kb_records (id, q_hash, q_norm, question, answer, created, indexed) VALUES (?, ?, ?, ?, ?, ?, 1)",
+            rows(),
+        )
+    conn.close()
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=1_000_000)
+    ap.add_argument("--modes", nargs="+", default=["keys", "full"])
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_kb_startup_"), "kb_store.sqlite")
+    build_s = build(path, args.entries)
+    print(f"{args.entries} records written in {build_s:.1f}s ({os.path.getsize(path) / 1e6:.0f} MB on disk)")
+    print(f"{'mode':>6} {'load_s':>7} {'rss_mb':>7} {'B/entry':>8} {'exact_us':>9} {'id_us':>7} {'100_ids_us':>10}")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PKG_ROOT), os.getenv("PYTHONPATH")])))
+    for mode in args.modes:
+        out = subprocess.run([sys.executable, "-c", CHILD, path, mode, str(args.entries)],
+                             env=env, check=True, capture_output=True, text=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:>6} {r['load_s']:>7.2f} {r['rss_mb']:>7.0f} {r['rss_mb'] * 2**20 / args.entries:>8.0f} "
+              f"{r['exact_p50_us']:>9.1f} {r['id_p50_us']:>7.1f} {r['batch_p50_us']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
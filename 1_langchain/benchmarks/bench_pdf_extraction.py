@@ -0,0 +1,67 @@
+"""
+PDF extraction + chunking throughput for 1..N worker processes.
+
+    python -m benchmarks.bench_pdf_extraction --max-workers 4 --repeat 8
+
+`--repeat` lists every PDF several times to mimic a bigger corpus (the bundled
+docs folder only has a handful of files). Every worker count starts from an empty
+page-text cache (pdf_text_cache.py), so repeated copies of a file are parsed once;
+a final warm run shows the re-chunk cost once all text is cached.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+import pdf_text_cache
+from doc_loader import PDF_PAGES_PER_TASK, iter_file_documents
+
+
+def use_cache_file(path: str) -> None:
+    # env for spawned workers, module global for this process and forked ones
+    os.environ["PDF_TEXT_CACHE_PATH"] = path
+    pdf_text_cache.PDF_TEXT_CACHE_PATH = path
+
+
+def run(pdfs, workers: int, pages_per_task: int):
+    t0 = time.perf_counter()
+    chunks = sum(len(docs) for _, docs in iter_file_documents(pdfs, workers=workers, pages_per_task=pages_per_task))
+    return time.perf_counter() - t0, chunks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", default="docs", help="folder with *.pdf")
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--repeat", type=int, default=1, help="list each PDF N times")
+    ap.add_argument("--pages-per-task", type=int, default=PDF_PAGES_PER_TASK)
+    args = ap.parse_args()
+
+    pdfs = sorted(Path(args.docs).glob("*.pdf")) * args.repeat
+    if not pdfs:
+        raise SystemExit(f"No PDFs in {args.docs}")
+    pages = 0
+    for p in pdfs:
+        with fitz.open(p) as pdf:
+            pages += len(pdf)
+
+    print(f"{len(pdfs)} files, {pages} pages, pages_per_task={args.pages_per_task}")
+    print(f"{'workers':>7} {'seconds':>8} {'pages/s':>9} {'chunks':>7} {'speedup':>7}")
+    base = None
+    tmp = tempfile.mkdtemp(prefix="pdf_text_cache_")
+    for workers in range(1, args.max_workers + 1):
+        use_cache_file(os.path.join(tmp, f"cold_{workers}.sqlite"))
+        dt, chunks = run(pdfs, workers, args.pages_per_task)
+        base = base or dt
+        print(f"{workers:>7} {dt:>8.2f} {pages / dt:>9.1f} {chunks:>7} {base / dt:>6.2f}x")
+
+    dt, chunks = run(pdfs, 1, args.pages_per_task)  # last cache file is now warm
+    print(f"{'warm':>7} {dt:>8.2f} {pages / dt:>9.1f} {chunks:>7} {base / dt:>6.2f}x  (text from cache)")
+
+
+if __name__ == "__main__":
+    main()
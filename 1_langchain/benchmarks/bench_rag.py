@@ -0,0 +1,326 @@
+"""
+End-to-end benchmark suite for the three RAG demos, fully offline.
+
+    pdf         rag_pinecone_pdf_demo: ingest synthetic docs into the local NumPy store, then ask_with_memory
+    confluence  rag_confluence_example.answer_question against an in-memory Confluence
+    kb          react_pattern_with_knowledgebase.answer: seed the KB, then repeat/paraphrased/novel/ID questions
+
+Embedders and chat models are deterministic fakes (benchmarks/fakes.py), or replayed
+from recorded fixtures with `--fixtures DIR` (`--record` fills them from the real
+OpenAI models once). Each scenario runs in its own interpreter so peak RSS is per
+scenario. Results are written as JSON and compared against a stored baseline; the
+exit code is 1 when a metric regresses by more than `--tolerance`.
+
+No baseline ships with the repo: timings depend on the machine, so record one locally
+with `--save-baseline` before comparing (until then every metric shows "-").
+
+    python -m benchmarks.bench_rag --save-baseline       # record (or accept) the current numbers
+    python -m benchmarks.bench_rag                       # all scenarios vs benchmarks/baseline.json
+    python -m benchmarks.bench_rag --only pdf --queries 200
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+PKG_ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("pdf", "confluence", "kb")
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+# -------------------- Models --------------------
+def make_models(args):
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings, RecordedChatModel, RecordedEmbeddings
+
+    emb = FakeEmbeddings(request_latency=args.embed_ms / 1000)
+    chat = FakeChatModel(latency=args.llm_ms / 1000)
+    if not args.fixtures:
+        return emb, chat, []
+    real_emb = real_chat = None
+    if args.record:
+        from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+        real_emb = OpenAIEmbeddings(model="text-embedding-3-small")
+        real_chat = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    fixtures = Path(args.fixtures)
+    r_emb = RecordedEmbeddings(str(fixtures / "embeddings.json"), fallback=emb, record=real_emb)
+    r_chat = RecordedChatModel(path=str(fixtures / "chat.json"), fallback=chat, record=real_chat)
+    return r_emb, r_chat, [r_emb, r_chat]
+
+
+def timed_queries(questions: List[str], ask: Callable[[int, str], Any], emb, chat) -> Dict[str, Any]:
+    from benchmarks.util import latency_summary
+
+    e0, c0 = emb.calls, chat.calls
+    lat = []
+    for i, q in enumerate(questions):
+        t0 = time.perf_counter()
+        ask(i, q)
+        lat.append(time.perf_counter() - t0)
+    n = max(len(questions), 1)
+    return {
+        "queries": len(questions),
+        **latency_summary(lat),
+        "embed_calls_per_query": (emb.calls - e0) / n,
+        "llm_calls_per_query": (chat.calls - c0) / n,
+    }
+
+
+# -------------------- Scenarios --------------------
+def write_corpus(root: Path, n_docs: int, words: int, rng: random.Random) -> List[str]:
+    """Synthetic TXT corpus; returns the topic words it is about."""
+    topics = [f"topic{i}" for i in range(max(n_docs * 2, 1))]
+    lexicon = [f"w{i}" for i in range(5000)]
+    root.mkdir(parents=True, exist_ok=True)
+    for d in range(n_docs):
+        paras = []
+        for p in range(words // 100):
+            topic = topics[(d * 2 + p) % len(topics)]
+            paras.append(" ".join(rng.choices(lexicon, k=95) + [topic] * 5))
+        (root / f"doc_{d:04d}.txt").write_text("\n\n".join(paras), encoding="utf-8")
+    return topics
+
+
+def scenario_pdf(args, emb, chat, rng: random.Random) -> Dict[str, Any]:
+    docs = Path("docs")
+    if args.docs:
+        docs.symlink_to(args.docs, target_is_directory=True)
+        topics = [f"w{i}" for i in range(50)]
+    else:
+        topics = write_corpus(docs, args.n_docs, args.doc_words, rng)
+
+    import rag_pinecone_pdf_demo as demo
+    from local_vectorstore import LocalVectorStore
+
+    demo.use_services(demo.RagServices(
+        embeddings=emb, llm=chat, vectorstore=LocalVectorStore(emb, persist_dir=demo.LOCAL_INDEX_DIR),
+    ))
+    t0 = time.perf_counter()
+    stats = demo.ingest(force=True)
+    ingest_s = time.perf_counter() - t0
+
+    # ~20% of questions repeat an earlier one, like real traffic
+    questions: List[str] = []
+    for _ in range(args.queries):
+        if questions and rng.random() < 0.2:
+            questions.append(rng.choice(questions))
+        else:
+            questions.append(f"What does the guide say about {rng.choice(topics)}?")
+    result = timed_queries(questions, lambda i, q: demo.ask_with_memory(f"bench-{i % 8}", q), emb, chat)
+    packed = demo.context_packer.metrics()
+    return {"ingest_chunks": stats.added, "ingest_per_sec": stats.added / max(ingest_s, 1e-9), **result,
+            "context_tokens_per_query": packed["avg_tokens_out"], "context_tokens_saved": packed["avg_tokens_saved"]}
+
+
+def scenario_confluence(args, emb, chat, rng: random.Random) -> Dict[str, Any]:
+    from benchmarks.fakes import FakeConfluence, synthetic_pages
+
+    import rag_confluence_example as conf
+
+    pages, topics = synthetic_pages(args.pages, seed=args.seed)
+    server = FakeConfluence(pages, latency=args.confluence_ms / 1000)
+    conf.confluence_client = lambda: server
+    conf.embeddings = lambda: emb
+    conf.ChatOpenAI = lambda **kwargs: chat
+
+    # single-word questions are answered from CQL; sentences fall back to paging through everything
+    questions = [
+        rng.choice(topics) if rng.random() < 0.5 else f"how do we roll out {rng.choice(topics)} safely"
+        for _ in range(args.confluence_queries)
+    ]
+    r0 = server.requests
+    result = timed_queries(questions, lambda i, q: conf.answer_question(q), emb, chat)
+    result["confluence_requests_per_query"] = (server.requests - r0) / max(len(questions), 1)
+    packed = conf.context_packer.metrics()
+    result["context_tokens_per_query"] = packed["avg_tokens_out"]
+    result["context_tokens_saved"] = packed["avg_tokens_saved"]
+    return result
+
+
+def scenario_kb(args, emb, chat, rng: random.Random) -> Dict[str, Any]:
+    from langchain.agents import AgentType, initialize_agent
+    from langchain_chroma import Chroma
+
+    import react_pattern_with_knowledgebase as kbmod
+    from kb_store import KBStore
+
+    kbmod.emb = emb
+    kbmod.kb = Chroma(collection_name=f"bench_kb_{os.getpid()}", embedding_function=emb)
+    kbmod.store = KBStore("kb_bench.sqlite", vectorstore=kbmod.kb)
+    kbmod.llm = chat
+    kbmod.agent = initialize_agent(
+        tools=[kbmod.kb_get_by_id, kbmod.kb_get_by_ids, kbmod.kb_lookup, kbmod.llm_answer, kbmod.kb_upsert],
+        llm=chat,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=False,
+        handle_parsing_errors=True,
+    )
+
+    seeded = [f"what is the policy for topic{i} in region w{i % 37}" for i in range(args.kb_entries)]
+    t0 = time.perf_counter()
+    for i, q in enumerate(seeded):
+        kbmod.kb_upsert.invoke({"payload": f"{q}|||answer {i}"})
+    ingest_s = time.perf_counter() - t0
+
+    questions = []
+    for i in range(args.queries):
+        r = rng.random()
+        if r < 0.3:
+            questions.append(rng.choice(seeded))                              # exact repeat
+        elif r < 0.6:
+            questions.append(rng.choice(seeded).replace("policy", "polcy") + " please")  # paraphrase/typo
+        elif r < 0.8:
+            questions.append(f"something new number {i}")                     # miss → LLM (KB_MISS_MODE)
+        else:
+            questions.append(str(10000 + rng.randrange(args.kb_entries)))      # lookup by ID
+
+    routes: Dict[str, int] = {}
+    miss_embeds: List[int] = []
+
+    def ask(i: int, q: str):
+        e0 = emb.calls
+        _, route = kbmod.answer(q)
+        routes[route] = routes.get(route, 0) + 1
+        if route in ("llm", "agent"):
+            miss_embeds.append(emb.calls - e0)
+
+    result = timed_queries(questions, ask, emb, chat)
+    kbmod.flush_writes()
+    # precheck, agent tools and upsert of one turn share a single question embedding
+    if max(miss_embeds, default=0) > 1:
+        raise AssertionError(f"a KB miss embedded its question {max(miss_embeds)} times, expected at most once")
+    return {"ingest_chunks": len(seeded), "ingest_per_sec": len(seeded) / max(ingest_s, 1e-9), **result,
+            "embed_calls_per_miss": sum(miss_embeds) / max(len(miss_embeds), 1), "routes": routes}
+
+
+RUNNERS = {"pdf": scenario_pdf, "confluence": scenario_confluence, "kb": scenario_kb}
+
+
+def run_child(args) -> None:
+    """Run one scenario in this (fresh) interpreter and print its metrics as one JSON line."""
+    from benchmarks.util import peak_rss_mb
+
+    sys.path.insert(0, str(PKG_ROOT))
+    for attr in ("docs", "fixtures"):  # relative to where we were started
+        if getattr(args, attr):
+            setattr(args, attr, str(Path(getattr(args, attr)).resolve()))
+    work = Path(tempfile.mkdtemp(prefix=f"bench_{args.child}_"))
+    os.chdir(work)
+    # offline: dummy keys, local vector store and all runtime state inside the temp dir
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    os.environ.setdefault("PINECONE_API_KEY", "offline-benchmark")
+    os.environ.update({
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_DIR": str(work / "local_index"),
+        "EMBED_CACHE_PATH": str(work / "embed_cache.sqlite"),
+    })
+    emb, chat, recorders = make_models(args)
+    rng = random.Random(args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):  # the demos print a lot
+        t0 = time.perf_counter()
+        metrics = RUNNERS[args.child](args, emb, chat, rng)
+        metrics["wall_s"] = time.perf_counter() - t0
+    for r in recorders:
+        if args.record:
+            r.save()
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(metrics))
+
+
+# -------------------- Baseline comparison --------------------
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith(("_per_sec", "_saved"))
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    regressions = []
+    print(f"\n{'scenario':<11} {'metric':<30} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metrics in results.items():
+        base = baseline.get(name, {})
+        for metric, value in metrics.items():
+            if not isinstance(value, (int, float)) or metric in {"queries", "ingest_chunks", "wall_s"}:
+                continue
+            old = base.get(metric)
+            if not isinstance(old, (int, float)) or old == 0:
+                print(f"{name:<11} {metric:<30} {'-':>12} {value:>12.3f}")
+                continue
+            change = (value - old) / abs(old)
+            worse = -change if higher_is_better(metric) else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            if flag:
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:<11} {metric:<30} {old:>12.3f} {value:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", choices=SCENARIOS, action="append", help="run just these scenarios (repeatable)")
+    ap.add_argument("--queries", type=int, default=100, help="questions per scenario (pdf, kb)")
+    ap.add_argument("--confluence-queries", type=int, default=20)
+    ap.add_argument("--n-docs", type=int, default=40, help="synthetic docs for the pdf scenario")
+    ap.add_argument("--doc-words", type=int, default=3000)
+    ap.add_argument("--docs", help="use a real docs folder (PDF/TXT) for the pdf scenario instead")
+    ap.add_argument("--pages", type=int, default=300, help="pages in the fake Confluence")
+    ap.add_argument("--kb-entries", type=int, default=500)
+    ap.add_argument("--embed-ms", type=float, default=0.0, help="simulated latency per embedding request")
+    ap.add_argument("--llm-ms", type=float, default=0.0, help="simulated latency per chat completion")
+    ap.add_argument("--confluence-ms", type=float, default=0.0, help="simulated latency per Confluence request")
+    ap.add_argument("--fixtures", help="dir with recorded embeddings.json / chat.json to replay")
+    ap.add_argument("--record", action="store_true", help="fill --fixtures from the real OpenAI models")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    ap.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in args.only or SCENARIOS:
+        print(f"running {name} ...", flush=True)
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_rag", *sys.argv[1:], "--child", name],
+            cwd=PKG_ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            raise SystemExit(f"scenario {name} failed")
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "args": vars(args)},
+        "scenarios": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"results → {args.out}")
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text())["scenarios"] if baseline_path.exists() else {}
+    regressions = compare(results, baseline, args.tolerance)
+    if not baseline and not args.save_baseline:
+        print(f"\nno baseline at {baseline_path}: nothing compared; "
+              "run once with --save-baseline on this machine to record one")
+    if args.save_baseline:
+        merged = {**baseline, **results}
+        baseline_path.write_text(json.dumps({"meta": report["meta"], "scenarios": merged}, indent=2))
+        print(f"baseline saved → {baseline_path}")
+    elif regressions:
+        raise SystemExit(f"regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Deterministic, offline stand-ins for the OpenAI clients used by the demos.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from confluence_fetcher import Listing
+from token_count import count_tokens
+
+_WORD = re.compile(r"\w+")
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors: texts sharing words get similar vectors.
+
+    `request_latency` / `per_text_latency` (seconds) simulate API cost; every
+    backend call is counted so benchmarks can report embedding calls per query.
+    """
+
+    def __init__(self, dim: int = 256, request_latency: float = 0.0, per_text_latency: float = 0.0):
+        self.dim = dim
+        self.request_latency = request_latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            v[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        if not v.any():
+            v[0] = 1.0
+        return (v / np.linalg.norm(v)).tolist()
+
+    def _charge(self, n: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.texts += n
+        if self.request_latency or self.per_text_latency:
+            time.sleep(self.request_latency + self.per_text_latency * n)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._charge(len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._charge(1)
+        return self._vector(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model. Replies start with "Final Answer:" so a ReAct agent stops after one call.
+    Prompt and reply tokens are counted (token_count) for per-call cost reports."""
+
+    latency: float = 0.0
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        return f"Final Answer: stub answer {digest}"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        reply = self._reply(str(messages[-1].content))
+        self.prompt_tokens += sum(count_tokens(str(m.content)) for m in messages)
+        self.completion_tokens += count_tokens(reply)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+
+class FakeReActChatModel(FakeChatModel):
+    """Plays a ReAct agent that follows react_pattern_with_knowledgebase's guidance on a miss:
+    kb_lookup -> llm_answer -> kb_upsert -> Final Answer, one call per step. Prompts without a
+    ReAct scratchpad (e.g. llm_answer's own call) get a plain answer."""
+
+    def _reply(self, prompt: str) -> str:
+        if "\nThought:" not in prompt:
+            return "stub answer " + hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        question = re.findall(r"^Question: (.*)$", prompt, re.M)[-1]
+        scratchpad = prompt[prompt.rfind(f"Question: {question}"):]  # skip the format example in the template
+        observations = re.findall(r"Observation: (.*?)\nThought:", scratchpad, re.S)
+        if not observations:
+            return f"Thought: not an ID, check the cache.\nAction: kb_lookup\nAction Input: {question}"
+        if len(observations) == 1:
+            if observations[0] != "__MISS__":
+                return f"Thought: cached.\nFinal Answer: {observations[0]}"
+            return f"Thought: a miss, ask the LLM.\nAction: llm_answer\nAction Input: {question}"
+        if len(observations) == 2:
+            return f"Thought: cache it.\nAction: kb_upsert\nAction Input: {question}|||{observations[1]}"
+        return f"Thought: stored.\nFinal Answer: {observations[1]}"
+
+
+def _key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RecordedEmbeddings(Embeddings):
+    """Replays vectors recorded from a real embedder (JSON fixture: sha256(text) -> vector).
+
+    Texts missing from the fixture come from `fallback`. Pass `record=<real embedder>`
+    to fetch misses for real instead, then `save()` to update the fixture.
+    """
+
+    def __init__(self, path: str, fallback: Optional[Embeddings] = None, record: Optional[Embeddings] = None):
+        self.path = Path(path)
+        self.vectors: Dict[str, List[float]] = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.fallback = fallback or FakeEmbeddings()
+        self.record = record
+        self.calls = self.replayed = self.missed = 0
+
+    def _lookup(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        missing = [t for t in dict.fromkeys(texts) if _key(t) not in self.vectors]
+        self.replayed += len(texts) - len(missing)
+        self.missed += len(missing)
+        if not missing:
+            return [self.vectors[_key(t)] for t in texts]
+        fresh = dict(zip(missing, (self.record or self.fallback).embed_documents(missing)))
+        if self.record is not None:
+            self.vectors.update({_key(t): v for t, v in fresh.items()})
+        return [fresh[t] if t in fresh else self.vectors[_key(t)] for t in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._lookup(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._lookup([text])[0]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.vectors))
+
+
+class RecordedChatModel(BaseChatModel):
+    """Replays chat replies recorded from a real model (JSON fixture: sha256(prompt) -> reply)."""
+
+    path: str
+    fallback: BaseChatModel
+    record: Optional[BaseChatModel] = None
+    replies: Dict[str, str] = {}
+    calls: int = 0
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        p = Path(self.path)
+        if p.exists():
+            self.replies = json.loads(p.read_text())
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        key = _key("\n".join(f"{m.type}: {m.content}" for m in messages))
+        if key not in self.replies:
+            source = self.record or self.fallback
+            reply = source.invoke(messages, stop=stop).content
+            if self.record is None:
+                return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+            self.replies[key] = reply
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.replies[key]))])
+
+    def save(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        Path(self.path).write_text(json.dumps(self.replies))
+
+
+class FakeConfluence:
+    """In-memory stand-in for `atlassian.Confluence` serving synthetic pages.
+
+    `cql()` matches pages containing every word of the `text ~ "..."` phrase (or the ids of
+    `id in (...)`); `get("rest/api/content")` pages through everything. `latency` is charged
+    per request.
+    """
+
+    def __init__(self, pages: List[Dict[str, Any]], latency: float = 0.0, max_limit: int = 1000):
+        self.pages = pages
+        self.latency = latency
+        self.max_limit = max_limit  # Confluence clamps `limit` (e.g. 25 with body expansions)
+        self.requests = 0
+
+    def _charge(self) -> None:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cql(self, cql: str, limit: int = 25, expand: str = "", start: int = 0, **kwargs: Any) -> Dict[str, Any]:
+        self._charge()
+        limit = min(limit, self.max_limit)
+        ids = re.search(r"id in \(([^)]*)\)", cql)
+        if ids:
+            wanted = set(ids.group(1).split(","))
+            hits = [p for p in self.pages if p["id"] in wanted]
+            return {"results": [{"content": p} for p in hits[start:start + limit]], "size": len(hits)}
+        m = re.search(r'text ~ "([^"]*)"', cql)
+        words = _WORD.findall((m.group(1) if m else "").lower())
+        hits = [p for p in self.pages if words and all(w in p["_text"] for w in words)]
+        return {"results": [{"content": p} for p in hits[start:start + limit]], "size": len(hits)}
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, Any]:
+        self._charge()
+        params = params or {}
+        start, limit = int(params.get("start", 0)), min(int(params.get("limit", 25)), self.max_limit)
+        results = self.pages[start:start + limit]
+        links = {"next": f"/rest/api/content?start={start + limit}"} if start + limit < len(self.pages) else {}
+        return {"results": results, "start": start, "limit": limit, "size": len(results), "_links": links}
+
+    # ConfluenceFetcher's concurrency helpers, run sequentially
+    def fetch_all(self, path: str, params: Optional[Dict[str, Any]] = None, page_size: int = 50,
+                  max_items: Optional[int] = None) -> Listing:
+        out, start, complete = Listing(), 0, False
+        while max_items is None or len(out) < max_items:
+            res = self.get(path, params={**(params or {}), "start": start, "limit": page_size})
+            out += res["results"]
+            if "next" not in res["_links"]:
+                complete = True
+                break
+            start += len(res["results"])
+        if max_items is not None:
+            out.complete = complete and len(out) <= max_items
+            del out[max_items:]
+        else:
+            out.complete = complete
+        return out
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        return [fn(x) for x in items]
+
+    def stats(self) -> Dict[str, float]:
+        return {"requests": self.requests}
+
+
+def synthetic_pages(n: int, words: int = 400, seed: int = 0) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """`n` Confluence-shaped pages and the topic words they are about."""
+    rng = np.random.default_rng(seed)
+    topics = [f"topic{i}" for i in range(max(n // 5, 1))]
+    lexicon = [f"w{i}" for i in range(5000)]
+    pages = []
+    for i in range(n):
+        topic = topics[i % len(topics)]
+        body = " ".join(rng.choice(lexicon, size=words).tolist() + [topic] * 5)
+        pages.append({
+            "id": str(100000 + i),
+            "title": f"Page {i} on {topic}",
+            "space": {"key": "BENCH"},
+            "version": {"number": 1, "when": f"2024-01-01T00:00:{i % 60:02d}.000Z"},
+            "body": {"storage": {"value": f"<p>{body}</p>"}},
+            "_text": body.lower(),
+        })
+    return pages, topics
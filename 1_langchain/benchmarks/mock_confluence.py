@@ -0,0 +1,117 @@
+"""
+Local HTTP Confluence for the fetch/service benchmarks.
+
+Serves `FakeConfluence` pages over real HTTP so `ConfluenceFetcher` is measured with
+its connection pool, retries and rate limiting:
+
+    GET /wiki/rest/api/content?start=&limit=   paginated, `limit` clamped to `max_limit`
+    GET /wiki/rest/api/search?cql=&limit=      `text ~ "..."` and `id in (...)` queries
+
+`latency` (seconds) is charged per request; above `server_rate` requests/second the
+server answers 429, like Confluence Cloud's rate limiter.
+
+    with MockConfluenceServer(pages, latency=0.03) as server:
+        conf = ConfluenceFetcher(server.url)
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fakes import FakeConfluence
+
+
+class MockConfluenceServer:
+    def __init__(
+        self,
+        pages: List[Dict[str, Any]],
+        latency: float = 0.0,
+        max_limit: int = 50,
+        server_rate: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ):
+        self.fake = FakeConfluence(pages, max_limit=max_limit)
+        self.latency = latency
+        self.server_rate = server_rate
+        self.retry_after = retry_after
+        self.requests = self.rejected = 0
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/wiki"
+
+    def start(self) -> "MockConfluenceServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockConfluenceServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if not self.server_rate:
+                return True
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.server_rate:
+                self.rejected += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so client pooling matters
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if not server._admit():
+                    headers = {"Retry-After": str(server.retry_after)} if server.retry_after else {}
+                    return self._send(429, {"message": "rate limited"}, headers)
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.endswith("/rest/api/content"):
+                    return self._send(200, server.fake.get("rest/api/content", params=q))
+                if url.path.endswith("/rest/api/search"):
+                    res = server.fake.cql(q.get("cql", ""), limit=int(q.get("limit", 25)),
+                                          start=int(q.get("start", 0)))
+                    return self._send(200, res)
+                self._send(404, {"message": "not found"})
+
+            def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
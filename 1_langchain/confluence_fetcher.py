@@ -0,0 +1,204 @@
+"""
+Pooled, concurrent, rate-limited Confluence REST client for rag_confluence_example.
+
+One instance lives for the whole process, so every question and every mirror sync
+reuses the same keep-alive HTTP connections:
+
+    conf = ConfluenceFetcher(f"{BASE_URL}/wiki", EMAIL, API_TOKEN, concurrency=4, rate=10)
+    hits = conf.cql('text ~ "deploy" AND type=page', limit=20, expand="content.body.storage")
+    pages = conf.fetch_all("rest/api/content", {"type": "page", "expand": "version"})
+
+- `fetch_all` asks for the first page alone (to learn the server's real page size,
+  Confluence clamps `limit` for some expansions) and then requests the remaining page
+  ranges `concurrency` at a time, until a page comes back without a `next` link (pages
+  can be short after permission filtering, so a short page is not the end); the
+  returned `Listing.complete` says whether that point was reached
+- every request goes through a token bucket (`rate` requests/second, 0 = unlimited)
+- 429 and 5xx are retried with exponential backoff + jitter, honouring `Retry-After`;
+  a 429 also halves the request rate, which then creeps back up on successes
+  (additive increase, multiplicative decrease)
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class Listing(list):
+    """Results of `fetch_all`; `complete` is False when `max_items` cut the crawl short."""
+
+    complete = True
+
+
+class RateLimiter:
+    """Token bucket whose rate adapts to 429s (AIMD)."""
+
+    def __init__(self, rate: float, min_rate: float = 0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate) if rate else 0.0
+        self._tokens = 1.0
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.max_rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class ConfluenceFetcher:
+    def __init__(
+        self,
+        url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        concurrency: int = 4,
+        rate: float = 10.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+    ):
+        self.url = url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate)
+        self.session = requests.Session()
+        if username or password:
+            self.session.auth = (username or "", password or "")
+        self.session.headers["Accept"] = "application/json"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="confluence")
+        self.requests = self.retries = self.throttled = 0
+        self._counter_lock = threading.Lock()  # counters are bumped from the pool threads
+
+    # ---- single requests ----
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, Any]:
+        url = f"{self.url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self._count("requests")
+            try:
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep(attempt, None)
+                continue
+            if resp.status_code in _RETRY_STATUS and attempt < self.max_retries:
+                if resp.status_code == 429:
+                    self._count("throttled")
+                    self.limiter.throttled()
+                self._sleep(attempt, resp.headers.get("Retry-After"))
+                continue
+            resp.raise_for_status()
+            self.limiter.succeeded()
+            return resp.json() if resp.content else {}
+        raise RuntimeError("unreachable")
+
+    def cql(self, cql: str, limit: int = 25, expand: str = "", start: int = 0, **kwargs: Any) -> Dict[str, Any]:
+        """Same call shape and result shape as `atlassian.Confluence.cql`."""
+        params = {"cql": cql, "limit": limit, "start": start}
+        if expand:
+            params["expand"] = expand
+        return self.get("rest/api/search", params=params)
+
+    # ---- concurrency ----
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """`fn` over `items` on the request pool, results in input order."""
+        return list(self._pool.map(fn, items))
+
+    def fetch_all(
+        self, path: str, params: Optional[Dict[str, Any]] = None, page_size: int = 50, max_items: Optional[int] = None
+    ) -> Listing:
+        """Every result of a paginated endpoint, page ranges fetched concurrently."""
+        params = dict(params or {})
+
+        def page(start: int, limit: int) -> Dict[str, Any]:
+            return self.get(path, params={**params, "start": start, "limit": limit}) or {}
+
+        first = page(0, page_size)
+        items = list(first.get("results", []))
+        if "next" not in (first.get("_links") or {}):
+            return self._listing(items, max_items, complete=True)
+        size = len(items) or page_size  # what the server actually returns per page
+        done: Dict[int, List[Dict[str, Any]]] = {0: items}
+        end: Optional[int] = None  # offset of the page without a `next` link
+        next_start = size
+        pending: Dict[Any, int] = {}
+
+        def room() -> bool:
+            return end is None and (max_items is None or next_start < max_items)
+
+        while True:
+            while room() and len(pending) < self.concurrency:
+                pending[self._pool.submit(page, next_start, size)] = next_start
+                next_start += size
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                start = pending.pop(fut)
+                res = fut.result()
+                done[start] = res.get("results", [])
+                if "next" not in (res.get("_links") or {}):  # short pages with a `next` link are not the end
+                    end = start if end is None else min(end, start)
+        out = [c for start in sorted(done) if end is None or start <= end for c in done[start]]
+        return self._listing(out, max_items, complete=end is not None)
+
+    @staticmethod
+    def _listing(items: List[Dict[str, Any]], max_items: Optional[int], complete: bool) -> Listing:
+        out = Listing(items[:max_items])
+        out.complete = complete and (max_items is None or len(items) <= max_items)
+        return out
+
+    def stats(self) -> Dict[str, float]:
+        return {"requests": self.requests, "retries": self.retries, "throttled": self.throttled,
+                "rate": self.limiter.rate}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        self.session.close()
+
+    def _count(self, counter: str) -> None:
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _sleep(self, attempt: int, retry_after: Optional[str]) -> None:
+        self._count("retries")
+        try:
+            delay = float(retry_after) if retry_after else self.backoff * 2 ** attempt
+        except ValueError:  # HTTP-date form; fall back to exponential backoff
+            delay = self.backoff * 2 ** attempt
+        time.sleep(delay * random.uniform(0.8, 1.2))
@@ -0,0 +1,134 @@
+"""
+Persistent chunk-vector index over the Confluence mirror (confluence_mirror.py).
+
+Chunks are embedded once, when a page version first appears in the mirror, and kept in
+a LocalVectorStore (`CONFLUENCE_INDEX_DIR`) under ids `<page id>:<version>:<offset>`.
+`refresh(mirror)` reconciles the two: chunks of changed or deleted pages are dropped,
+new versions are chunked and embedded in batches. A question then costs one
+`embed_query` plus a top-k over the stored vectors:
+
+    index = ConfluenceChunkIndex(embeddings, chunker=lambda text: chunk_spans(text, 900, 120), chunker_key="900/120")
+    index.refresh(mirror)
+    hits = index.search(qv, k=6)                       # whole mirror
+    hits = index.search(qv, k=6, page_ids={"123"})     # just the CQL hits
+    per_question = index.search_batch(qvs, k=6)        # many questions, one matrix product
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from confluence_mirror import ConfluenceMirror
+from local_vectorstore import LocalVectorStore
+
+CONFLUENCE_INDEX_DIR = os.getenv("CONFLUENCE_INDEX_DIR", ".confluence_index")
+
+_PAGES_PER_READ = 64
+
+
+@dataclass
+class IndexStats:
+    pages_added: int = 0
+    pages_removed: int = 0   # deleted or superseded by a new version
+    chunks_added: int = 0
+    seconds: float = 0.0
+
+
+def chunk_id(page_id: str, version: int, start: int) -> str:
+    return f"{page_id}:{version}:{start}"
+
+
+class ConfluenceChunkIndex:
+    def __init__(
+        self,
+        embedding: Embeddings,
+        chunker: Callable[[str], List[Tuple[int, int]]],
+        persist_dir: Optional[str] = CONFLUENCE_INDEX_DIR,
+        batch_size: int = 256,
+        chunker_key: str = "",
+    ):
+        self.store = LocalVectorStore(embedding, persist_dir=persist_dir)
+        self.chunker = chunker
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        # chunk offsets depend on the chunker settings: different settings, fresh index
+        self._key_file = Path(persist_dir) / "chunker.txt" if persist_dir else None
+        self.chunker_key = chunker_key
+        if self._key_file and self._key_file.exists() and self._key_file.read_text() != chunker_key:
+            self.store.delete(delete_all=True)
+        # page id -> (indexed version, chunk ids), rebuilt from the stored ids
+        self._pages: Dict[str, Tuple[int, List[str]]] = {}
+        for cid in self.store.ids():
+            pid, version, _ = cid.rsplit(":", 2)
+            self._pages.setdefault(pid, (int(version), []))[1].append(cid)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def version(self, page_id: str) -> Optional[int]:
+        entry = self._pages.get(page_id)
+        return entry[0] if entry else None
+
+    def refresh(self, mirror: ConfluenceMirror) -> IndexStats:
+        """Make the index match the mirror's page versions."""
+        with self._lock:
+            t0, stats = time.perf_counter(), IndexStats()
+            want = mirror.versions()
+
+            stale = [pid for pid, (v, _) in self._pages.items() if want.get(pid) != v]
+            self.store.delete([cid for pid in stale for cid in self._pages.pop(pid)[1]])
+            stats.pages_removed = len(stale)
+
+            missing = [pid for pid in want if pid not in self._pages]
+            texts: List[str] = []
+            metas: List[dict] = []
+            ids: List[str] = []
+            batch_pages: Dict[str, Tuple[int, List[str]]] = {}  # recorded once their chunks are stored
+
+            def flush() -> None:
+                nonlocal texts, metas, ids, batch_pages
+                if texts:
+                    stats.chunks_added += len(self.store.add_texts(texts, metas, ids=ids))
+                self._pages.update(batch_pages)
+                stats.pages_added += len(batch_pages)
+                texts, metas, ids, batch_pages = [], [], [], {}
+
+            for i in range(0, len(missing), _PAGES_PER_READ):
+                for page in mirror.pages(ids=missing[i:i + _PAGES_PER_READ]):
+                    cids = []
+                    for start, end in self.chunker(page.text):
+                        cids.append(chunk_id(page.id, page.version, start))
+                        ids.append(cids[-1])
+                        texts.append(page.text[start:end])
+                        metas.append({"page_id": page.id, "version": page.version, "start": start, "end": end,
+                                      "title": page.title, "space": page.space})
+                    batch_pages[page.id] = (page.version, cids)
+                    if len(texts) >= self.batch_size:
+                        flush()
+            flush()
+            self.store.save()
+            if self._key_file and self._key_file.parent.exists():
+                self._key_file.write_text(self.chunker_key)
+            stats.seconds = time.perf_counter() - t0
+            return stats
+
+    def search(
+        self, query_vector: List[float], k: int, page_ids: Optional[Collection[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Top-k chunks by cosine similarity, optionally restricted to `page_ids`."""
+        return self.search_batch([query_vector], k, page_ids)[0]
+
+    def search_batch(
+        self, query_vectors: List[List[float]], k: int, page_ids: Optional[Collection[str]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """`search` for many questions at once: one matrix product over the stored vectors."""
+        ids = None
+        if page_ids is not None:
+            ids = [cid for pid in page_ids for cid in self._pages.get(pid, (0, []))[1]]
+        return self.store.similarity_search_batch_with_score_by_vectors(query_vectors, k=k, ids=ids)
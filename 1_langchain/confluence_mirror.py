@@ -0,0 +1,207 @@
+"""
+Local SQLite mirror of Confluence pages for rag_confluence_example.
+
+The fallback path used to crawl `rest/api/content` with full bodies on every question.
+Instead, a sync job keeps a local copy of every page (id, version, space, title,
+lastModified, extracted text) and questions read from it:
+
+    mirror = ConfluenceMirror()
+    stats = mirror.sync(conf, to_text=html_to_text)   # bodies only for new/changed pages
+    pages = mirror.pages(limit=300)                   # most recently modified first
+
+`sync` lists ids + versions (no bodies), downloads bodies only for pages whose version
+changed (batched `id in (...)` CQL, run concurrently by `ConfluenceFetcher`), and drops
+pages that disappeared. Text is stored zlib-compressed.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from confluence_fetcher import ConfluenceFetcher
+
+CONFLUENCE_MIRROR_PATH = os.getenv("CONFLUENCE_MIRROR_PATH", ".confluence_mirror.sqlite")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS pages (
+        id            TEXT PRIMARY KEY,
+        version       INTEGER NOT NULL,
+        space         TEXT NOT NULL,
+        title         TEXT NOT NULL,
+        last_modified TEXT NOT NULL,   -- version.when, ISO 8601
+        text          BLOB NOT NULL    -- zlib(utf-8)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS pages_last_modified ON pages (last_modified)",
+    """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+)
+_SQL_VARS = 500  # stay well below SQLite's bound-parameter limit
+
+
+@dataclass
+class MirrorPage:
+    id: str
+    version: int
+    space: str
+    title: str
+    last_modified: str
+    text: str
+
+
+@dataclass
+class SyncStats:
+    listed: int = 0    # pages seen in the listing
+    fetched: int = 0   # bodies downloaded (new or changed)
+    deleted: int = 0   # pages gone from Confluence
+    seconds: float = 0.0
+
+
+def page_version(content: Dict[str, Any]) -> int:
+    return int((content.get("version") or {}).get("number") or 0)
+
+
+def _page(content: Dict[str, Any], to_text: Callable[[str], str]) -> MirrorPage:
+    html = (((content.get("body") or {}).get("storage") or {}).get("value")) or ""
+    return MirrorPage(
+        id=str(content.get("id") or ""),
+        version=page_version(content),
+        space=(content.get("space") or {}).get("key") or "",
+        title=(content.get("title") or "Untitled").strip(),
+        last_modified=(content.get("version") or {}).get("when") or "",
+        text=to_text(html),
+    )
+
+
+class ConfluenceMirror:
+    def __init__(self, path: str = CONFLUENCE_MIRROR_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    # ---- reads ----
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def versions(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, version FROM pages").fetchall())
+
+    def pages(self, ids: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> List[MirrorPage]:
+        """Mirrored pages, most recently modified first (all of them, or just `ids`)."""
+        cols = "SELECT id, version, space, title, last_modified, text FROM pages"
+        with self._lock:
+            if ids is None:
+                rows = self._conn.execute(
+                    cols + " ORDER BY last_modified DESC LIMIT ?", (-1 if limit is None else limit,)
+                ).fetchall()
+            else:
+                ids, rows = list(ids), []
+                for i in range(0, len(ids), _SQL_VARS):
+                    part = ids[i:i + _SQL_VARS]
+                    rows += self._conn.execute(
+                        cols + f" WHERE id IN ({','.join('?' * len(part))})", part
+                    ).fetchall()
+                rows = sorted(rows, key=lambda r: r[4], reverse=True)[:limit]
+        return [MirrorPage(r[0], r[1], r[2], r[3], r[4], zlib.decompress(r[5]).decode("utf-8")) for r in rows]
+
+    def last_sync(self) -> Optional[float]:
+        """Unix time the last complete sync finished, None if never."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'last_sync'").fetchone()
+        return float(row[0]) if row else None
+
+    def is_stale(self, max_age: float) -> bool:
+        last = self.last_sync()
+        return last is None or time.time() - last > max_age
+
+    # ---- writes ----
+    def upsert(self, pages: Iterable[MirrorPage]) -> int:
+        rows = [
+            (p.id, p.version, p.space, p.title, p.last_modified, zlib.compress(p.text.encode("utf-8"), 6))
+            for p in pages
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (id, version, space, title, last_modified, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        with self._lock, self._conn:
+            for i in range(0, len(ids), _SQL_VARS):
+                part = ids[i:i + _SQL_VARS]
+                self._conn.execute(f"DELETE FROM pages WHERE id IN ({','.join('?' * len(part))})", part)
+        return len(ids)
+
+    # ---- sync ----
+    def sync(self, conf: "ConfluenceFetcher", to_text: Callable[[str], str], batch_size: int = 50) -> SyncStats:
+        """Bring the mirror up to date with everything `conf` can see.
+
+        One listing pass without bodies, then bodies only for new/changed versions.
+        Confluence clamps `limit` when bodies are expanded, so ids missing from a
+        body response are requested again; if none of them come back the sync fails
+        and `last_sync` is not recorded. Pages missing from the listing are deleted
+        only when the listing is complete (it reached a page without a `next` link).
+        Concurrent callers wait for the running sync and then return (empty stats)
+        instead of starting another.
+        """
+        requested = time.time()
+        with self._sync_lock:
+            t0, stats = time.perf_counter(), SyncStats()
+            last = self.last_sync()
+            if last is not None and last >= requested:  # finished while we waited
+                return stats
+            known = self.versions()
+
+            listing = conf.fetch_all("rest/api/content", {"type": "page", "expand": "version"}, page_size=batch_size)
+            remote = {str(c["id"]): page_version(c) for c in listing}
+            stats.listed = len(remote)
+
+            changed = [pid for pid, v in remote.items() if known.get(pid) != v]
+
+            def fetch(ids: List[str]) -> List[MirrorPage]:
+                pages: List[MirrorPage] = []
+                while ids:
+                    res = conf.cql(f"id in ({','.join(ids)})", limit=len(ids),
+                                   expand="content.body.storage,content.space,content.version") or {}
+                    got = [p for p in (_page(r["content"], to_text) for r in res.get("results", [])) if p.id in ids]
+                    if not got:
+                        raise RuntimeError(f"Confluence returned none of {len(ids)} changed pages ({ids[0]}, ...)")
+                    pages += got
+                    found = {p.id for p in got}
+                    ids = [i for i in ids if i not in found]  # clamped response: ask for the rest
+                return pages
+
+            batches = [changed[i:i + batch_size] for i in range(0, len(changed), batch_size)]
+            for pages in conf.map(fetch, batches):
+                stats.fetched += self.upsert(pages)
+
+            if getattr(listing, "complete", False):
+                stats.deleted = self.delete(pid for pid in known if pid not in remote)
+            else:  # a cut-short listing would wipe pages that still exist
+                print(f"⚠️ Confluence listing incomplete ({len(remote)} pages), not deleting unlisted pages")
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_sync', ?)", (str(time.time()),)
+                )
+            stats.seconds = time.perf_counter() - t0
+            return stats
@@ -0,0 +1,164 @@
+"""
+Long-lived HTTP front end for rag_confluence_example.
+
+One process keeps the pooled Confluence client, the embedder, the chat model, the page
+mirror/index and the CQL result cache warm across requests, and answers several
+questions at once: at most `SERVICE_CONCURRENCY` are in flight, extra requests wait up
+to `SERVICE_QUEUE_TIMEOUT` seconds for a slot and then get 503.
+
+    python confluence_service.py --port 8080
+    curl -s localhost:8080/ask -d '{"question": "how do we deploy?"}'
+    curl -s localhost:8080/stats
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import rag_confluence_example as rag
+from context_packer import PackStats
+
+SERVICE_CONCURRENCY = int(os.getenv("SERVICE_CONCURRENCY", "8"))
+SERVICE_QUEUE_TIMEOUT = float(os.getenv("SERVICE_QUEUE_TIMEOUT", "30"))
+MAX_QUESTION_CHARS = 2000
+
+
+class ConfluenceQAService:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        concurrency: int = SERVICE_CONCURRENCY,
+        queue_timeout: float = SERVICE_QUEUE_TIMEOUT,
+        answer: Callable[[str], Tuple[str, Optional[PackStats]]] = rag.answer_with_stats,
+    ):
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.answer = answer
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self.answered = self.rejected = self.failed = self.in_flight = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def start(self) -> "ConfluenceQAService":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ConfluenceQAService":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---- requests ----
+    def ask(self, question: str) -> Tuple[int, Dict[str, Any]]:
+        question = (question or "").strip()
+        if not question or len(question) > MAX_QUESTION_CHARS:
+            return 400, {"error": f"question must be 1..{MAX_QUESTION_CHARS} characters"}
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            return 503, {"error": "busy, try again"}
+        with self._lock:
+            self.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            answer, packed = self.answer(question)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            return 500, {"error": str(e)}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+        with self._lock:
+            self.answered += 1
+        body = {"answer": answer, "seconds": time.perf_counter() - t0}
+        if packed:  # this request's own packing stats, not whatever request packed last
+            body.update(context_tokens=packed.tokens_out, tokens_saved=packed.tokens_saved)
+        return 200, body
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {"answered": self.answered, "rejected": self.rejected, "failed": self.failed,
+                   "in_flight": self.in_flight, "concurrency": self.concurrency}
+        out["cql_cache"] = rag.cql_cache.stats()
+        out["context_packing"] = rag.context_packer.metrics()
+        out["confluence"] = rag.confluence_client().stats()
+        return out
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path == "/health":
+                    return self._send(200, {"ok": True})
+                if self.path == "/stats":
+                    return self._send(200, service.stats())
+                self._send(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                if self.path != "/ask":
+                    return self._send(404, {"error": "not found"})
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                    question = body.get("question", "")
+                except (ValueError, AttributeError):
+                    return self._send(400, {"error": "expected a JSON object with a 'question'"})
+                self._send(*service.ask(question))
+
+            def _send(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--concurrency", type=int, default=SERVICE_CONCURRENCY)
+    ap.add_argument("--no-sync", action="store_true", help="skip the mirror/index sync before serving")
+    args = ap.parse_args()
+
+    if not args.no_sync:
+        rag.ready_index(rag.confluence_client())
+    service = ConfluenceQAService(args.host, args.port, concurrency=args.concurrency)
+    print(f"Confluence QA on {service.url} (POST /ask, GET /stats), {args.concurrency} concurrent")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
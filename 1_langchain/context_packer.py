@@ -0,0 +1,170 @@
+"""
+Token-budget context packing for the RAG prompts.
+
+The splitters overlap neighbouring chunks (150/120 characters), so top-k hits from
+the same page repeat text. `ContextPacker.pack` walks the hits in rank order and
+
+- merges chunks from the same source/page that overlap (suffix of one == prefix of
+  the other), contain each other, or are adjacent (consecutive chunk index),
+- drops near-duplicates: passages whose word trigrams are >= `dup_threshold`
+  covered by an already kept passage (any source),
+- keeps passages in rank order while they fit in `token_budget` (the top passage
+  is truncated rather than dropped if it alone is over budget).
+
+Every call returns its own tokens before/after (`PackStats`), so concurrent requests
+sharing one packer each see their own numbers; `metrics()` reports the average saved.
+
+    packer = ContextPacker(token_budget=2000)
+    kept, stats = packer.pack([Passage(d.page_content, key=(src, page), order=idx, meta=d) for ...])
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from token_count import DEFAULT_MODEL, count_tokens
+
+
+@dataclass
+class Passage:
+    text: str
+    key: Optional[Hashable] = None   # merge group (e.g. (source, page)); None = never merged
+    order: Optional[int] = None      # position inside the group (chunk index), enables adjacency merges
+    meta: Any = None                 # caller data, kept from the best-ranked member
+    span: Tuple[int, int] = field(default=(0, 0), repr=False)
+    tokens: int = field(default=0, repr=False)
+
+
+@dataclass
+class PackStats:
+    tokens_in: int
+    tokens_out: int
+    passages_in: int
+    passages_out: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+def _suffix_prefix_overlap(a: str, b: str, min_overlap: int) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (0 if < min_overlap)."""
+    if min(len(a), len(b)) < min_overlap:
+        return 0
+    probe = b[:min_overlap]
+    i = a.find(probe, max(0, len(a) - len(b)))
+    while i != -1:
+        if b.startswith(a[i:]):
+            return len(a) - i
+        i = a.find(probe, i + 1)
+    return 0
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = text.lower().split()
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        min_overlap: int = 20,
+        dup_threshold: float = 0.85,
+        overhead_tokens: int = 16,   # per-passage citation/formatting
+        min_passage_tokens: int = 32,
+        model: str = DEFAULT_MODEL,
+    ):
+        self.token_budget = token_budget
+        self.min_overlap = min_overlap
+        self.dup_threshold = dup_threshold
+        self.overhead_tokens = overhead_tokens
+        self.min_passage_tokens = min_passage_tokens
+        self.model = model
+        self._lock = threading.Lock()
+        self._calls = self._tokens_in = self._tokens_out = 0
+
+    def pack(self, passages: Sequence[Passage]) -> Tuple[List[Passage], PackStats]:
+        tokens_in = sum(count_tokens(p.text, self.model) + self.overhead_tokens for p in passages)
+
+        kept: List[Passage] = []
+        for p in passages:
+            p = Passage(p.text, p.key, p.order, p.meta, span=(p.order or 0, p.order or 0))
+            if not p.text.strip():
+                continue
+            if p.key is not None and any(self._merge(g, p) for g in kept if g.key == p.key):
+                continue
+            if self._is_near_duplicate(p, kept):
+                continue
+            kept.append(p)
+
+        out, used = [], 0
+        for p in kept:
+            p.tokens = count_tokens(p.text, self.model) + self.overhead_tokens
+            if used + p.tokens > self.token_budget:
+                # a merged passage can outgrow the budget on its own; keep its head rather than lose it
+                room = self.token_budget - used - self.overhead_tokens
+                if out or room < self.min_passage_tokens:
+                    continue
+                p.text = self._truncate(p.text, room)
+                p.tokens = count_tokens(p.text, self.model) + self.overhead_tokens
+            out.append(p)
+            used += p.tokens
+
+        with self._lock:
+            self._calls += 1
+            self._tokens_in += tokens_in
+            self._tokens_out += used
+        return out, PackStats(tokens_in, used, len(passages), len(out))
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            n = self._calls or 1
+            return {
+                "queries": self._calls,
+                "avg_tokens_in": self._tokens_in / n,
+                "avg_tokens_out": self._tokens_out / n,
+                "avg_tokens_saved": (self._tokens_in - self._tokens_out) / n,
+            }
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of `text` within `max_tokens`, ending on a word boundary when
+        there is one nearby; text without whitespace (URLs, identifiers, CJK) is cut mid-word."""
+        cut = len(text)
+        while cut > 0:
+            tokens = count_tokens(text[:cut], self.model)
+            if tokens <= max_tokens:
+                return text[:cut]
+            target = int(cut * max_tokens / tokens * 0.95)
+            space = max(text.rfind(" ", 0, target), text.rfind("\n", 0, target))
+            cut = space if space > target // 2 else target
+        return ""
+
+    def _merge(self, g: Passage, p: Passage) -> bool:
+        """Fold `p` into `g` in place when they overlap, nest or are adjacent."""
+        if p.text in g.text:
+            return True
+        if g.text in p.text:
+            g.text = p.text
+        elif (k := _suffix_prefix_overlap(g.text, p.text, self.min_overlap)):
+            g.text = g.text + p.text[k:]
+        elif (k := _suffix_prefix_overlap(p.text, g.text, self.min_overlap)):
+            g.text = p.text + g.text[k:]
+        elif p.order is not None and g.order is not None and p.order == g.span[1] + 1:
+            g.text = g.text + "\n" + p.text
+        elif p.order is not None and g.order is not None and p.order == g.span[0] - 1:
+            g.text = p.text + "\n" + g.text
+        else:
+            return False
+        if p.order is not None and g.order is not None:
+            g.span = (min(g.span[0], p.order), max(g.span[1], p.order))
+        return True
+
+    def _is_near_duplicate(self, p: Passage, kept: List[Passage]) -> bool:
+        if self.dup_threshold >= 1.0 or not kept:
+            return False
+        sp = _shingles(p.text)
+        for g in kept:
+            if p.text in g.text or len(sp & _shingles(g.text)) / len(sp) >= self.dup_threshold:
+                return True
+        return False
@@ -0,0 +1,168 @@
+"""
+Local PDF/TXT -> LangChain Documents for the RAG demos.
+
+Kept free of service clients (OpenAI, Pinecone) so process-pool workers can import
+it cheaply: with the "spawn" start method every worker re-imports the module that
+defines its task function.
+
+Everything is a generator: the corpus is split into tasks (whole files, or page
+ranges of big PDFs) and results are yielded task by task, so memory is bounded by
+the task size rather than the corpus size. Parallel mode parses tasks on a
+ProcessPoolExecutor with a bounded look-ahead window and yields results in the
+same order as the serial loader, so chunk IDs and ingest output stay deterministic.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from pdf_text_cache import pdf_page_count, pdf_pages
+from text_chunker import chunk_spans
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+TXT_CHUNK_UNIT = os.getenv("TXT_CHUNK_UNIT", "chars")                 # chars | tokens
+TXT_CHUNK_TOKENS = int(os.getenv("TXT_CHUNK_TOKENS", "200"))           # sizes when TXT_CHUNK_UNIT=tokens
+TXT_CHUNK_OVERLAP_TOKENS = int(os.getenv("TXT_CHUNK_OVERLAP_TOKENS", "40"))
+DOCS_DIR = Path("docs")
+DOC_WORKERS = int(os.getenv("DOC_WORKERS", "1"))                  # 1 = serial, in-process
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "50"))   # split bigger PDFs; 0 = never split
+
+# (path, first_page, end_page, last_task_of_file) with 0-based, end-exclusive
+# pages; end_page None = to the end
+Task = Tuple[str, int, Optional[int], bool]
+
+
+def iter_pdf_documents(
+    pdf_path: Path, page_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[Document]:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=["\n\n", "\n", " ", ""]
+    )
+
+    # page text comes from the extraction cache; PyMuPDF only runs for unseen files
+    start, end = page_range or (0, None)
+    for page_num, page_text in enumerate(pdf_pages(pdf_path, "pymupdf", start, end), start=start):
+        if not page_text.strip():
+            continue
+
+        chunks = splitter.split_text(page_text)
+        for i, chunk in enumerate(chunks):
+            yield Document(
+                page_content=chunk,
+                metadata={
+                    "source": pdf_path.name,
+                    "page": page_num + 1,  # 1-based
+                    "chunk_idx": i,
+                },
+            )
+
+
+def pdf_to_documents(pdf_path: Path, page_range: Optional[Tuple[int, Optional[int]]] = None) -> List[Document]:
+    return list(iter_pdf_documents(pdf_path, page_range))
+
+
+def txt_chunking() -> dict:
+    """chunk_spans arguments for TXT files (part of the ingest chunking params)."""
+    if TXT_CHUNK_UNIT == "tokens":
+        return {"size": TXT_CHUNK_TOKENS, "overlap": TXT_CHUNK_OVERLAP_TOKENS, "unit": "tokens"}
+    return {"size": CHUNK_SIZE, "overlap": CHUNK_OVERLAP, "unit": "chars"}
+
+
+def txt_to_documents(txt_path: Path) -> List[Document]:
+    text = txt_path.read_text(encoding="utf-8", errors="ignore")
+    # offsets first; each chunk string is sliced once, straight into its Document
+    return [
+        Document(
+            page_content=text[start:end],
+            metadata={"source": txt_path.name, "page": None, "chunk_idx": i},
+        )
+        for i, (start, end) in enumerate(chunk_spans(text, **txt_chunking()))
+    ]
+
+
+def local_source_files(root: Path = DOCS_DIR) -> List[Path]:
+    """PDF/TXT files under `root`, in a stable order."""
+    if not root.exists():
+        return []
+    return sorted(p for p in root.iterdir() if p.suffix.lower() in {".pdf", ".txt"})
+
+
+def file_to_documents(p: Path) -> List[Document]:
+    return pdf_to_documents(p) if p.suffix.lower() == ".pdf" else txt_to_documents(p)
+
+
+# -------------------- Task-based (parallel) extraction --------------------
+def plan_tasks(files: List[Path], pages_per_task: int = PDF_PAGES_PER_TASK) -> Iterator[Task]:
+    for p in files:
+        if p.suffix.lower() != ".pdf" or pages_per_task <= 0:
+            yield str(p), 0, None, True
+            continue
+        n = max(pdf_page_count(p), 1)
+        for start in range(0, n, pages_per_task):
+            yield str(p), start, start + pages_per_task, start + pages_per_task >= n
+
+
+def _run_task(task: Task) -> List[Document]:
+    path, start, end, _ = task
+    p = Path(path)
+    if p.suffix.lower() == ".pdf":
+        return pdf_to_documents(p, (start, end))
+    return txt_to_documents(p)
+
+
+def iter_task_documents(
+    files: List[Path],
+    workers: int = DOC_WORKERS,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> Iterator[Tuple[Path, List[Document], bool]]:
+    """Yield (file, documents, last_task_of_file) per task, in `files` order.
+
+    With workers > 1 at most 2 * workers tasks are in flight, so results never
+    pile up faster than the consumer drains them.
+    """
+    tasks = plan_tasks(files, pages_per_task)
+    if workers <= 1:
+        for task in tasks:
+            yield Path(task[0]), _run_task(task), task[3]
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = deque((t, pool.submit(_run_task, t)) for t in itertools.islice(tasks, 2 * workers))
+        while window:
+            task, fut = window.popleft()
+            nxt = next(tasks, None)
+            if nxt is not None:
+                window.append((nxt, pool.submit(_run_task, nxt)))
+            yield Path(task[0]), fut.result(), task[3]
+
+
+def iter_file_documents(
+    files: List[Path],
+    workers: int = DOC_WORKERS,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> Iterator[Tuple[Path, List[Document]]]:
+    """Yield (file, documents) per file, in `files` order, parsing on `workers` processes."""
+    batch: List[Document] = []
+    for p, docs, last in iter_task_documents(files, workers, pages_per_task):
+        batch.extend(docs)
+        if last:
+            yield p, batch
+            batch = []
+
+
+def iter_local_docs(workers: int = DOC_WORKERS) -> Iterator[Document]:
+    """Stream chunks of every PDF/TXT under ./docs."""
+    for _, docs, _ in iter_task_documents(local_source_files(), workers=workers):
+        yield from docs
+
+
+def load_local_docs(workers: int = DOC_WORKERS) -> List[Document]:
+    """Load PDFs/TXTs from ./docs. No fallback content."""
+    return list(iter_local_docs(workers))
@@ -0,0 +1,78 @@
+"""
+asyncio micro-batcher for query embeddings.
+
+Concurrent callers of `await batcher.embed_query(text)` are collected for up to
+`max_wait_ms` (or until `max_batch` texts are waiting) and sent to the backing
+embedder as one `embed_documents` request; each caller gets its own vector back.
+Duplicate texts in a batch are embedded once.
+
+For OpenAI text-embedding-3 models `embed_query` and `embed_documents` return the
+same vectors, so batching does not change retrieval results.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingMicroBatcher:
+    def __init__(self, embedder: Embeddings, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()  # running batches; the loop only keeps weak references
+        self.requests = 0     # embed_query calls
+        self.batches = 0      # backend embed_documents calls
+        self.largest_batch = 0
+
+    async def embed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((text, fut))
+        self.requests += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await fut
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "avg_batch": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(t for t, _ in batch))  # de-duplicate, keep order
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(texts))
+        try:
+            vectors = await self.embedder.aembed_documents(texts)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        except BaseException:  # CancelledError (e.g. loop shutdown): no caller may wait forever
+            for _, fut in batch:
+                fut.cancel()
+            raise
+        by_text = dict(zip(texts, vectors))
+        for t, fut in batch:
+            if not fut.done():  # caller may have been cancelled
+                fut.set_result(by_text[t])
@@ -0,0 +1,119 @@
+"""
+On-disk embedding cache shared by the RAG demos.
+
+Wrap any LangChain embedder and identical text is embedded only once, across runs
+and across scripts:
+
+    emb = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"))
+
+Vectors live in SQLite keyed by (model, dimensions, sha256(text)) as float16 (or
+float32) blobs. Only cache misses are sent to the backing embedder, de-duplicated
+and in one batch. `stats()` exposes hit/miss/byte counters.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".embed_cache.sqlite")
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")  # float16 | float32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    dim   INTEGER NOT NULL,
+    sha   BLOB NOT NULL,
+    dtype TEXT NOT NULL,
+    vec   BLOB NOT NULL,
+    PRIMARY KEY (model, dim, sha)
+) WITHOUT ROWID
+"""
+_SQL_VARS = 500  # stay well below SQLite's bound-parameter limit
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        backing: Embeddings,
+        path: str = EMBED_CACHE_PATH,
+        dtype: str = EMBED_CACHE_DTYPE,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+    ):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"dtype must be float16 or float32, got {dtype!r}")
+        self.backing = backing
+        self.dtype = dtype
+        self.model = model or getattr(backing, "model", None) or type(backing).__name__
+        # 0 = the model's native size; part of the key so shortened vectors never mix
+        self.dimensions = dimensions or getattr(backing, "dimensions", None) or 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.bytes_read = self.bytes_written = 0
+
+    # ---- LangChain Embeddings interface ----
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.backing.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], lambda miss: [self.backing.embed_query(t) for t in miss])[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+    # ---- internals ----
+    def _embed(self, texts: List[str], compute) -> List[List[float]]:
+        shas = [hashlib.sha256(t.encode("utf-8")).digest() for t in texts]
+        found = self._load(set(shas))
+
+        # de-duplicate misses so repeated text in one batch is embedded once
+        missing: Dict[bytes, str] = {}
+        for sha, t in zip(shas, texts):
+            if sha not in found and sha not in missing:
+                missing[sha] = t
+        if missing:
+            vectors = compute(list(missing.values()))
+            # round-trip through the storage dtype so a hit and a miss return the same numbers
+            fresh = {sha: np.asarray(v, dtype=self.dtype) for sha, v in zip(missing, vectors)}
+            self._store(fresh)
+            found.update((sha, v.astype(np.float32)) for sha, v in fresh.items())
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        return [found[sha].tolist() for sha in shas]
+
+    def _load(self, shas: set) -> Dict[bytes, np.ndarray]:
+        out: Dict[bytes, np.ndarray] = {}
+        keys = list(shas)
+        with self._lock:
+            for start in range(0, len(keys), _SQL_VARS):
+                part = keys[start:start + _SQL_VARS]
+                rows = self._conn.execute(
+                    f"SELECT sha, dtype, vec FROM embeddings WHERE model=? AND dim=? "
+                    f"AND sha IN ({','.join('?' * len(part))})",
+                    [self.model, self.dimensions, *part],
+                ).fetchall()
+                for sha, dtype, blob in rows:
+                    out[sha] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+                    self.bytes_read += len(blob)
+        return out
+
+    def _store(self, fresh: Dict[bytes, np.ndarray]) -> None:
+        rows = [(self.model, self.dimensions, sha, self.dtype, vec.tobytes()) for sha, vec in fresh.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            self.bytes_written += sum(len(r[4]) for r in rows)
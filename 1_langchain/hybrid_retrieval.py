@@ -0,0 +1,286 @@
+"""
+Hybrid retrieval for the PDF RAG: in-process BM25 + dense vectors, fused with
+reciprocal-rank fusion (RRF) and optionally diversified with MMR.
+
+Dense search misses exact identifiers (error codes, API names like
+`Array.prototype.map` or `NullPointerException`); BM25 nails them. The BM25 index
+is maintained by ingest next to the vectors and persisted as JSONL; postings are
+built into flat NumPy arrays with the BM25 weight precomputed per posting, so a
+query is a handful of vectorized scatter-adds plus an argpartition. `build()` (run
+at the end of ingest) rebuilds the postings outside the lock and swaps them in, so
+searches keep answering from the previous postings meanwhile and never build.
+Built postings are saved next to the JSONL and memory-mapped by later processes,
+so a restart doesn't rebuild them.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from ingest_manifest import chunk_id
+
+# identifiers stay whole ("array.prototype.map", "err_404", "utf-8"); their parts are indexed too
+_TOKEN = re.compile(r"[a-z0-9_]+(?:[.\-:][a-z0-9_]+)*")
+_COMPOUND = re.compile(r"[a-z0-9]+(?:[_.\-:][a-z0-9]+)+")  # separators inside a word, not "failed." or "later:"
+_SEP = re.compile(r"[.\-:_]")
+TOKENIZER_VERSION = 2  # part of the postings fingerprint: a tokenizer change rebuilds saved postings
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower()
+    out = _TOKEN.findall(text)
+    for tok in _COMPOUND.findall(text):  # identifiers only; plain prose has no internal separators
+        out.extend(p for p in _SEP.split(tok) if p)
+    return out
+
+
+def doc_key(d: Document) -> str:
+    """Stable key for fusing hits from both retrievers (the ingest chunk ID when possible)."""
+    if d.id:
+        return d.id
+    md = d.metadata or {}
+    if "source" in md and "chunk_idx" in md:
+        page = md.get("page")  # Pinecone hands numbers back as floats
+        return chunk_id(md["source"], None if page is None else int(page), int(md["chunk_idx"]), d.page_content)
+    return chunk_id("?", None, 0, d.page_content)
+
+
+# (row ids, vocab, CSR offsets, posting doc rows, posting weights)
+Postings = Tuple[List[str], Dict[str, int], np.ndarray, np.ndarray, np.ndarray]
+
+
+class BM25Index:
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.path = Path(path) if path else None
+        self.k1, self.b = k1, b
+        self._docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+        self._ids: List[str] = []   # row -> id of the postings searches use
+        self._vocab: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._post_docs = np.zeros(0, dtype=np.int32)
+        self._post_w = np.zeros(0, dtype=np.float32)
+        self._version = 0    # bumped by add/remove
+        self._dirty = False  # postings lag behind the docs
+        self._unsaved = False
+        if self.path and self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    self._docs[rec["id"]] = (rec["text"], rec["metadata"])
+            self._dirty = not self._load_postings()
+            self.build()  # postings missing or stale: rebuild once now rather than on a query
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        with self._lock:
+            for i, t, md in zip(ids, texts, metadatas):
+                self._docs[i] = (t, dict(md))
+            self._version += 1
+            self._dirty = self._unsaved = True
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for i in ids:
+                if self._docs.pop(i, None) is not None:
+                    self._version += 1
+                    self._dirty = self._unsaved = True
+
+    def save(self) -> None:
+        if not self.path or not self._unsaved:
+            return
+        with self._lock:
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for i, (t, md) in self._docs.items():
+                    f.write(json.dumps({"id": i, "text": t, "metadata": md}) + "\n")
+            os.replace(tmp, self.path)
+            self._unsaved = False
+
+    def build(self) -> None:
+        """Rebuild and persist the postings if add/remove changed the documents; until then
+        searches answer from the previous postings."""
+        with self._lock:
+            if not self._dirty:
+                return
+            version, docs = self._version, [(i, t) for i, (t, _) in self._docs.items()]
+        postings = self._build(docs)  # the slow part; searches use the old postings meanwhile
+        with self._lock:
+            self._ids, self._vocab, self._offsets, self._post_docs, self._post_w = postings
+            self._dirty = self._version != version
+        self._save_postings(postings)
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[Document, float]]:
+        """Top `k` documents by BM25 over the postings of the last `build()`."""
+        with self._lock:
+            terms = [self._vocab[t] for t in set(tokenize(query)) if t in self._vocab]
+            if not terms or not self._ids:
+                return []
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for tid in terms:
+                lo, hi = self._offsets[tid], self._offsets[tid + 1]
+                scores[self._post_docs[lo:hi]] += self._post_w[lo:hi]  # doc ids are unique per term
+            k = min(k, int(np.count_nonzero(scores)))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            out = []
+            for r in top:
+                i = self._ids[r]
+                if i not in self._docs:
+                    continue  # removed since the postings were built
+                text, md = self._docs[i]
+                out.append((Document(id=i, page_content=text, metadata=dict(md)), float(scores[r])))
+            return out
+
+    def _build(self, docs: List[Tuple[str, str]]) -> Postings:
+        """Flatten (id, text) pairs into CSR arrays with precomputed BM25 weights (one vectorized pass)."""
+        ids = [i for i, _ in docs]
+        vocab: Dict[str, int] = {}
+        vocab_get, rows, tids, tfs = vocab.setdefault, array("i"), array("i"), array("f")
+        lengths = np.zeros(len(ids), dtype=np.float32)
+        for row, (_, text) in enumerate(docs):
+            counts = Counter(tokenize(text))
+            lengths[row] = sum(counts.values())
+            rows.extend([row] * len(counts))
+            tids.extend([vocab_get(t, len(vocab)) for t in counts])
+            tfs.extend(counts.values())
+
+        n = max(len(ids), 1)
+        avgdl = max(float(lengths.mean()) if len(ids) else 1.0, 1e-6)
+        rows_a = np.frombuffer(rows, dtype=np.int32)
+        tids_a = np.frombuffer(tids, dtype=np.int32)
+        tf = np.frombuffer(tfs, dtype=np.float32)
+        order = np.argsort(tids_a, kind="stable")
+        df = np.bincount(tids_a, minlength=len(vocab))
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * lengths[rows_a] / avgdl)
+        weights = idf[tids_a] * tf * (self.k1 + 1.0) / (tf + norm)
+
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+        return ids, vocab, offsets, rows_a[order], weights[order].astype(np.float32)
+
+    # ---- postings persistence ----
+    def _postings_dir(self) -> Optional[Path]:
+        return self.path.with_name(self.path.name + ".postings") if self.path else None
+
+    def _fingerprint(self, ids: List[str]) -> str:
+        h = hashlib.sha256(f"{TOKENIZER_VERSION}:{self.k1}:{self.b}:{len(ids)}".encode())
+        for i in ids:
+            h.update(i.encode("utf-8") + b"\n")
+        return h.hexdigest()
+
+    def _save_postings(self, postings: Postings) -> None:
+        d = self._postings_dir()
+        if d is None:
+            return
+        ids, vocab, offsets, post_docs, post_w = postings
+        d.mkdir(parents=True, exist_ok=True)
+        # write-then-rename: other readers may have the old arrays memory-mapped
+        for name, arr in (("offsets", offsets), ("docs", post_docs), ("weights", post_w)):
+            np.save(d / f"{name}.tmp.npy", arr)
+            os.replace(d / f"{name}.tmp.npy", d / f"{name}.npy")
+        tmp = d / "meta.json.tmp"
+        tmp.write_text(json.dumps({"fingerprint": self._fingerprint(ids), "vocab": sorted(vocab, key=vocab.__getitem__)}))
+        os.replace(tmp, d / "meta.json")  # written last: arrays without meta are ignored
+
+    def _load_postings(self) -> bool:
+        """Map the saved postings if they match the loaded documents; False when a rebuild is needed."""
+        d = self._postings_dir()
+        if d is None or not (d / "meta.json").exists():
+            return False
+        meta = json.loads((d / "meta.json").read_text())
+        ids = list(self._docs)
+        if meta.get("fingerprint") != self._fingerprint(ids):
+            return False
+        self._ids = ids
+        self._vocab = {t: i for i, t in enumerate(meta["vocab"])}
+        self._offsets = np.load(d / "offsets.npy")
+        self._post_docs = np.load(d / "docs.npy", mmap_mode="r")
+        self._post_w = np.load(d / "weights.npy", mmap_mode="r")
+        return True
+
+
+# -------------------- Fusion --------------------
+def rrf_fuse(rankings: Sequence[Sequence[Document]], rrf_k: int = 60) -> List[Tuple[Document, float]]:
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, d in enumerate(ranking):
+            key = doc_key(d)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, d)
+    return sorted(((docs[k], s) for k, s in scores.items()), key=lambda x: x[1], reverse=True)
+
+
+def mmr_select(candidates: List[Tuple[Document, float]], k: int, lambda_mult: float = 0.7) -> List[Document]:
+    """Greedy MMR with token-set Jaccard as the redundancy measure (no extra embedding calls)."""
+    if len(candidates) <= k:
+        return [d for d, _ in candidates]
+    top = candidates[0][1] or 1.0
+    token_sets: List[Set[str]] = [set(tokenize(d.page_content)) for d, _ in candidates]
+    chosen: List[int] = []
+    remaining = list(range(len(candidates)))
+    while remaining and len(chosen) < k:
+        def mmr(i: int) -> float:
+            redundancy = max(
+                (len(token_sets[i] & token_sets[j]) / (len(token_sets[i] | token_sets[j]) or 1) for j in chosen),
+                default=0.0,
+            )
+            return lambda_mult * candidates[i][1] / top - (1.0 - lambda_mult) * redundancy
+        best = max(remaining, key=mmr)
+        chosen.append(best)
+        remaining.remove(best)
+    return [candidates[i][0] for i in chosen]
+
+
+def hybrid_search(
+    query: str,
+    query_vector: Sequence[float],
+    vectorstore: VectorStore,
+    bm25: BM25Index,
+    k: int = 4,
+    fetch_k: int = 20,
+    rrf_k: int = 60,
+    mmr_lambda: Optional[float] = None,
+    **search_kwargs: Any,
+) -> List[Document]:
+    dense = vectorstore.similarity_search_by_vector(query_vector, k=fetch_k, **search_kwargs)
+    sparse = [d for d, _ in bm25.search(query, k=fetch_k)]
+    fused = rrf_fuse([dense, sparse], rrf_k=rrf_k)
+    if mmr_lambda is not None:
+        return mmr_select(fused[:fetch_k], k, mmr_lambda)
+    return [d for d, _ in fused[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """BaseRetriever wrapper so the hybrid search works anywhere a retriever is expected."""
+
+    vectorstore: VectorStore
+    bm25: Any  # BM25Index
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    mmr_lambda: Optional[float] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        qv = self.vectorstore.embeddings.embed_query(query)
+        return hybrid_search(
+            query, qv, self.vectorstore, self.bm25, self.k, self.fetch_k, self.rrf_k, self.mmr_lambda
+        )
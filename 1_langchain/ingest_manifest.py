@@ -0,0 +1,123 @@
+"""
+Persistent ingest manifest for the RAG demos.
+
+Tracks, per source file, the content hash, the chunking parameters used and the
+IDs of the chunks written to the vector store. A restart only parses, embeds and
+upserts files whose content or chunking parameters changed, and deletes vectors
+for chunks (or whole files) that disappeared.
+
+Files still being ingested live under "pending" with the IDs upserted so far, so an
+interrupted ingest resumes without re-embedding those chunks.
+
+"generation" is bumped by every ingest that changed the index; query caches use it
+(via `GenerationWatcher`) to drop results computed against older content.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, page: Optional[int], chunk_idx: int, text: str) -> str:
+    """Deterministic vector ID: same chunk of the same file → same ID on every run."""
+    page_part = "na" if page is None else str(page)
+    return f"{source}:{page_part}:{chunk_idx}:{text_sha256(text)[:16]}"
+
+
+class IngestManifest:
+    """JSON file mapping source key -> {sha256, params, ids} (+ in-progress "pending")."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.generation = 0
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == MANIFEST_VERSION:
+                self.files = data.get("files", {})
+                self.pending = data.get("pending", {})
+                self.generation = data.get("generation", 0)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.files.get(key)
+
+    def is_current(self, key: str, sha256: str, params: Dict[str, Any]) -> bool:
+        entry = self.files.get(key)
+        return bool(entry) and entry["sha256"] == sha256 and entry["params"] == params
+
+    def update(self, key: str, sha256: str, params: Dict[str, Any], ids: List[str]) -> None:
+        self.files[key] = {"sha256": sha256, "params": params, "ids": ids}
+
+    def remove(self, key: str) -> List[str]:
+        entry = self.files.pop(key, None)
+        partial = self.pending.pop(key, None)
+        ids = set(entry["ids"]) if entry else set()
+        return sorted(ids | set(partial["done"] if partial else []))
+
+    # ---- resumable progress for files being ingested ----
+    def begin(self, key: str, sha256: str, params: Dict[str, Any], resume: bool = True) -> Set[str]:
+        """Start (or resume) a file; returns IDs already upserted by an interrupted run."""
+        entry = self.pending.get(key)
+        if not (resume and entry and entry["sha256"] == sha256 and entry["params"] == params):
+            entry = {"sha256": sha256, "params": params, "done": []}
+            self.pending[key] = entry
+        return set(entry["done"])
+
+    def mark_done(self, key: str, ids: List[str]) -> None:
+        self.pending[key]["done"].extend(ids)
+
+    def finish(self, key: str, ids: List[str]) -> None:
+        entry = self.pending.pop(key)
+        self.update(key, entry["sha256"], entry["params"], ids)
+
+    def keys(self) -> List[str]:
+        return list(self.files.keys() | self.pending.keys())
+
+    def save(self) -> None:
+        # write-then-rename so a crash never leaves a truncated manifest behind
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        data = {
+            "version": MANIFEST_VERSION,
+            "generation": self.generation,
+            "files": self.files,
+            "pending": self.pending,
+        }
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class GenerationWatcher:
+    """Cheap `generation` reader for hot paths: re-reads the manifest only when its mtime changes."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._mtime_ns: Optional[int] = None
+        self._generation = 0
+
+    def __call__(self) -> int:
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns != self._mtime_ns:
+            self._mtime_ns = mtime_ns
+            self._generation = IngestManifest(str(self.path)).generation if mtime_ns is not None else 0
+        return self._generation
@@ -0,0 +1,478 @@
+"""
+Durable question → answer → id store for react_pattern_with_knowledgebase.
+
+SQLite (`KB_STORE_PATH`) is the source of truth; the vector collection (persistent
+Chroma) holds the normalized QUESTION vectors under the same ids, with answer and id
+in metadata. Startup reads the table once and rebuilds the in-memory maps:
+
+- exact: 64-bit hash of the normalized question -> id
+- ids:   id -> slot in the per-entry arrays (hits, last use, expiry, bytes)
+
+Answers stay on disk and are read by primary key on a hit, so a million cached
+entries cost keys only in memory (see `python -m benchmarks.bench_kb_startup`).
+
+Eviction applies to all three tiers at once (row, maps, vector): entries expire after
+their TTL (`KB_TTL_SECONDS`, or per `upsert`), and once the store holds more than
+`KB_MAX_ENTRIES` records or `KB_MAX_BYTES` of text it drops the least recently used
+(`KB_EVICTION=lru`) or least often hit (`lfu`) entries, down to 99% of the limit so
+one scan covers many inserts. The entry being written is never the one dropped, and LFU
+ages its counts: a new entry starts at the highest count evicted so far, so a full store
+of once-popular entries still makes room for new ones. `invalidate(ids)` and `invalidate_prefix(prefix)` remove
+entries explicitly; `stats()` counts hits/misses per tier and evictions per reason.
+Hit counts and last-use times are kept in memory and written back by `flush()`.
+
+Crash consistency: a record is committed with indexed=0 before it is written to the
+vector store and flagged indexed=1 afterwards; rows still at 0 on startup are
+re-indexed. Deletes go to SQLite first, so vector hits whose id is not in the table
+are stale and must be ignored (`contains`).
+
+    store = KBStore("kb_store.sqlite", vectorstore=kb, max_entries=100_000)
+    rid = store.upsert("What is RAG?", "Retrieval-augmented generation ...", q_norm="what is rag")
+    store.get_exact("what is rag").answer
+    store.get(rid).answer
+    store.get_many(["10000", "10001"])   # {id: KBRecord} for the ids that exist
+    store.invalidate_prefix("what is")
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+KB_STORE_PATH = os.getenv("KB_STORE_PATH", "kb_store.sqlite")
+KB_MAX_ENTRIES = int(os.getenv("KB_MAX_ENTRIES", "0"))      # 0 = unlimited
+KB_MAX_BYTES = int(os.getenv("KB_MAX_BYTES", "0"))          # question + answer text, 0 = unlimited
+KB_EVICTION = os.getenv("KB_EVICTION", "lru")
+KB_TTL_SECONDS = float(os.getenv("KB_TTL_SECONDS", "0"))    # 0 = never expire
+
+POLICIES = ("lru", "lfu")
+TIERS = ("exact", "id", "semantic")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS kb_records (
+        id       TEXT PRIMARY KEY,
+        q_hash   INTEGER NOT NULL,   -- q_hash(q_norm), so startup never re-hashes
+        q_norm   TEXT NOT NULL UNIQUE,
+        question TEXT NOT NULL,
+        answer   TEXT NOT NULL,
+        created  REAL NOT NULL,
+        indexed  INTEGER NOT NULL DEFAULT 0   -- 1 once the question vector is in the vector store
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS kb_records_pending ON kb_records (indexed) WHERE indexed = 0",
+)
+# columns added after the first release: name -> definition
+_COLUMNS = {
+    "hits": "INTEGER NOT NULL DEFAULT 0",
+    "last_used": "REAL NOT NULL DEFAULT 0",
+    "expires": "REAL NOT NULL DEFAULT 0",   # epoch seconds, 0 = never
+    "nbytes": "INTEGER NOT NULL DEFAULT 0",
+}
+_SQL_VARS = 500  # stay well below SQLite's bound-parameter limit
+_EVICT_TO = 0.99  # evict down to this fraction of a limit
+
+
+def q_hash(q_norm: str) -> int:
+    return int.from_bytes(hashlib.blake2b(q_norm.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _nbytes(*texts: str) -> int:
+    return sum(len(t.encode("utf-8")) for t in texts)
+
+
+def add_vectors(
+    vs: VectorStore, texts: List[str], vectors: Sequence[Sequence[float]], metadatas: List[dict], ids: List[str]
+) -> None:
+    """Upsert pre-computed vectors. langchain_chroma only offers add_texts (which embeds again), so Chroma
+    is written through its collection; LocalVectorStore has add_embeddings."""
+    if hasattr(vs, "add_embeddings"):
+        vs.add_embeddings(texts, [list(v) for v in vectors], metadatas, ids)
+    elif hasattr(vs, "_collection"):
+        vs._collection.upsert(ids=ids, embeddings=[list(v) for v in vectors], metadatas=metadatas, documents=texts)
+    else:
+        vs.add_texts(texts, metadatas=metadatas, ids=ids)
+
+
+def relevance_search_by_vector(vs: VectorStore, vector: Sequence[float], k: int = 4) -> List[Tuple[Document, float]]:
+    """`similarity_search_with_relevance_scores` for an already embedded query (same 0..1 scale)."""
+    if hasattr(vs, "similarity_search_by_vector_with_relevance_scores"):  # Chroma: raw distances
+        pairs = vs.similarity_search_by_vector_with_relevance_scores(list(vector), k=k)
+    else:
+        pairs = vs.similarity_search_with_score_by_vector(list(vector), k=k)
+    relevance = vs._select_relevance_score_fn()
+    return [(doc, relevance(score)) for doc, score in pairs]
+
+
+@dataclass
+class KBRecord:
+    id: str
+    question: str
+    answer: str
+
+
+class KBStore:
+    def __init__(
+        self,
+        path: str = KB_STORE_PATH,
+        vectorstore: Optional[VectorStore] = None,
+        id_start: int = 10000,
+        max_entries: int = KB_MAX_ENTRIES,
+        max_bytes: int = KB_MAX_BYTES,
+        policy: str = KB_EVICTION,
+        ttl_seconds: float = KB_TTL_SECONDS,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.path = path
+        self.vectorstore = vectorstore
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+        self._migrate()
+        self._lock = threading.RLock()
+        self._exact: Dict[int, str] = {}
+        self._ids: Dict[str, int] = {}
+        # per-slot arrays; a slot is reused once its entry is gone
+        self._slot_id: List[Optional[str]] = []
+        self._used_slot = np.zeros(0, dtype=bool)
+        self._qh = np.zeros(0, dtype=np.int64)
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._last = np.zeros(0, dtype=np.float64)
+        self._expires = np.zeros(0, dtype=np.float64)   # inf = never
+        self._size = np.zeros(0, dtype=np.int64)
+        self._free: List[int] = []
+        self._dirty: Set[int] = set()                   # slots whose hits/last_used are not on disk yet
+        self._bytes = 0
+        self._next_expiry = math.inf
+        self._age = 0                                   # LFU: starting count of new entries
+        self._next_id = id_start
+        self.hits = dict.fromkeys(TIERS, 0)
+        self.misses = dict.fromkeys(TIERS, 0)
+        self.evictions = {"capacity": 0, "expired": 0, "invalidated": 0}
+        t0 = time.perf_counter()
+        self._load()
+        self.load_seconds = time.perf_counter() - t0
+        self.repaired = self.repair()
+
+    def _migrate(self) -> None:
+        have = {row[1] for row in self._conn.execute("PRAGMA table_info(kb_records)")}
+        with self._conn:
+            for name, definition in _COLUMNS.items():
+                if name not in have:
+                    self._conn.execute(f"ALTER TABLE kb_records ADD COLUMN {name} {definition}")
+            if "nbytes" not in have:
+                self._conn.execute("UPDATE kb_records SET nbytes = length(CAST(question || answer || q_norm AS BLOB))")
+
+    def _load(self) -> None:
+        (n,) = self._conn.execute("SELECT count(*) FROM kb_records").fetchone()
+        self._grow(n)
+        cur = self._conn.execute("SELECT id, q_hash, hits, last_used, expires, nbytes FROM kb_records")
+        s = 0
+        while True:
+            rows = cur.fetchmany(100_000)[:n - s]  # rows added meanwhile by another process: next start
+            if not rows:
+                break
+            ids, qh, hits, last, expires, size = zip(*rows)
+            part = slice(s, s + len(rows))
+            self._qh[part], self._hits[part], self._last[part], self._expires[part], self._size[part] = (
+                qh, hits, last, expires, size)
+            self._exact.update(zip(qh, ids))
+            self._ids.update(zip(ids, range(s, s + len(rows))))
+            self._slot_id.extend(ids)
+            s += len(rows)
+        (top,) = self._conn.execute(
+            "SELECT max(CAST(id AS INTEGER)) FROM kb_records WHERE id <> '' AND id NOT GLOB '*[^0-9]*'").fetchone()
+        self._next_id = max(self._next_id, (top or 0) + 1)
+        self._used_slot[:s] = True
+        self._expires[self._expires <= 0] = math.inf
+        self._bytes = int(self._size.sum())
+        self._next_expiry = float(self._expires.min()) if s else math.inf
+        self._age = int(self._hits[:s].min()) if s else 0
+        self._enforce()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ---- reads ----
+    def contains(self, rid: str) -> bool:
+        return rid in self._ids
+
+    def get(self, rid: str, tier: str = "id") -> Optional[KBRecord]:
+        """Record by id (primary-key read, no embedding), counted as a hit/miss of `tier`
+        ("semantic" when the id came from a vector match)."""
+        with self._lock:
+            row = self._row(rid) if self._live(rid) else None
+            self._count(tier, row and rid)
+            return KBRecord(*row[:3]) if row else None
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, KBRecord]:
+        """Records for many ids in one query per 500 ids; ids that are not stored are left out."""
+        with self._lock:
+            want = list(dict.fromkeys(ids))
+            live = [rid for rid in want if self._live(rid)]
+            out: Dict[str, KBRecord] = {}
+            for i in range(0, len(live), _SQL_VARS):
+                part = live[i:i + _SQL_VARS]
+                for row in self._conn.execute(
+                        f"SELECT id, question, answer FROM kb_records WHERE id IN ({','.join('?' * len(part))})", part):
+                    out[row[0]] = KBRecord(*row)
+            for rid in want:
+                self._count("id", rid if rid in out else None)
+            return out
+
+    def get_exact(self, q_norm: str) -> Optional[KBRecord]:
+        with self._lock:
+            rid = self._exact.get(q_hash(q_norm))
+            row = self._row(rid) if rid is not None and self._live(rid) else None
+            if row is not None and row[3] != q_norm:  # 64-bit hash collision
+                row = None
+            self._count("exact", row and rid)
+            return KBRecord(*row[:3]) if row else None
+
+    def miss(self, tier: str) -> None:
+        """Count a miss that never reached the store (e.g. no vector match at all)."""
+        with self._lock:
+            self.misses[tier] += 1
+
+    # ---- writes ----
+    def next_id(self) -> str:
+        with self._lock:
+            rid = str(self._next_id)
+            self._next_id += 1
+            return rid
+
+    def upsert(
+        self,
+        question: str,
+        answer: str,
+        q_norm: str,
+        rid: Optional[str] = None,
+        ttl: Optional[float] = None,
+        vector: Optional[Sequence[float]] = None,
+    ) -> str:
+        """Store question→answer under `rid` (new numeric id if None), replacing any record with the same
+        question. `ttl` seconds overrides the store default; 0 = never expire. Pass the embedding of
+        `q_norm` as `vector` when it is already known, so the vector store does not embed it again.
+
+        The row and the in-memory maps are updated under the lock; the vector write happens after it
+        is released, so reads never wait on the vector store (a lost write is redone by `repair`)."""
+        with self._lock:
+            rid = rid or self.next_id()
+            if rid.isdigit():
+                self._next_id = max(self._next_id, int(rid) + 1)
+            h, now = q_hash(q_norm), time.time()
+            ttl = self.ttl_seconds if ttl is None else ttl
+            expires = now + ttl if ttl > 0 else 0
+            size = _nbytes(question, answer, q_norm)
+            replaced = [r for (r,) in self._conn.execute(
+                "SELECT id FROM kb_records WHERE q_norm = ? AND id != ?", (q_norm, rid))]
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO kb_records "
+                    "(id, q_hash, q_norm, question, answer, created, indexed, hits, last_used, expires, nbytes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                    (rid, h, q_norm, question, answer, now, self._age, now, expires, size),
+                )
+            for r in replaced + [rid]:
+                self._forget(r)
+            self._remember(rid, h, now, expires or math.inf, size)
+            self._enforce(keep=rid)
+        if replaced and self.vectorstore is not None:
+            self.vectorstore.delete(ids=replaced)
+        self._index([(rid, q_norm, answer)], None if vector is None else [vector])
+        return rid
+
+    def invalidate(self, ids: Iterable[str]) -> int:
+        """Remove records by id from every tier; returns how many existed."""
+        with self._lock:
+            return self._evict([rid for rid in ids if rid in self._ids], "invalidated")
+
+    def invalidate_prefix(self, prefix: str, field: str = "question") -> int:
+        """Remove records whose normalized question (field="question") or id (field="id") starts with `prefix`."""
+        column = {"question": "q_norm", "id": "id"}[field]
+        with self._lock:
+            ids = [r for (r,) in self._conn.execute(
+                f"SELECT id FROM kb_records WHERE {column} >= ? AND {column} < ?", (prefix, prefix + "\U0010ffff"))]
+            return self._evict(ids, "invalidated")
+
+    def expire(self) -> int:
+        """Drop expired entries now (reads and upserts also drop them as they go); returns how many."""
+        with self._lock:
+            before = self.evictions["expired"]
+            self._enforce()
+            return self.evictions["expired"] - before
+
+    def repair(self) -> int:
+        """Write rows a crash left out of the vector store (indexed=0); returns how many."""
+        if self.vectorstore is None:
+            return 0
+        with self._lock:
+            rows = self._conn.execute("SELECT id, q_norm, answer FROM kb_records WHERE indexed = 0").fetchall()
+            for i in range(0, len(rows), _SQL_VARS):
+                self._index(rows[i:i + _SQL_VARS])
+            return len(rows)
+
+    def flush(self) -> None:
+        """Write in-memory hit counts and last-use times back, so LRU/LFU order survives restarts."""
+        with self._lock:
+            rows = [(int(self._hits[s]), float(self._last[s]), self._slot_id[s]) for s in self._dirty]
+            self._dirty.clear()
+            with self._conn:
+                self._conn.executemany("UPDATE kb_records SET hits = ?, last_used = ? WHERE id = ?", rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"entries": len(self._ids), "bytes": self._bytes, "max_entries": self.max_entries,
+                    "max_bytes": self.max_bytes, "policy": self.policy, "hits": dict(self.hits),
+                    "misses": dict(self.misses), "evictions": dict(self.evictions),
+                    "load_seconds": self.load_seconds, "repaired": self.repaired}
+
+    # ---- internals (lock held) ----
+    def _count(self, tier: str, hit: Optional[str]) -> None:
+        """Count a lookup of `tier`; `hit` is the id found, or None for a miss."""
+        if hit is None:
+            self.misses[tier] += 1
+            return
+        self.hits[tier] += 1
+        s = self._ids[hit]
+        self._hits[s] += 1
+        self._last[s] = time.time()
+        self._dirty.add(s)
+
+    def _live(self, rid: str) -> bool:
+        s = self._ids.get(rid)
+        if s is None:
+            return False
+        if self._expires[s] <= time.time():
+            self._evict([rid], "expired")
+            return False
+        return True
+
+    def _remember(self, rid: str, h: int, last: float, expires: float, size: int) -> None:
+        if self._free:
+            s = self._free.pop()
+        else:
+            s = len(self._slot_id)
+            self._slot_id.append(None)
+            if s >= len(self._qh):
+                self._grow(max(1024, 2 * len(self._qh)))
+        self._slot_id[s] = rid
+        self._used_slot[s] = True
+        self._qh[s], self._hits[s], self._last[s], self._expires[s], self._size[s] = h, self._age, last, expires, size
+        self._ids[rid] = s
+        self._exact[h] = rid
+        self._bytes += size
+        self._next_expiry = min(self._next_expiry, expires)
+
+    def _grow(self, cap: int) -> None:
+        n = len(self._qh)
+
+        def grown(a: np.ndarray, fill) -> np.ndarray:
+            out = np.full(cap, fill, dtype=a.dtype)
+            out[:n] = a
+            return out
+
+        self._used_slot = grown(self._used_slot, False)
+        self._qh, self._hits, self._size = grown(self._qh, 0), grown(self._hits, 0), grown(self._size, 0)
+        self._last, self._expires = grown(self._last, 0.0), grown(self._expires, math.inf)
+
+    def _forget(self, rid: str) -> None:
+        s = self._ids.pop(rid, None)
+        if s is None:
+            return
+        h = int(self._qh[s])
+        if self._exact.get(h) == rid:
+            del self._exact[h]
+        self._bytes -= int(self._size[s])
+        self._slot_id[s] = None
+        self._used_slot[s] = False
+        self._expires[s] = math.inf
+        self._dirty.discard(s)
+        self._free.append(s)
+
+    def _evict(self, ids: List[str], reason: str) -> int:
+        """Delete from SQLite, then the vector store, then the in-memory maps."""
+        if not ids:
+            return 0
+        with self._conn:
+            for i in range(0, len(ids), _SQL_VARS):
+                part = ids[i:i + _SQL_VARS]
+                self._conn.execute(f"DELETE FROM kb_records WHERE id IN ({','.join('?' * len(part))})", part)
+        if self.vectorstore is not None:
+            self.vectorstore.delete(ids=ids)
+        for rid in ids:
+            self._forget(rid)
+        self.evictions[reason] += len(ids)
+        return len(ids)
+
+    def _enforce(self, keep: Optional[str] = None) -> None:
+        """Drop expired entries, then the lowest-ranked ones other than `keep` (the entry just
+        written) until both limits hold again. Each step scans the slot arrays only when there
+        is something to drop."""
+        n = len(self._slot_id)
+        now = time.time()
+        if self._next_expiry <= now:
+            expired = np.flatnonzero(self._expires[:n] <= now)
+            self._evict([self._slot_id[s] for s in expired], "expired")
+            self._next_expiry = float(self._expires[:n].min()) if n else math.inf
+        over_n = self.max_entries and len(self._ids) > self.max_entries
+        over_b = self.max_bytes and self._bytes > self.max_bytes
+        if not (over_n or over_b):
+            return
+        live = np.flatnonzero(self._used_slot[:n])
+        if keep in self._ids:
+            live = live[live != self._ids[keep]]
+        if self.policy == "lru":
+            order = live[np.argsort(self._last[live], kind="stable")]
+        else:  # fewest hits first, least recently used among equals
+            order = live[np.lexsort((self._last[live], self._hits[live]))]
+        k = len(self._ids) - int(self.max_entries * _EVICT_TO) if over_n else 0
+        if over_b:
+            freed = np.cumsum(self._size[order])
+            k = max(k, int(np.searchsorted(freed, self._bytes - self.max_bytes * _EVICT_TO)) + 1)
+        victims = order[:k]
+        if self.policy == "lfu" and len(victims):  # dynamic aging: newcomers start level with the evicted
+            self._age = max(self._age, int(self._hits[victims].max()))
+        self._evict([self._slot_id[s] for s in victims], "capacity")
+
+    def _index(self, rows: List[tuple], vectors: Optional[List[Sequence[float]]] = None) -> None:
+        """Write (id, q_norm, answer) rows to the vector store; needs no lock."""
+        if self.vectorstore is None or not rows:
+            return
+        texts = [q for _, q, _ in rows]
+        metadatas = [{"answer": a, "id": rid} for rid, _, a in rows]
+        ids = [rid for rid, _, _ in rows]
+        if vectors is None:
+            self.vectorstore.add_texts(texts, metadatas=metadatas, ids=ids)
+        else:
+            add_vectors(self.vectorstore, texts, vectors, metadatas, ids)
+        self._mark_indexed([(rid, q) for rid, q, _ in rows])
+
+    def _mark_indexed(self, rows: List[Tuple[str, str]]) -> None:
+        """Flag (id, q_norm) rows as indexed, unless the id was rewritten with another question meanwhile."""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE kb_records SET indexed = 1 WHERE id = ? AND q_norm = ?", rows)
+
+    def _row(self, rid: str) -> Optional[tuple]:
+        return self._conn.execute(
+            "SELECT id, question, answer, q_norm FROM kb_records WHERE id = ?", (rid,)).fetchone()
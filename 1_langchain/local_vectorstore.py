@@ -0,0 +1,301 @@
+"""
+Offline, NumPy-backed vector store: a drop-in for PineconeVectorStore in the RAG demos.
+
+- flat cosine index: vectors are L2-normalised float32 rows, a query is one
+  matrix-vector product plus `argpartition` top-k
+- optional persistence to a folder (vectors.npy + docs.jsonl); vectors are opened
+  memory-mapped, so a large index loads instantly and pages in on demand. Both files
+  are written to temp names and a `commit` marker before either is renamed, so a
+  crash mid-save is finished on the next load instead of pairing old and new files
+- metadata filtering with plain equality or a Pinecone-style subset
+  ({"source": "a.pdf"}, {"page": {"$in": [1, 2]}}, {"source": {"$ne": "b.pdf"}});
+  any other operator raises ValueError instead of matching everything
+- `similarity_search_batch_with_score_by_vectors` scores many queries with one matrix
+  product; `ids=` restricts a search to known rows without scanning metadata
+
+Works with everything the demos use: add_documents/add_texts(ids=...),
+delete(ids=...), as_retriever(search_kwargs={"k": 4, "filter": {...}}).
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda val, arg: val == arg,
+    "$ne": lambda val, arg: val != arg,
+    "$in": lambda val, arg: val in arg,
+    "$nin": lambda val, arg: val not in arg,
+}
+
+
+def _check_filter(flt: Dict[str, Any]) -> None:
+    for cond in flt.values():
+        if isinstance(cond, dict):
+            unknown = set(cond) - _OPS.keys()
+            if unknown:
+                raise ValueError(f"Unsupported filter operator(s) {sorted(unknown)}; supported: {sorted(_OPS)}")
+
+
+def _matches(md: Dict[str, Any], flt: Dict[str, Any]) -> bool:
+    for key, cond in flt.items():
+        val = md.get(key)
+        if isinstance(cond, dict):
+            if not all(_OPS[op](val, arg) for op, arg in cond.items()):
+                return False
+        elif val != cond:
+            return False
+    return True
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-8)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` best scores along the last axis, best first (argpartition, then sort k)."""
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, embedding: Embeddings, persist_dir: Optional[str] = None):
+        self._embedding = embedding
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metas: List[Dict[str, Any]] = []
+        self._pos: Dict[str, int] = {}
+        self._vecs = np.zeros((0, 0), dtype=np.float32)  # capacity-doubling buffer
+        self._n = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+        if self.persist_dir:
+            self._finish_save()
+        if self.persist_dir and (self.persist_dir / "vectors.npy").exists():
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ---- writes ----
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Upsert pre-computed vectors (existing IDs are overwritten in place)."""
+        if not texts:
+            return []
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        vecs = _normalize(embeddings)
+        with self._lock:
+            self._reserve(self._n + len(ids), vecs.shape[1])
+            for i, t, md, v in zip(ids, texts, metadatas, vecs):
+                row = self._pos.get(i)
+                if row is None:
+                    row = self._n
+                    self._pos[i] = row
+                    self._ids.append(i)
+                    self._texts.append(t)
+                    self._metas.append(dict(md))
+                    self._n += 1
+                else:
+                    self._texts[row] = t
+                    self._metas[row] = dict(md)
+                self._vecs[row] = v
+            self._dirty = True
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        with self._lock:
+            if kwargs.get("delete_all"):
+                gone = set(self._ids)
+            else:
+                gone = {i for i in ids or [] if i in self._pos}
+            if not gone:
+                return True
+            keep = [r for r, i in enumerate(self._ids) if i not in gone]
+            self._vecs = np.ascontiguousarray(self._vecs[keep]) if keep else self._vecs[:0].copy()
+            self._ids = [self._ids[r] for r in keep]
+            self._texts = [self._texts[r] for r in keep]
+            self._metas = [self._metas[r] for r in keep]
+            self._pos = {i: r for r, i in enumerate(self._ids)}
+            self._n = len(self._ids)
+            self._dirty = True
+        return True
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def get_by_ids(self, ids: List[str], /) -> List[Document]:
+        with self._lock:
+            return [self._doc(self._pos[i]) for i in ids if i in self._pos]
+
+    # ---- search ----
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        ids: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """`ids` restricts the search to those rows (no per-row metadata scan)."""
+        return self.similarity_search_batch_with_score_by_vectors([embedding], k, filter, ids)[0]
+
+    def similarity_search_batch_with_score_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        ids: Optional[Iterable[str]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Top-k for many query vectors with one matrix product."""
+        if filter:
+            _check_filter(filter)
+        with self._lock:
+            if self._n == 0 or not len(embeddings):
+                return [[] for _ in embeddings]
+            rows = None
+            if ids is not None:
+                rows = np.fromiter(sorted(self._pos[i] for i in set(ids) if i in self._pos), dtype=np.intp)
+            if filter:
+                cand = rows if rows is not None else range(self._n)
+                keep = np.fromiter((_matches(self._metas[r], filter) for r in cand), dtype=bool)
+                rows = np.asarray(cand, dtype=np.intp)[keep]
+            vecs = self._vecs[:self._n] if rows is None else self._vecs[rows]
+            sims = _normalize(np.asarray(embeddings)) @ vecs.T
+            out = []
+            for row_sims, top in zip(sims, top_k(sims, k)):
+                out.append([
+                    (self._doc(int(r if rows is None else rows[r])), float(row_sims[r])) for r in top
+                ])
+            return out
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # cosine similarity [-1, 1] → relevance [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        persist_dir: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding, persist_dir=persist_dir)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    # ---- persistence ----
+    def save(self) -> None:
+        if not self.persist_dir or not self._dirty:
+            return
+        with self._lock:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            tmp_vecs = self.persist_dir / "vectors.tmp.npy"
+            tmp_docs = self.persist_dir / "docs.jsonl.tmp"
+            with open(tmp_vecs, "wb") as f:
+                np.save(f, self._vecs[:self._n])
+                os.fsync(f.fileno())
+            with open(tmp_docs, "w", encoding="utf-8") as f:
+                for i, t, md in zip(self._ids, self._texts, self._metas):
+                    f.write(json.dumps({"id": i, "text": t, "metadata": md}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            # both temp files are complete: from here on the save is rolled forward after a crash
+            (self.persist_dir / "commit").touch()
+            self._finish_save()
+            self._dirty = False
+
+    def _finish_save(self) -> None:
+        """Rename a committed pair of temp files into place (also after a crash between the renames)."""
+        d = self.persist_dir
+        if not (d / "commit").exists():
+            for tmp in ("vectors.tmp.npy", "docs.jsonl.tmp"):  # an unfinished save: keep the old pair
+                (d / tmp).unlink(missing_ok=True)
+            return
+        for tmp, final in (("vectors.tmp.npy", "vectors.npy"), ("docs.jsonl.tmp", "docs.jsonl")):
+            if (d / tmp).exists():
+                os.replace(d / tmp, d / final)
+        (d / "commit").unlink()
+
+    def _load(self) -> None:
+        # mmap: the OS pages vectors in as queries touch them; copied on first write
+        self._vecs = np.load(self.persist_dir / "vectors.npy", mmap_mode="r")
+        with open(self.persist_dir / "docs.jsonl", encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                self._ids.append(rec["id"])
+                self._texts.append(rec["text"])
+                self._metas.append(rec["metadata"])
+        self._pos = {i: r for r, i in enumerate(self._ids)}
+        self._n = len(self._ids)
+
+    # ---- internals ----
+    def _reserve(self, n: int, dim: int) -> None:
+        cap, have_dim = self._vecs.shape if self._vecs.ndim == 2 else (0, 0)
+        if self._n and have_dim != dim:
+            raise ValueError(f"Index has dimension {have_dim}, got vectors of dimension {dim}.")
+        if n <= cap and not isinstance(self._vecs, np.memmap):
+            return
+        grown = np.zeros((max(n, 2 * cap, 64), dim), dtype=np.float32)
+        if self._n:
+            grown[:self._n] = self._vecs[:self._n]
+        self._vecs = grown
+
+    def _doc(self, row: int) -> Document:
+        return Document(id=self._ids[row], page_content=self._texts[row], metadata=dict(self._metas[row]))
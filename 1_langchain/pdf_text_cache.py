@@ -0,0 +1,168 @@
+"""
+On-disk cache of extracted PDF page text, keyed by file content hash + extractor version.
+
+PDF parsing dominates cold start; the text of an unchanged PDF never changes, so
+each page is extracted once and stored as a zlib-compressed row in SQLite:
+
+    pages = pdf_pages("docs/guide.pdf")                       # PyMuPDF, all pages
+    pages = pdf_pages("irctc.pdf", extractor="pypdf2")        # PyPDF2 text, cached separately
+    n = pdf_page_count("docs/guide.pdf")                      # no PDF open on a warm cache
+
+Re-chunking with new splitter settings reads from here instead of re-parsing.
+Upgrading PyMuPDF/PyPDF2 changes the extractor version and so re-extracts.
+The PDF libraries are imported only on a cache miss; this module is stdlib-only so
+it stays cheap to import in process-pool workers.
+"""
+
+import os
+import sqlite3
+import threading
+import zlib
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ingest_manifest import file_sha256
+
+PDF_TEXT_CACHE_PATH = os.getenv("PDF_TEXT_CACHE_PATH", ".pdf_text_cache.sqlite")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS pdf_files (
+        sha       TEXT NOT NULL,
+        extractor TEXT NOT NULL,
+        pages     INTEGER NOT NULL,
+        PRIMARY KEY (sha, extractor)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pdf_pages (
+        sha       TEXT NOT NULL,
+        extractor TEXT NOT NULL,
+        page      INTEGER NOT NULL,   -- 0-based
+        text      BLOB NOT NULL,      -- zlib(utf-8)
+        PRIMARY KEY (sha, extractor, page)
+    ) WITHOUT ROWID
+    """,
+)
+
+
+# -------------------- Extractors --------------------
+# name -> (distribution for the version string, fn(path, start, end) -> (page count, texts))
+def _pymupdf(path: str, start: int, end: Optional[int]) -> Tuple[int, List[str]]:
+    import fitz  # PyMuPDF
+    with fitz.open(path) as pdf:
+        n = len(pdf)
+        return n, [pdf[i].get_text("text") for i in range(start, min(n, end if end is not None else n))]
+
+
+def _pypdf2(path: str, start: int, end: Optional[int]) -> Tuple[int, List[str]]:
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    n = len(reader.pages)
+    return n, [reader.pages[i].extract_text() or "" for i in range(start, min(n, end if end is not None else n))]
+
+
+EXTRACTORS: Dict[str, Tuple[str, Callable[[str, int, Optional[int]], Tuple[int, List[str]]]]] = {
+    "pymupdf": ("PyMuPDF", _pymupdf),
+    "pypdf2": ("PyPDF2", _pypdf2),
+}
+
+
+@lru_cache(maxsize=None)
+def extractor_version(name: str) -> str:
+    dist, _ = EXTRACTORS[name]
+    try:
+        return f"{name}-{metadata.version(dist)}"
+    except metadata.PackageNotFoundError:
+        return f"{name}-unknown"
+
+
+@lru_cache(maxsize=256)
+def _sha_for(path: str, size: int, mtime_ns: int) -> str:
+    return file_sha256(Path(path))
+
+
+def _file_sha(path: str) -> str:
+    """Content hash, computed once per process per (path, size, mtime)."""
+    st = os.stat(path)
+    return _sha_for(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+# -------------------- Cache --------------------
+class PdfTextCache:
+    def __init__(self, path: str = PDF_TEXT_CACHE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # process-pool workers write concurrently
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0  # pages
+
+    def page_count(self, pdf_path, extractor: str = "pymupdf") -> int:
+        sha, version = _file_sha(str(pdf_path)), extractor_version(extractor)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM pdf_files WHERE sha = ? AND extractor = ?", (sha, version)
+            ).fetchone()
+        if row is not None:
+            return row[0]
+        n, _ = self._extract(str(pdf_path), sha, extractor, 0, 0)
+        return n
+
+    def pages(self, pdf_path, extractor: str = "pymupdf", start: int = 0, end: Optional[int] = None) -> List[str]:
+        """Text of pages [start, end) (0-based; end None = to the last page)."""
+        path, sha, version = str(pdf_path), _file_sha(str(pdf_path)), extractor_version(extractor)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM pdf_files WHERE sha = ? AND extractor = ?", (sha, version)
+            ).fetchone()
+            if row is not None:
+                stop = min(row[0], end if end is not None else row[0])
+                rows = self._conn.execute(
+                    "SELECT text FROM pdf_pages WHERE sha = ? AND extractor = ? AND page >= ? AND page < ? "
+                    "ORDER BY page",
+                    (sha, version, start, stop),
+                ).fetchall()
+                if len(rows) == max(stop - start, 0):
+                    self.hits += len(rows)
+                    return [zlib.decompress(r[0]).decode("utf-8") for r in rows]
+        _, texts = self._extract(path, sha, extractor, start, end)
+        return texts
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _extract(self, path: str, sha: str, extractor: str, start: int, end: Optional[int]) -> Tuple[int, List[str]]:
+        version = extractor_version(extractor)
+        n, texts = EXTRACTORS[extractor][1](path, start, end)
+        with self._lock:
+            self.misses += len(texts)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pdf_files (sha, extractor, pages) VALUES (?, ?, ?)", (sha, version, n)
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pdf_pages (sha, extractor, page, text) VALUES (?, ?, ?, ?)",
+                    [(sha, version, start + i, zlib.compress(t.encode("utf-8"), 6)) for i, t in enumerate(texts)],
+                )
+        return n, texts
+
+
+@lru_cache(maxsize=None)
+def _cache_for(pid: int, path: str) -> PdfTextCache:
+    return PdfTextCache(path)
+
+
+def default_cache() -> PdfTextCache:
+    """One connection per process (SQLite connections must not cross a fork)."""
+    return _cache_for(os.getpid(), PDF_TEXT_CACHE_PATH)
+
+
+def pdf_pages(pdf_path, extractor: str = "pymupdf", start: int = 0, end: Optional[int] = None) -> List[str]:
+    return default_cache().pages(pdf_path, extractor, start, end)
+
+
+def pdf_page_count(pdf_path, extractor: str = "pymupdf") -> int:
+    return default_cache().page_count(pdf_path, extractor)
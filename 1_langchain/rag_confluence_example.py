@@ -1,28 +1,52 @@
 """
-Hybrid Confluence RAG with full fallback (no DB):
+Hybrid Confluence RAG with full fallback:
 - Step 1: Try CQL search (fast keyword-ish)
-- Step 2: If CQL empty → fetch *all accessible pages* (paginated) and semantic-rank them
+- Step 2: If CQL empty → top-k over the chunk-vector index (confluence_index.py) of the local page
+  mirror (confluence_mirror.py); both are synced incrementally when older than CONFLUENCE_SYNC_INTERVAL,
+  in a background thread while questions are answered from the last synced pages
+  (`python rag_confluence_example.py --sync` syncs in the foreground)
 """
 
 import os
+import sys
+import threading
 import time
+from functools import lru_cache
+
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from bs4 import BeautifulSoup
-from atlassian import Confluence
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from dotenv import load_dotenv
-import os
+
+from confluence_fetcher import ConfluenceFetcher
+from confluence_index import ConfluenceChunkIndex, IndexStats
+from confluence_mirror import ConfluenceMirror, SyncStats, page_version
+from context_packer import ContextPacker, PackStats, Passage
+from embedding_cache import CachedEmbeddings
+from local_vectorstore import top_k
+from retrieval_cache import RetrievalCache
+from text_chunker import chunk_spans
 
 # ========= CONFIG =========
 BASE_URL   = "https://yeramareddyranafsd.atlassian.net"
 EMAIL      = ""
 API_TOKEN = os.getenv("API_TOKEN")
 MAX_CQL_RESULTS   = 20      # how many from CQL
-MAX_ALL_PAGES     = 300     # limit for full fallback
+CONFLUENCE_CONCURRENCY = int(os.getenv("CONFLUENCE_CONCURRENCY", "4"))  # parallel requests
+CONFLUENCE_RATE   = float(os.getenv("CONFLUENCE_RATE", "10"))          # requests/second, 0 = unlimited
+CQL_CACHE_TTL     = float(os.getenv("CQL_CACHE_TTL", "300"))  # seconds a CQL result is reused
+CQL_CACHE_SIZE    = int(os.getenv("CQL_CACHE_SIZE", "1024"))
+MIRROR_SYNC_INTERVAL = float(os.getenv("CONFLUENCE_SYNC_INTERVAL", "3600"))  # seconds before the fallback re-syncs
+MIRROR_SYNC_RETRY = min(MIRROR_SYNC_INTERVAL, 300)  # seconds between background attempts after a failed sync
 CHUNK_SIZE        = 900
 CHUNK_OVERLAP     = 120
+CHUNK_UNIT        = os.getenv("CONFLUENCE_CHUNK_UNIT", "chars")  # chars | tokens
+CHUNK_TOKENS      = 224     # sizes when CHUNK_UNIT is tokens
+CHUNK_OVERLAP_TOKENS = 32
 TOP_K_CHUNKS      = 6
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
 EMBED_MODEL       = "text-embedding-3-small"
 CHAT_MODEL        = "gpt-4o-mini"
 # ==========================
@@ -33,21 +57,22 @@ def html_to_text(html: str) -> str:
     return BeautifulSoup(html or "", "html.parser").get_text("\n").strip()
 
 
-def chunk_text(text: str, size: int, overlap: int) -> List[str]:
-    chunks, n, start = [], len(text), 0
-    while start < n:
-        end = min(n, start + size)
-        ch = text[start:end]
-        if ch.strip():
-            chunks.append(ch)
-        if end == n:
-            break
-        start = max(0, end - overlap)
-    return chunks
+def page_chunks(text: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of a page's chunks (text_chunker: paragraph/sentence aware)."""
+    if CHUNK_UNIT == "tokens":
+        return chunk_spans(text, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, unit="tokens")
+    return chunk_spans(text, CHUNK_SIZE, CHUNK_OVERLAP)
 
 
-def confluence_client() -> Confluence:
-    return Confluence(url=BASE_URL, username=EMAIL, password=API_TOKEN, cloud=True)
+@lru_cache(maxsize=1)
+def confluence_client() -> ConfluenceFetcher:
+    # one pooled HTTP session per process, reused by every question and mirror sync
+    return ConfluenceFetcher(f"{BASE_URL}/wiki", username=EMAIL, password=API_TOKEN,
+                             concurrency=CONFLUENCE_CONCURRENCY, rate=CONFLUENCE_RATE)
+
+
+def page_url(space: str, pid: str, title: str) -> str:
+    return f"{BASE_URL}/wiki/spaces/{space}/pages/{pid}/{title.replace(' ', '+')}"
 
 
 def normalize_item(content: Dict[str, Any]) -> Tuple[str, str, str]:
@@ -56,105 +81,197 @@ def normalize_item(content: Dict[str, Any]) -> Tuple[str, str, str]:
     pid   = str(content.get("id") or "")
     html  = (((content.get("body") or {}).get("storage") or {}).get("value")) or ""
     text  = html_to_text(html)
-    url   = f"{BASE_URL}/wiki/spaces/{space}/pages/{pid}/{title.replace(' ', '+')}"
-    return title, url, text
+    return title, page_url(space, pid, title), text
 
 
 # ---------- Retrieval ----------
-def cql_search(conf: Confluence, query: str, limit: int) -> List[Dict[str, Any]]:
+# normalized question -> CQL results (exact tier of RetrievalCache, payload is the raw result list);
+# repeated questions skip the Confluence round trip until the TTL runs out
+cql_cache = RetrievalCache(max_entries=CQL_CACHE_SIZE, ttl_seconds=CQL_CACHE_TTL, similarity_threshold=None)
+
+
+def cql_search(conf: ConfluenceFetcher, query: str, limit: int) -> List[Dict[str, Any]]:
+    key = f"{limit} {query}"
+    cached = cql_cache.get_exact(key)
+    if cached is not None:
+        return cached
     try:
         res = conf.cql(f'text ~ "{query}" AND type=page',
-                       limit=limit, expand="content.body.storage,content.space") or {}
-        return res.get("results", [])
+                       limit=limit, expand="content.body.storage,content.space,content.version") or {}
     except Exception as e:
         print("⚠️ CQL failed:", e)
-        return []
+        return []  # not cached, the next question retries
+    results = res.get("results", [])
+    cql_cache.put(key, results)
+    return results
 
 
-def fetch_all_pages(conf: Confluence, max_pages=300) -> List[Dict[str, Any]]:
-    """
-    Page through all Confluence pages up to max_pages.
-    """
-    all_pages = []
-    start = 0
-    batch_size = 50
-    while len(all_pages) < max_pages:
-        try:
-            res = conf.get("rest/api/content",
-                           params={"type": "page",
-                                   "limit": batch_size,
-                                   "start": start,
-                                   "expand": "body.storage,space"}) or {}
-            results = res.get("results", [])
-            if not results:
-                break
-            all_pages.extend(results)
-            start += batch_size
-            time.sleep(0.2)
-        except Exception as e:
-            print("⚠️ Fetch all pages failed:", e)
-            break
-    return all_pages[:max_pages]
+@lru_cache(maxsize=1)
+def mirror() -> ConfluenceMirror:
+    return ConfluenceMirror()
 
 
 # ---------- Semantic Ranking ----------
-def rank_chunks(question: str, items: List[Tuple[str, str, str]]) -> List[Tuple[float, Dict[str, str]]]:
-    emb = OpenAIEmbeddings(model=EMBED_MODEL)
-    qv = np.array(emb.embed_query(question), dtype="float32")
-    dv = np.array(emb.embed_documents([it[2] for it in items]), dtype="float32")
+@lru_cache(maxsize=1)
+def embeddings() -> CachedEmbeddings:
+    # one embedder per process; chunks seen by earlier questions come from the on-disk cache
+    return CachedEmbeddings(OpenAIEmbeddings(model=EMBED_MODEL))
+
+
+@lru_cache(maxsize=1)
+def llm() -> ChatOpenAI:
+    return ChatOpenAI(model=CHAT_MODEL, temperature=0)
 
-    qn = qv / (np.linalg.norm(qv) + 1e-8)
-    dn = dv / (np.linalg.norm(dv, axis=1, keepdims=True) + 1e-8)
-    sims = (dn @ qn).tolist()
 
-    ranked = sorted(
-        [(sims[i], {"title": items[i][0], "url": items[i][1], "chunk": items[i][2]})
-         for i in range(len(items))],
-        key=lambda x: x[0],
-        reverse=True
-    )
-    return ranked
+@lru_cache(maxsize=1)
+def chunk_index() -> ConfluenceChunkIndex:
+    # chunk vectors of every mirrored page version, embedded once at sync time
+    size, overlap = (CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS) if CHUNK_UNIT == "tokens" else (CHUNK_SIZE, CHUNK_OVERLAP)
+    return ConfluenceChunkIndex(embeddings(), chunker=page_chunks, chunker_key=f"spans:{CHUNK_UNIT}:{size}:{overlap}")
 
 
-def build_context(ranked: List[Tuple[float, Dict[str, str]]], k: int) -> str:
+def sync_mirror(conf: ConfluenceFetcher = None) -> Tuple[SyncStats, IndexStats]:
+    stats = mirror().sync(conf or confluence_client(), to_text=html_to_text)
+    return stats, chunk_index().refresh(mirror())
+
+
+_index_reconciled = False
+_ready_lock = threading.Lock()  # concurrent questions share one staleness check, sync and refresh
+_sync_thread: Optional[threading.Thread] = None
+_sync_started: Optional[float] = None
+
+
+def _background_sync(conf: ConfluenceFetcher) -> None:
+    try:
+        s, ix = sync_mirror(conf)
+        print(f"ℹ️ Mirror synced in the background: {s.fetched} pages fetched, {s.deleted} deleted, "
+              f"{ix.pages_added} re-indexed")
+    except Exception as e:
+        print("⚠️ Background mirror sync failed, still using the last synced pages:", e)
+
+
+def ready_index(conf: ConfluenceFetcher) -> ConfluenceChunkIndex:
+    """
+    The chunk index for the current question. Only an empty mirror is synced inline; a stale one is
+    served as is while a background thread syncs it (one at a time, retried after MIRROR_SYNC_RETRY).
+    """
+    global _index_reconciled, _sync_thread, _sync_started
+    with _ready_lock:
+        if mirror().last_sync() is None:
+            try:
+                sync_mirror(conf)
+                _index_reconciled = True
+            except Exception as e:
+                print("⚠️ Mirror sync failed, using the last synced pages:", e)
+        if not _index_reconciled:
+            chunk_index().refresh(mirror())
+            _index_reconciled = True
+        now = time.monotonic()
+        if (mirror().is_stale(MIRROR_SYNC_INTERVAL)
+                and not (_sync_thread and _sync_thread.is_alive())
+                and (_sync_started is None or now - _sync_started >= MIRROR_SYNC_RETRY)):
+            _sync_started = now
+            _sync_thread = threading.Thread(target=_background_sync, args=(conf,), name="mirror-sync", daemon=True)
+            _sync_thread.start()
+    return chunk_index()
+
+
+def indexed_hits(hits: List[Tuple[Document, float]]) -> List[Tuple[float, Dict[str, str]]]:
+    out = []
+    for doc, score in hits:
+        md = doc.metadata
+        out.append((score, {"title": md["title"], "url": page_url(md["space"], md["page_id"], md["title"]),
+                            "chunk": doc.page_content}))
+    return out
+
+
+def unit_rows(vectors) -> np.ndarray:
+    """Contiguous float32 copy with L2-normalised rows."""
+    m = np.array(vectors, dtype=np.float32, order="C", ndmin=1)
+    m /= np.linalg.norm(m, axis=-1, keepdims=True) + 1e-8
+    return m
+
+
+def ranked_item(score: float, item: Tuple[str, str, str]) -> Tuple[float, Dict[str, str]]:
+    return float(score), {"title": item[0], "url": item[1], "chunk": item[2]}
+
+
+def rank_chunks(question: str, items: List[Tuple[str, str, str]], query_vector: Optional[List[float]] = None,
+                k: int = TOP_K_CHUNKS) -> List[Tuple[float, Dict[str, str]]]:
+    """Best `k` chunks for one question; metadata is built only for the winners."""
+    emb = embeddings()
+    qn = unit_rows(query_vector if query_vector is not None else emb.embed_query(question))
+    dn = unit_rows(emb.embed_documents([it[2] for it in items]))
+    sims = dn @ qn
+    return [ranked_item(sims[i], items[i]) for i in top_k(sims, k)]
+
+
+def rank_chunks_batch(questions: List[str], items: List[Tuple[str, str, str]],
+                      k: int = TOP_K_CHUNKS) -> List[List[Tuple[float, Dict[str, str]]]]:
+    """`rank_chunks` for many questions over the same candidates: one embedding request
+    for the questions and one (questions x chunks) matrix product."""
+    emb = embeddings()
+    qn = unit_rows(emb.embed_documents(questions))
+    dn = unit_rows(emb.embed_documents([it[2] for it in items]))
+    sims = qn @ dn.T
+    return [[ranked_item(row[i], items[i]) for i in top] for row, top in zip(sims, top_k(sims, k))]
+
+
+# overlapping chunks of the same page are merged, near-duplicates dropped, tokens capped
+context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+
+
+def build_context(ranked: List[Tuple[float, Dict[str, str]]], k: int) -> Tuple[str, PackStats]:
+    passages, stats = context_packer.pack([Passage(meta["chunk"], key=meta["url"], meta=meta) for _, meta in ranked[:k]])
     parts = []
-    for i, (_, meta) in enumerate(ranked[:k], start=1):
-        parts.append(f"[{i}] {meta['title']} — {meta['url']}\n{meta['chunk']}\n")
-    return "\n".join(parts)
+    for i, p in enumerate(passages, start=1):
+        parts.append(f"[{i}] {p.meta['title']} — {p.meta['url']}\n{p.text}\n")
+    return "\n".join(parts), stats
 
 
 # ---------- Orchestrator ----------
 def answer_question(question: str) -> str:
+    return answer_with_stats(question)[0]
+
+
+def answer_with_stats(question: str) -> Tuple[str, Optional[PackStats]]:
+    """Answer plus this call's context-packing stats (None when no context was built)."""
     conf = confluence_client()
 
+    qv = embeddings().embed_query(question)  # the only embedding call for indexed pages
+
     # Step 1: CQL
     cql_results = cql_search(conf, question, limit=MAX_CQL_RESULTS)
     if cql_results:
-        items = [normalize_item(r["content"]) for r in cql_results]
+        # pages whose current version is indexed are ranked from stored vectors,
+        # the rest (not synced yet) are chunked and embedded on the fly
+        index = chunk_index()
+        contents = [r["content"] for r in cql_results]
+        indexed = {str(c["id"]) for c in contents if index.version(str(c["id"])) == page_version(c)}
+        ranked = indexed_hits(index.search(qv, TOP_K_CHUNKS, page_ids=indexed)) if indexed else []
+        candidates = [
+            (title, url, text[s:e])
+            for title, url, text in (normalize_item(c) for c in contents if str(c["id"]) not in indexed)
+            for s, e in page_chunks(text)
+        ]
+        if candidates:
+            ranked = sorted(ranked + rank_chunks(question, candidates, qv), key=lambda x: x[0], reverse=True)
+            ranked = ranked[:TOP_K_CHUNKS]
     else:
-        # Step 2: Full fallback
-        print("ℹ️ CQL returned nothing, fetching all pages…")
-        all_pages = fetch_all_pages(conf, max_pages=MAX_ALL_PAGES)
-        items = [normalize_item(r) for r in all_pages]
-
-    if not items:
-        return "❌ No pages accessible."
-
-    # Chunk
-    candidates = []
-    for title, url, text in items:
-        for ch in chunk_text(text, CHUNK_SIZE, CHUNK_OVERLAP):
-            candidates.append((title, url, ch))
+        # Step 2: Full fallback, search the local index
+        print("ℹ️ CQL returned nothing, searching the page index…")
+        index = ready_index(conf)
+        if not len(index):
+            return "❌ No pages accessible.", None
+        ranked = indexed_hits(index.search(qv, TOP_K_CHUNKS))
 
-    if not candidates:
-        return "⚠️ Pages had no readable text."
+    if not ranked:
+        return "⚠️ Pages had no readable text.", None
 
-    # Rank
-    ranked = rank_chunks(question, candidates)
-    context = build_context(ranked, TOP_K_CHUNKS)
+    # Pack
+    context, packed = build_context(ranked, TOP_K_CHUNKS)
 
     # LLM
-    llm = ChatOpenAI(model=CHAT_MODEL, temperature=0)
     prompt = f"""Answer using the context. If not in context, say "I don't know".
 Cite sources like [1], [2].
 
@@ -165,17 +282,27 @@ Context:
 {context}
 
 Answer:"""
-    return llm.invoke(prompt).content
+    return llm().invoke(prompt).content, packed
 
 
 # ---------- CLI ----------
 if __name__ == "__main__":
+    if "--sync" in sys.argv[1:]:
+        s, ix = sync_mirror()
+        print(f"Mirror synced: {s.listed} pages listed, {s.fetched} fetched, {s.deleted} deleted "
+              f"in {s.seconds:.1f}s ({confluence_client().stats()['requests']} requests)")
+        print(f"Index: {ix.pages_added} pages ({ix.chunks_added} chunks) embedded, "
+              f"{ix.pages_removed} removed in {ix.seconds:.1f}s")
+        sys.exit(0)
     print("Ask Confluence (type 'exit' to quit):")
     while True:
         q = input("> ").strip()
         if not q or q.lower() in {"exit", "quit"}:
             break
         try:
-            print("\n" + answer_question(q) + "\n")
+            answer, packed = answer_with_stats(q)
+            print("\n" + answer + "\n")
+            if packed:
+                print(f"(context: {packed.tokens_out} tokens, {packed.tokens_saved} saved by packing)\n")
         except Exception as e:
             print(f"\n❌ Error: {e}\n")
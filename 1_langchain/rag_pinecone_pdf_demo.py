@@ -1,22 +1,44 @@
+import asyncio
+import functools
 import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
 import time
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import fitz  # PyMuPDF
 from dotenv import load_dotenv
 
-from pinecone import Pinecone, ServerlessSpec
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from doc_loader import (  # noqa: F401  (loaders re-exported for existing callers)
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    DOC_WORKERS,
+    DOCS_DIR,
+    file_to_documents,
+    iter_file_documents,
+    iter_local_docs,
+    iter_task_documents,
+    load_local_docs,
+    local_source_files,
+    pdf_to_documents,
+    txt_chunking,
+)
+from context_packer import ContextPacker, PackStats, Passage
+from ingest_manifest import GenerationWatcher, IngestManifest, chunk_id, file_sha256
+from retrieval_cache import RetrievalCache
+from streaming_ingest import IngestStats, ManifestCheckpoint, StreamingIngestor
+
 # 🔹 NEW: memory-aware imports
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import BaseMessage
 from langchain_core.runnables.history import RunnableWithMessageHistory
 
+from session_store import BudgetedChatHistory, SessionStore
+
 # -------------------- Config --------------------
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -25,74 +47,128 @@ INDEX_NAME = os.getenv("PINECONE_INDEX")
 CLOUD = os.getenv("PINECONE_CLOUD", "aws")
 REGION = os.getenv("PINECONE_REGION", "us-east-1")
 FORCE_RECREATE = os.getenv("FORCE_RECREATE_INDEX", "0") == "1"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")   # pinecone | local (NumPy, offline)
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".local_index")
+INDEX_READY_TIMEOUT = float(os.getenv("INDEX_READY_TIMEOUT", "300"))
 
 EMBED_MODEL = "text-embedding-3-small"  # 1536 dims
 EMBED_DIM = 1536
 CHAT_MODEL = "gpt-4o-mini"
 
-if not OPENAI_API_KEY or not PINECONE_API_KEY:
-    raise SystemExit("Please set OPENAI_API_KEY and PINECONE_API_KEY in .env")
+MANIFEST_PATH = os.getenv(
+    "INGEST_MANIFEST",
+    ".ingest_manifest.json" if VECTOR_BACKEND == "pinecone" else str(Path(LOCAL_INDEX_DIR) / "manifest.json"),
+)
+INGEST_MODE = os.getenv("INGEST_MODE", "incremental")  # incremental | full
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))      # texts per embedding request
+UPSERT_BATCH = int(os.getenv("INGEST_UPSERT_BATCH", "100"))   # vectors per Pinecone upsert
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "2"))
+
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))     # evict idle sessions
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))     # per-session prompt history
+SUMMARIZE_HISTORY = os.getenv("SUMMARIZE_HISTORY", "1") == "1"            # 0 = just trim old turns
+
+RETRIEVER_K = 4
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))      # 0 = disabled
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+# cosine similarity for reusing another question's hits; empty = exact-text tier only
+RETRIEVAL_CACHE_SIMILARITY = os.getenv("RETRIEVAL_CACHE_SIMILARITY", "0.95")
+# async path: concurrent query embeddings are sent as one request (see embed_batcher.py)
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_MAX_BATCH = int(os.getenv("QUERY_MAX_BATCH", "64"))
+# BM25 + dense fused with reciprocal-rank fusion (see hybrid_retrieval.py)
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+BM25_PATH = os.getenv(
+    "BM25_INDEX",
+    ".bm25_index.jsonl" if VECTOR_BACKEND == "pinecone" else str(Path(LOCAL_INDEX_DIR) / "bm25.jsonl"),
+)
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))   # candidates per retriever before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+# e.g. 0.7 to diversify the fused hits with MMR; unset = plain RRF order
+MMR_LAMBDA = float(os.environ["MMR_LAMBDA"]) if os.getenv("MMR_LAMBDA") else None
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))   # retrieved context per prompt
+# tenant = one document collection: ./docs/<tenant>, its own Pinecone namespace, manifest and caches.
+# "" is the original single collection (./docs, default namespace).
+DEFAULT_TENANT = os.getenv("TENANT", "")
+
+def check_config():
+    """Fail fast on missing keys — called when the first service client is built, not on import."""
+    if VECTOR_BACKEND not in {"pinecone", "local"}:
+        raise SystemExit(f"VECTOR_BACKEND must be 'pinecone' or 'local', got {VECTOR_BACKEND!r}")
+    if not OPENAI_API_KEY or (VECTOR_BACKEND == "pinecone" and not PINECONE_API_KEY):
+        raise SystemExit("Please set OPENAI_API_KEY and PINECONE_API_KEY in .env")
+
+# -------------------- Tenants --------------------
+_TENANT_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def resolve_tenant(tenant: Optional[str]) -> str:
+    tenant = DEFAULT_TENANT if tenant is None else tenant
+    if tenant and not _TENANT_RE.match(tenant):
+        raise ValueError(f"tenant must match {_TENANT_RE.pattern}, got {tenant!r}")
+    return tenant
+
+def _for_tenant(path: str, tenant: str) -> str:
+    """`.ingest_manifest.json` → `.ingest_manifest.acme.json` for tenant "acme"."""
+    if not tenant:
+        return path
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.{tenant}{p.suffix}"))
+
+def namespace(tenant: str) -> Optional[str]:
+    return tenant or None
+
+def docs_dir(tenant: str) -> Path:
+    return DOCS_DIR / tenant if tenant else DOCS_DIR
+
+def local_index_dir(tenant: str) -> str:
+    return str(Path(LOCAL_INDEX_DIR) / tenant) if tenant else LOCAL_INDEX_DIR
+
+def manifest_path(tenant: str) -> str:
+    if VECTOR_BACKEND == "local" and "INGEST_MANIFEST" not in os.environ:
+        return str(Path(local_index_dir(tenant)) / "manifest.json")
+    return _for_tenant(MANIFEST_PATH, tenant)
+
+def bm25_path(tenant: str) -> str:
+    if VECTOR_BACKEND == "local" and "BM25_INDEX" not in os.environ:
+        return str(Path(local_index_dir(tenant)) / "bm25.jsonl")
+    return _for_tenant(BM25_PATH, tenant)
 
 # -------------------- PDF -> Text --------------------
-def pdf_to_documents(pdf_path: Path) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800, chunk_overlap=150, separators=["\n\n", "\n", " ", ""]
-    )
-    docs: List[Document] = []
-
-    with fitz.open(pdf_path) as pdf:
-        for page_num in range(len(pdf)):
-            page = pdf[page_num]
-            page_text = page.get_text("text")
-            if not page_text.strip():
-                continue
-
-            chunks = splitter.split_text(page_text)
-            for i, chunk in enumerate(chunks):
-                docs.append(
-                    Document(
-                        page_content=chunk,
-                        metadata={
-                            "source": pdf_path.name,
-                            "page": page_num + 1,  # 1-based
-                            "chunk_idx": i,
-                        },
-                    )
-                )
-    return docs
-
-def load_local_docs() -> List[Document]:
-    """Load PDFs/TXTs from ./docs. No fallback content."""
-    root = Path("docs")
-    all_docs: List[Document] = []
-
-    if root.exists():
-        for p in root.iterdir():
-            if p.suffix.lower() == ".pdf":
-                all_docs.extend(pdf_to_documents(p))
-            elif p.suffix.lower() == ".txt":
-                text = p.read_text(encoding="utf-8", errors="ignore")
-                splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-                for i, chunk in enumerate(splitter.split_text(text)):
-                    all_docs.append(
-                        Document(
-                            page_content=chunk,
-                            metadata={"source": p.name, "page": None, "chunk_idx": i},
-                        )
-                    )
-    return all_docs
+# Parsing/chunking lives in doc_loader.py (process-pool friendly); see DOC_WORKERS.
+def doc_id(d: Document) -> str:
+    md = d.metadata
+    return chunk_id(md["source"], md.get("page"), md["chunk_idx"], d.page_content)
 
 # -------------------- Pinecone Setup (v5) --------------------
-pc = Pinecone(api_key=PINECONE_API_KEY)
+_ready_indexes: set = set()  # per-process: readiness is checked once per index name
 
-def wait_ready(name: str):
+def wait_ready(pc, name: str, timeout: float = INDEX_READY_TIMEOUT):
+    """Poll describe_index with exponential backoff (0.25s → 8s) until the index is ready."""
+    if name in _ready_indexes:
+        return
+    delay, deadline = 0.25, time.monotonic() + timeout
     while True:
         desc = pc.describe_index(name)
         if getattr(desc.status, "ready", False):
             break
-        time.sleep(1)
+        if time.monotonic() >= deadline:
+            raise SystemExit(f"Pinecone index '{name}' not ready after {timeout:.0f}s.")
+        time.sleep(delay)
+        delay = min(delay * 2, 8.0)
+    _ready_indexes.add(name)
+
+def _forget_manifests() -> None:
+    """Drop the manifests of every tenant (all of them share the index)."""
+    base = Path(MANIFEST_PATH)
+    for p in [base, *base.parent.glob(f"{base.stem}.*{base.suffix}")]:
+        p.unlink(missing_ok=True)
+
+def ensure_index(pc, name: str, want_dim: int):
+    if name in _ready_indexes:
+        return
+    from pinecone import ServerlessSpec
 
-def ensure_index(name: str, want_dim: int):
     try:
         existing = [idx.name for idx in pc.list_indexes().indexes]
     except Exception:
@@ -105,7 +181,9 @@ def ensure_index(name: str, want_dim: int):
             metric="cosine",
             spec=ServerlessSpec(cloud=CLOUD, region=REGION),
         )
-        wait_ready(name)
+        wait_ready(pc, name)
+        # a fresh index holds none of the vectors the manifests remember
+        _forget_manifests()
         print("Index ready.")
         return
 
@@ -116,13 +194,15 @@ def ensure_index(name: str, want_dim: int):
         if FORCE_RECREATE:
             print(f"[WARN] {msg} Recreating due to FORCE_RECREATE_INDEX=1 ...")
             pc.delete_index(name)
+            _ready_indexes.discard(name)
             pc.create_index(
                 name=name,
                 dimension=want_dim,
                 metric="cosine",
                 spec=ServerlessSpec(cloud=CLOUD, region=REGION),
             )
-            wait_ready(name)
+            wait_ready(pc, name)
+            _forget_manifests()
             print("Index recreated and ready.")
         else:
             raise SystemExit(
@@ -131,40 +211,355 @@ def ensure_index(name: str, want_dim: int):
                   "or set FORCE_RECREATE_INDEX=1 in .env to auto-recreate."
             )
     else:
-        wait_ready(name)
+        wait_ready(pc, name)
         print("Index ready.")
 
-ensure_index(INDEX_NAME, want_dim=EMBED_DIM)
-
-# -------------------- Vector Store --------------------
-emb = OpenAIEmbeddings(model=EMBED_MODEL)
-vectorstore = PineconeVectorStore(index_name=INDEX_NAME, embedding=emb)
-
-def ingest() -> int:
-    """Ingest docs into Pinecone. Returns number of chunks added (approx)."""
-    docs = load_local_docs()
-    if not docs:
-        print("No documents found in ./docs (PDF/TXT).")
-        return 0
-    print(f"Ingesting {len(docs)} chunks ...")
-    vectorstore.add_documents(docs)
-    print("Ingestion complete.")
-    return len(docs)
+# -------------------- Services (built lazily on first use) --------------------
+class RagServices:
+    """Embedder, LLM, vector store, retriever and chain — each built on first use.
+
+    Importing this module touches no network and needs no API keys; pass ready-made
+    `embeddings` / `llm` / `vectorstore` to run against fakes or a local index.
+
+    One instance per tenant: tenant instances share the clients, embedder, LLM and
+    chain of their `parent` and own their vector store (namespace) and BM25 index.
+    """
+
+    def __init__(self, embeddings=None, llm=None, vectorstore=None, tenant: Optional[str] = None, parent=None):
+        self.tenant = resolve_tenant(tenant)
+        self._parent = parent
+        self._embeddings = embeddings
+        self._llm = llm
+        self._vectorstore = vectorstore
+        self._pc = self._index = self._retriever = self._chat_with_memory = self._query_batcher = None
+        self._bm25 = None
+        self._lock = threading.RLock()
+
+    def _lazy(self, attr: str, build: Callable[[], Any], shared: bool = False) -> Any:
+        if shared and self._parent is not None:
+            return self._parent._lazy(attr, build, shared=True)
+        value = getattr(self, attr, None)
+        if value is None:
+            with self._lock:
+                value = getattr(self, attr, None)
+                if value is None:
+                    value = build()
+                    setattr(self, attr, value)
+        return value
+
+    @property
+    def pinecone(self):
+        def build():
+            check_config()
+            from pinecone import Pinecone
+            return Pinecone(api_key=PINECONE_API_KEY)
+        return self._lazy("_pc", build, shared=True)
+
+    @property
+    def index(self):
+        """Raw Pinecone index handle, used for upserting pre-computed vectors."""
+        def build():
+            ensure_index(self.pinecone, INDEX_NAME, want_dim=EMBED_DIM)
+            return self.pinecone.Index(INDEX_NAME)
+        return self._lazy("_index", build, shared=True)
+
+    @property
+    def embeddings(self):
+        def build():
+            check_config()
+            from langchain_openai import OpenAIEmbeddings
+            from embedding_cache import CachedEmbeddings
+            return CachedEmbeddings(OpenAIEmbeddings(model=EMBED_MODEL))  # on-disk cache, see embedding_cache.py
+        return self._lazy("_embeddings", build, shared=True)
+
+    @property
+    def llm(self):
+        def build():
+            check_config()
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(model=CHAT_MODEL, temperature=0)
+        return self._lazy("_llm", build, shared=True)
+
+    @property
+    def vectorstore(self):
+        def build():
+            check_config()
+            if VECTOR_BACKEND == "local":
+                from local_vectorstore import LocalVectorStore
+                persist_dir = local_index_dir(self.tenant)
+                if not (Path(persist_dir) / "vectors.npy").exists():
+                    Path(manifest_path(self.tenant)).unlink(missing_ok=True)  # nothing persisted yet → re-ingest everything
+                return LocalVectorStore(self.embeddings, persist_dir=persist_dir)
+            from langchain_pinecone import PineconeVectorStore
+            ensure_index(self.pinecone, INDEX_NAME, want_dim=EMBED_DIM)
+            return PineconeVectorStore(
+                index_name=INDEX_NAME, embedding=self.embeddings, text_key="text", namespace=namespace(self.tenant)
+            )
+        return self._lazy("_vectorstore", build)
+
+    @property
+    def bm25(self):
+        def build():
+            from hybrid_retrieval import BM25Index
+            path = bm25_path(self.tenant)
+            if not Path(path).exists():
+                Path(manifest_path(self.tenant)).unlink(missing_ok=True)  # keyword index missing → re-ingest (embeddings are cached)
+            return BM25Index(path)
+        return self._lazy("_bm25", build)
+
+    @property
+    def retriever(self):
+        def build():
+            if not HYBRID_SEARCH:
+                return self.vectorstore.as_retriever(search_kwargs={"k": RETRIEVER_K})
+            from hybrid_retrieval import HybridRetriever
+            return HybridRetriever(
+                vectorstore=self.vectorstore, bm25=self.bm25, k=RETRIEVER_K,
+                fetch_k=HYBRID_FETCH_K, rrf_k=RRF_K, mmr_lambda=MMR_LAMBDA,
+            )
+        return self._lazy("_retriever", build)
+
+    @property
+    def query_batcher(self):
+        def build():
+            from embed_batcher import EmbeddingMicroBatcher
+            return EmbeddingMicroBatcher(self.embeddings, max_batch=QUERY_MAX_BATCH, max_wait_ms=QUERY_BATCH_WINDOW_MS)
+        return self._lazy("_query_batcher", build, shared=True)
+
+    @property
+    def chat_with_memory(self):
+        def build():
+            return RunnableWithMessageHistory(
+                prompt | self.llm,
+                get_session_history,
+                input_messages_key="question",   # which key to treat as the user message
+                history_messages_key="history",  # where to inject/retrieve history
+            )
+        return self._lazy("_chat_with_memory", build, shared=True)
+
+    def forget_tenant_state(self) -> None:
+        """Drop the cached vector store, BM25 index and retriever; the next use rebuilds them from disk."""
+        with self._lock:
+            self._vectorstore = self._bm25 = self._retriever = None
+
+_services: Optional[RagServices] = None                   # root: the default tenant, owns the shared clients
+_tenant_services: Dict[str, RagServices] = {}
+_services_lock = threading.Lock()
+
+def services(tenant: Optional[str] = None) -> RagServices:
+    global _services
+    tenant = resolve_tenant(tenant)
+    svc = _tenant_services.get(tenant)
+    if svc is not None:
+        return svc
+    with _services_lock:
+        if _services is None:
+            _services = RagServices()
+            _tenant_services[_services.tenant] = _services
+        if tenant not in _tenant_services:
+            _tenant_services[tenant] = RagServices(tenant=tenant, parent=_services)
+        return _tenant_services[tenant]
+
+def use_services(svc: RagServices) -> None:
+    """Swap in a pre-built RagServices (fakes, local index) before the first call.
+
+    A parentless instance becomes the root (and drops other tenants' services);
+    one built with `parent=` only replaces its own tenant.
+    """
+    global _services
+    with _services_lock:
+        if svc._parent is None:
+            _services = svc
+            _tenant_services.clear()
+        _tenant_services[svc.tenant] = svc
+
+# old module-level names (`demo.vectorstore`, `demo.llm`, ...) still work, lazily
+_LEGACY_ATTRS = {
+    "emb": "embeddings", "llm": "llm", "vectorstore": "vectorstore", "retriever": "retriever",
+    "pc": "pinecone", "index": "index", "chat_with_memory": "chat_with_memory",
+}
+
+def __getattr__(name: str):
+    if name in _LEGACY_ATTRS:
+        return getattr(services(), _LEGACY_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# -------------------- Ingest --------------------
+def chunking_params(tenant: str = "") -> dict:
+    """Everything that changes the stored vectors; a change forces re-embedding."""
+    if VECTOR_BACKEND == "pinecone":
+        index = f"{INDEX_NAME}/{tenant}" if tenant else INDEX_NAME
+    else:
+        index = f"local:{local_index_dir(tenant)}"
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "txt_chunking": txt_chunking(),
+        "embed_model": EMBED_MODEL,
+        "index": index,
+    }
+
+def _upsert_vectors(ids, texts, metadatas, vectors, tenant: str = "") -> None:
+    """Write pre-computed embeddings; "text" is the key PineconeVectorStore reads back."""
+    svc = services(tenant)
+    if HYBRID_SEARCH:
+        svc.bm25.add(ids, texts, metadatas)
+    if hasattr(svc.vectorstore, "add_embeddings"):  # LocalVectorStore
+        svc.vectorstore.add_embeddings(texts, vectors, metadatas, ids)
+        return
+    svc.index.upsert(vectors=[
+        {
+            "id": i,
+            "values": v,
+            # Pinecone rejects null metadata values (TXT chunks have page=None)
+            "metadata": {**{k: val for k, val in md.items() if val is not None}, "text": t},
+        }
+        for i, t, md, v in zip(ids, texts, metadatas, vectors)
+    ], namespace=namespace(tenant))
+
+def _delete_vectors(ids, tenant: str = "") -> None:
+    svc = services(tenant)
+    svc.vectorstore.delete(ids=ids)  # the store is bound to the tenant's namespace
+    if HYBRID_SEARCH:
+        svc.bm25.remove(ids)
+
+def _flush_indexes(tenant: str = "") -> None:
+    """Persist local state before the manifest claims the chunks are stored."""
+    svc = services(tenant)
+    if hasattr(svc.vectorstore, "save"):
+        svc.vectorstore.save()
+    if HYBRID_SEARCH:
+        svc.bm25.save()
+
+def ingest(force: bool = INGEST_MODE == "full", tenant: Optional[str] = None) -> IngestStats:
+    """Stream ./docs (./docs/<tenant> for a tenant) into Pinecone (the tenant's namespace).
+
+    Unchanged files (same content hash + chunking params) are skipped without
+    parsing or embedding. Changed files stream their chunks through a bounded
+    embed → upsert pipeline that only embeds chunks whose deterministic ID is
+    new; vectors of vanished chunks and removed files are deleted. Progress is
+    checkpointed in the manifest, so an interrupted run resumes where it stopped.
+    `force=True` re-embeds everything (IDs stay deterministic, so no duplicates).
+    Each tenant has its own manifest, so re-indexing one never touches the others.
+    """
+    tenant = resolve_tenant(tenant)
+    svc = services(tenant)
+    # both may reset the manifest when their persisted state is missing, so build them first
+    svc.vectorstore
+    if HYBRID_SEARCH:
+        svc.bm25
+    manifest = IngestManifest(manifest_path(tenant))
+    checkpoint = ManifestCheckpoint(
+        manifest,
+        chunking_params(tenant),
+        delete_fn=functools.partial(_delete_vectors, tenant=tenant),
+        force=force,
+        # the local index and BM25 postings must hit disk before the manifest claims the chunks
+        flush_fn=functools.partial(_flush_indexes, tenant=tenant),
+    )
+    seen = set()
+
+    changed = []
+    for p in local_source_files(docs_dir(tenant)):
+        key = p.name
+        seen.add(key)
+        sha = file_sha256(p)
+        if not force and manifest.is_current(key, sha, checkpoint.params):
+            checkpoint.stats.skipped += len(manifest.get(key)["ids"])
+            continue
+        changed.append((p, sha))
+
+    def chunks():
+        # parse only changed files, in parallel when DOC_WORKERS > 1
+        hashes = {p: sha for p, sha in changed}
+        present: set = set()
+        opened = None
+        for p, docs, last in iter_task_documents([p for p, _ in changed], workers=DOC_WORKERS):
+            key = p.name
+            if key != opened:
+                present, opened = checkpoint.open_file(key, hashes[p]), key
+            for d in docs:
+                cid = doc_id(d)
+                needs_write = cid not in present
+                checkpoint.add(key, cid, needs_write)
+                if needs_write:
+                    yield key, cid, d
+            if last:
+                checkpoint.close_file(key)
+
+    pipeline = StreamingIngestor(
+        # embedder is only built if something actually needs embedding
+        embed_fn=lambda texts: services().embeddings.embed_documents(texts),
+        write_fn=functools.partial(_upsert_vectors, tenant=tenant),
+        embed_batch=EMBED_BATCH,
+        upsert_batch=UPSERT_BATCH,
+        max_in_flight=INGEST_MAX_IN_FLIGHT,
+        on_done=checkpoint.on_done,
+    )
+    try:
+        pipeline.run(chunks())
+    finally:
+        checkpoint.save()  # a failed run keeps every batch upserted so far; the next run resumes after it
+    checkpoint.remove_missing(seen)
+    if HYBRID_SEARCH:
+        svc.bm25.build()  # once per ingest, so queries never rebuild the postings
+
+    stats = checkpoint.stats
+    if stats.added or stats.deleted:
+        # new content → cached retrievals (here and in other processes) are stale
+        manifest.generation += 1
+        manifest.save()
+        retrieval_cache_for(tenant).clear()
+    print(f"Ingest{f' [{tenant}]' if tenant else ''}: added={stats.added} skipped={stats.skipped} deleted={stats.deleted}")
+    return stats
+
+def delete_tenant(tenant: str) -> None:
+    """Drop every vector, the BM25 index, the manifest and cached results of one tenant."""
+    tenant = resolve_tenant(tenant)
+    svc = services(tenant)
+    if VECTOR_BACKEND == "local" and tenant:
+        shutil.rmtree(local_index_dir(tenant), ignore_errors=True)
+    elif VECTOR_BACKEND == "local":
+        # the default tenant's files sit next to the other tenants' folders
+        for name in ("vectors.npy", "docs.jsonl"):
+            (Path(LOCAL_INDEX_DIR) / name).unlink(missing_ok=True)
+    else:
+        svc.index.delete(delete_all=True, namespace=namespace(tenant))
+    for path in (manifest_path(tenant), bm25_path(tenant)):
+        Path(path).unlink(missing_ok=True)
+    shutil.rmtree(bm25_path(tenant) + ".postings", ignore_errors=True)
+    retrieval_cache_for(tenant).clear()
+    with _services_lock:
+        if svc is not _services:
+            _tenant_services.pop(tenant, None)  # rebuilt empty on next use
+        else:
+            svc.forget_tenant_state()  # the root also owns the shared clients, so keep it and reset its indexes
+    print(f"Deleted tenant {tenant or '(default)'}")
 
 # -------------------- Retriever & LLM --------------------
-llm = ChatOpenAI(model=CHAT_MODEL, temperature=0)
-retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-
 SYSTEM = (
     "You are a helpful assistant. Use ONLY the provided context to answer. "
     "If the answer is not in context, say you don't know. Cite sources as [source: name p.X]."
 )
 
-def docs_to_context(ctx_docs: List[Document]) -> str:
-    return "\n\n".join(
-        f"- {d.page_content.strip()}\n  [source: {d.metadata.get('source','?')} p.{d.metadata.get('page','?')}]"
+# merges overlapping chunks of the same page, drops near-duplicates, caps tokens (see context_packer.py)
+context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+
+def docs_to_context(ctx_docs: List[Document]) -> Tuple[str, PackStats]:
+    passages, stats = context_packer.pack([
+        Passage(
+            d.page_content,
+            key=(d.metadata.get("source"), d.metadata.get("page")),
+            order=int(d.metadata["chunk_idx"]) if d.metadata.get("chunk_idx") is not None else None,
+            meta=d.metadata,
+        )
         for d in ctx_docs
-    ) or "(no relevant context found)"
+    ])
+    context = "\n\n".join(
+        f"- {p.text.strip()}\n  [source: {p.meta.get('source','?')} p.{p.meta.get('page','?')}]"
+        for p in passages
+    )
+    return context or "(no relevant context found)", stats
 
 # -------------------- 🔹 Memory-enabled chain --------------------
 prompt = ChatPromptTemplate.from_messages([
@@ -174,38 +569,148 @@ prompt = ChatPromptTemplate.from_messages([
     ("user", "Question:\n{question}\n\nContext:\n{context}")
 ])
 
-base_chain = prompt | llm
+def summarize_history(summary: str, dropped: List[BaseMessage]) -> str:
+    """Roll turns that fall out of the token budget into a short running summary."""
+    transcript = "\n".join(f"{m.type}: {m.content}" for m in dropped)
+    return services().llm.invoke(
+        "Update the running summary of a conversation with the new turns. "
+        "Keep names, facts and open questions; at most 120 words.\n\n"
+        f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+    ).content
+
+# bounded per-session history: LRU/TTL eviction + token budget (see session_store.py)
+session_store = SessionStore(
+    max_sessions=MAX_SESSIONS,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    token_budget=HISTORY_TOKEN_BUDGET,
+    summarizer=summarize_history if SUMMARIZE_HISTORY else None,
+)
 
-# simple per-session history store (in-memory dict)
-_history_store: dict[str, InMemoryChatMessageHistory] = {}
+def get_session_history(session_id: str) -> BudgetedChatHistory:
+    return session_store.get(session_id)
 
-def get_session_history(session_id: str) -> InMemoryChatMessageHistory:
-    if session_id not in _history_store:
-        _history_store[session_id] = InMemoryChatMessageHistory()
-    return _history_store[session_id]
+# -------------------- Retrieval cache --------------------
+def _new_retrieval_cache(tenant: str) -> RetrievalCache:
+    return RetrievalCache(
+        max_entries=max(RETRIEVAL_CACHE_SIZE, 1),
+        ttl_seconds=RETRIEVAL_CACHE_TTL,
+        similarity_threshold=float(RETRIEVAL_CACHE_SIMILARITY) if RETRIEVAL_CACHE_SIMILARITY else None,
+        generation_fn=GenerationWatcher(manifest_path(tenant)),
+    )
 
-chat_with_memory = RunnableWithMessageHistory(
-    base_chain,
-    get_session_history,
-    input_messages_key="question",   # which key to treat as the user message
-    history_messages_key="history",  # where to inject/retrieve history
-)
+retrieval_cache = _new_retrieval_cache(DEFAULT_TENANT)
+_retrieval_caches: Dict[str, RetrievalCache] = {DEFAULT_TENANT: retrieval_cache}
+
+def retrieval_cache_for(tenant: str) -> RetrievalCache:
+    """Per-tenant cache: results never cross tenants and one tenant's ingest doesn't flush the others."""
+    cache = _retrieval_caches.get(tenant)
+    if cache is None:
+        with _services_lock:
+            cache = _retrieval_caches.setdefault(tenant, _new_retrieval_cache(tenant))
+    return cache
+
+# -------------------- Session → tenant binding --------------------
+_session_tenants: "OrderedDict[str, str]" = OrderedDict()   # LRU, capped like the session store
+_session_tenants_lock = threading.Lock()
+
+def bind_tenant(session_id: str, tenant: Optional[str] = None) -> str:
+    """Tenant a session talks to. The first call binds it; later calls may omit `tenant`
+    but can't switch it, so a session's history never mixes collections."""
+    with _session_tenants_lock:
+        bound = _session_tenants.get(session_id)
+        if bound is not None:
+            if tenant is not None and resolve_tenant(tenant) != bound:
+                raise ValueError(f"session {session_id!r} is bound to tenant {bound or '(default)'!r}")
+            _session_tenants.move_to_end(session_id)
+            return bound
+        bound = _session_tenants[session_id] = resolve_tenant(tenant)
+        while len(_session_tenants) > MAX_SESSIONS:
+            _session_tenants.popitem(last=False)
+        return bound
+
+# -------------------- Retrieval --------------------
+def search_by_vector(q: str, qv: List[float], tenant: Optional[str] = None) -> List[Document]:
+    """One retrieval with an already-computed query vector: dense, or BM25 + dense fused."""
+    svc = services(tenant)
+    if not HYBRID_SEARCH:
+        return svc.vectorstore.similarity_search_by_vector(qv, k=RETRIEVER_K)
+    from hybrid_retrieval import hybrid_search
+    return hybrid_search(
+        q, qv, svc.vectorstore, svc.bm25, k=RETRIEVER_K, fetch_k=HYBRID_FETCH_K,
+        rrf_k=RRF_K, mmr_lambda=MMR_LAMBDA,
+    )
+
+def retrieve(q: str, tenant: Optional[str] = None) -> List[Document]:
+    """Top-k chunks for `q` from one tenant, served from the retrieval cache when possible.
+
+    exact hit  → no embedding call, no vector query
+    similar hit → one embedding call (reused for the lookup), no vector query
+    miss       → one embedding call + one by-vector query (the tenant's namespace only)
+    """
+    tenant = resolve_tenant(tenant)
+    svc = services(tenant)
+    if RETRIEVAL_CACHE_SIZE <= 0:
+        return svc.retriever.invoke(q)
+    cache = retrieval_cache_for(tenant)
+    docs = cache.get_exact(q)
+    if docs is not None:
+        return docs
+    qv = svc.embeddings.embed_query(q)
+    docs = cache.get_similar(qv)
+    if docs is None:
+        docs = search_by_vector(q, qv, tenant)
+    cache.put(q, docs, qv)
+    return docs
 
-def ask_with_memory(session_id: str, q: str):
+def ask_with_memory(session_id: str, q: str, tenant: Optional[str] = None):
+    tenant = bind_tenant(session_id, tenant)
+    svc = services(tenant)
     # Retrieve fresh context every turn (memory is for *conversation*, not facts)
-    docs = retriever.get_relevant_documents(q)
-    ctx = docs_to_context(docs)
+    docs = retrieve(q, tenant)
+    ctx, packed = docs_to_context(docs)
 
     # call the chain with history bound to session_id
-    resp = chat_with_memory.invoke(
+    resp = svc.chat_with_memory.invoke(
         {"question": q, "context": ctx},
         config={"configurable": {"session_id": session_id}},
     )
-    return resp, docs
+    return resp, docs, packed
+
+async def aretrieve(q: str, tenant: Optional[str] = None) -> List[Document]:
+    """Async `retrieve`: the query embedding goes through the micro-batcher."""
+    tenant = resolve_tenant(tenant)
+    svc = services(tenant)
+    cache = retrieval_cache_for(tenant)
+    docs = cache.get_exact(q) if RETRIEVAL_CACHE_SIZE > 0 else None
+    if docs is not None:
+        return docs
+    qv = await svc.query_batcher.embed_query(q)
+    if RETRIEVAL_CACHE_SIZE > 0:
+        docs = cache.get_similar(qv)
+    if docs is None and HYBRID_SEARCH:
+        docs = await asyncio.to_thread(search_by_vector, q, qv, tenant)
+    elif docs is None:
+        docs = await svc.vectorstore.asimilarity_search_by_vector(qv, k=RETRIEVER_K)
+    if RETRIEVAL_CACHE_SIZE > 0:
+        cache.put(q, docs, qv)
+    return docs
+
+async def aask_with_memory(session_id: str, q: str, tenant: Optional[str] = None):
+    """Async `ask_with_memory` for servers handling many sessions concurrently."""
+    tenant = bind_tenant(session_id, tenant)
+    docs = await aretrieve(q, tenant)
+    ctx, packed = docs_to_context(docs)
+    resp = await services(tenant).chat_with_memory.ainvoke(
+        {"question": q, "context": ctx},
+        config={"configurable": {"session_id": session_id}},
+    )
+    return resp, docs, packed
 
 # -------------------- CLI --------------------
 def chat_loop():
     print("🔹 RAG over local docs (Pinecone + OpenAI) with chat memory. Type 'exit' to quit.")
+    if DEFAULT_TENANT:
+        print(f"Tenant: {DEFAULT_TENANT} (./docs/{DEFAULT_TENANT}, namespace {DEFAULT_TENANT!r})")
     session_id = "cli-session"  # you can swap this for a user id in a web app
 
     while True:
@@ -213,18 +718,20 @@ def chat_loop():
         if q.lower() in {"exit", "quit"}:
             break
 
-        resp, docs = ask_with_memory(session_id, q)
+        resp, docs, packed = ask_with_memory(session_id, q)
 
         print("\n--- Retrieved Chunks (brief) ---")
         for d in docs:
             snippet = d.page_content.replace("\n", " ")[:140]
             print(f"[{d.metadata.get('source')} p.{d.metadata.get('page')} c{d.metadata.get('chunk_idx')}] {snippet}...")
 
+        print(f"(context: {packed.tokens_out} tokens, {packed.tokens_saved} saved by packing)")
+
         print("\n--- Answer ---")
         print(resp.content)
 
 if __name__ == "__main__":
-    added = ingest()
-    if added == 0:
-        raise SystemExit("Add PDFs/TXTs to ./docs and rerun.")
+    stats = ingest()
+    if stats.total == 0:
+        raise SystemExit(f"Add PDFs/TXTs to ./{docs_dir(DEFAULT_TENANT).as_posix()} and rerun.")
     chat_loop()
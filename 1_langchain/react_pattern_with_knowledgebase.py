@@ -1,57 +1,107 @@
 # semantic_kv_cache_with_ids.py
-import itertools
+import atexit
+import os
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain.agents import initialize_agent, AgentType, tool
 
+from embedding_cache import CachedEmbeddings
+from kb_store import KB_STORE_PATH, KBRecord, KBStore, relevance_search_by_vector
+
 load_dotenv()
 
 def norm(s: str) -> str:
     return " ".join(s.lower().strip().split())
 
 # ---- Embeddings + Vector DB (QUESTION vectors; ANSWER & ID in metadata) ----
-emb = OpenAIEmbeddings(model="text-embedding-3-small")
-kb = Chroma(collection_name="qa_kv_with_ids", embedding_function=emb)  # add persist_directory="kb_store" to persist
+emb = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"))  # on-disk cache, see embedding_cache.py
+KB_CHROMA_DIR = os.getenv("KB_CHROMA_DIR", "kb_store")
+kb = Chroma(collection_name="qa_kv_with_ids", embedding_function=emb, persist_directory=KB_CHROMA_DIR)
 
 REL_THRESHOLD = 0.40                                  # relevance ∈ [0..1], higher=better
-exact_cache_q2a = {}                                   # normalized_question -> answer
-id_cache = {}                                          # id_str -> answer
-id_counter = itertools.count(10000)                    # simple numeric IDs (10000, 10001, ...)
+# On a miss: "direct" = one LLM call, cached by a background write; "agent" = the ReAct agent drives the tools
+KB_MISS_MODE = os.getenv("KB_MISS_MODE", "direct")
+MISS_MODES = ("direct", "agent")
+# question -> answer -> id records (SQLite, KB_STORE_PATH); loaded once here, which rebuilds the
+# exact and ID maps and re-indexes anything a crash left out of Chroma. Numeric IDs: 10000, 10001, ...
+# Size/TTL limits: KB_MAX_ENTRIES, KB_MAX_BYTES, KB_EVICTION (lru|lfu), KB_TTL_SECONDS; see kb_store.py.
+store = KBStore(KB_STORE_PATH, vectorstore=kb)
+atexit.register(store.close)  # persists hit counts for LRU/LFU
+
+# ---- Per-turn query context: the question is embedded at most once per turn ----
+@dataclass
+class Turn:
+    qn: str                                   # normalized question
+    _vector: Optional[List[float]] = None
+
+    def vector(self) -> List[float]:
+        if self._vector is None:
+            self._vector = emb.embed_query(self.qn)
+        return self._vector
+
+_turn: ContextVar[Optional[Turn]] = ContextVar("kb_turn", default=None)
+
+def _vector_for(qn: str) -> List[float]:
+    """Embedding of a normalized question; the precheck, the agent's tools and the upsert of one turn share it."""
+    turn = _turn.get()
+    if turn is not None and turn.qn == qn:
+        return turn.vector()
+    return emb.embed_query(qn)  # the agent asked about a different text
+
+def _kb_hit(qn: str) -> Optional[Tuple[KBRecord, float]]:
+    """Closest stored question with relevance >= REL_THRESHOLD, as (record, relevance), or None."""
+    stale = []
+    found = None
+    for doc, rel in relevance_search_by_vector(kb, _vector_for(qn), k=4):
+        rid = (doc.metadata or {}).get("id", "")
+        if not store.contains(rid):
+            stale.append(rid)  # vector of an evicted record; a live runner-up may follow
+            continue
+        print(f"[KB CHECK] relevance={rel:.3f}  matched_question='{doc.page_content}'")
+        if rel is not None and rel >= REL_THRESHOLD:
+            rec = store.get(rid, tier="semantic")  # answer from the store, so TTL/invalidation apply
+            found = (rec, rel) if rec else None
+        else:
+            store.miss("semantic")
+        break
+    else:
+        store.miss("semantic")
+    if any(stale):
+        kb.delete(ids=[rid for rid in stale if rid])
+    return found
 
 # ---------- Tools ----------
 @tool
 def kb_get_by_id(id_str: str) -> str:
     """Return the stored answer by numeric/string ID, or '__MISS__' if not found."""
-    key = id_str.strip()
-    ans = id_cache.get(key)
-    if ans:
-        return ans
-    # Fallback: scan Chroma by filtering metadata (lightweight for small KBs)
-    hits = kb.similarity_search_with_relevance_scores("dummy", k=1)  # we won't use this result
-    # NOTE: Chroma Python API does not filter by metadata directly in similarity helpers.
-    # If needed, keep a parallel dict (id_cache) as above, which we do.
-    return "__MISS__"
+    rec = store.get(id_str.strip())  # primary-key read, never embeds
+    return rec.answer if rec else "__MISS__"
+
+@tool
+def kb_get_by_ids(ids: str) -> str:
+    """Return stored answers for comma-separated IDs, one 'id: answer' line each ('id: __MISS__' if not found)."""
+    keys = [k.strip() for k in ids.split(",") if k.strip()]
+    found = store.get_many(keys)
+    return "\n".join(f"{k}: {found[k].answer if k in found else '__MISS__'}" for k in keys)
 
 @tool
 def kb_lookup(query: str) -> str:
     """Return cached answer if a close semantic match to a stored QUESTION exists; else '__MISS__'."""
     qn = norm(query)
-    if qn in exact_cache_q2a:
+    rec = store.get_exact(qn)
+    if rec:
         print("[EXACT HIT]")
-        return exact_cache_q2a[qn]
-    hits = kb.similarity_search_with_relevance_scores(qn, k=1)
-    if not hits:
-        return "__MISS__"
-    doc, rel = hits[0]
-    print(f"[KB CHECK] relevance={rel:.3f}  matched_question='{doc.page_content}'")
-    if rel is not None and rel >= REL_THRESHOLD:
-        md = (doc.metadata or {})
-        ans = md.get("answer")
-        return ans if ans else "__MISS__"
-    return "__MISS__"
+        return rec.answer
+    hit = _kb_hit(qn)
+    return hit[0].answer if hit else "__MISS__"
 
 @tool
 def kb_upsert(payload: str) -> str:
@@ -65,12 +115,10 @@ def kb_upsert(payload: str) -> str:
     if len(parts) == 2:
         # no ID provided
         q, a = parts
-        id_str = str(next(id_counter))
+        id_str = None
     elif len(parts) == 3:
         id_str, q, a = parts
-        id_str = id_str.strip()
-        if not id_str:
-            id_str = str(next(id_counter))
+        id_str = id_str.strip() or None
     else:
         return "❌ Expected 'question|||answer' or 'id|||question|||answer'"
 
@@ -78,90 +126,155 @@ def kb_upsert(payload: str) -> str:
     a_clean = a.strip()
     q_norm = norm(q_clean)
 
-    # Update in-memory caches
-    exact_cache_q2a[q_norm] = a_clean
-    id_cache[id_str] = a_clean
-
-    # Store in Chroma: we vectorize the QUESTION text; stash ID & ANSWER in metadata
-    kb.add_texts(
-        [q_norm],
-        metadatas=[{"answer": a_clean, "id": id_str}]
-        # NOTE: we could also pass ids=... here, but Chroma's internal id is separate
-    )
+    # SQLite record first, then Chroma under the same id (QUESTION vector; ID & ANSWER in metadata)
+    id_str = store.upsert(q_clean, a_clean, q_norm, id_str, vector=_vector_for(q_norm))
     return f"✅ Stored with id={id_str}"
 
+def _llm_answer(query: str) -> str:
+    return llm.invoke(f"Answer succinctly in 3–5 lines.\n\nQ: {query}\nA:").content
+
 @tool
 def llm_answer(query: str) -> str:
     """Use the LLM to generate a concise answer (only used on KB misses)."""
-    return llm.invoke(f"Answer succinctly in 3–5 lines.\n\nQ: {query}\nA:").content
+    return _llm_answer(query)
 
 # ---------- LLM (only for misses) ----------
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
-# ---------- Agent (ReAct) ----------
-agent = initialize_agent(
-    tools=[kb_get_by_id, kb_lookup, llm_answer, kb_upsert],
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True,
-)
+# ---------- Agent (ReAct), built on the first miss in "agent" mode ----------
+agent = None
+
+def _agent():
+    global agent
+    if agent is None:
+        agent = initialize_agent(
+            tools=[kb_get_by_id, kb_get_by_ids, kb_lookup, llm_answer, kb_upsert],
+            llm=llm,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=True,
+            handle_parsing_errors=True,
+        )
+    return agent
+
+# ---------- Write-behind: "direct" misses are cached off the answer path ----------
+_writer = ThreadPoolExecutor(1, thread_name_prefix="kb-upsert")  # one worker keeps upserts in order
+_pending: Dict[str, str] = {}                                   # q_norm -> answer still being written
+_pending_lock = threading.Lock()
+
+def _write_behind(question: str, ans: str, qn: str, vector: Sequence[float]) -> Future:
+    with _pending_lock:
+        _pending[qn] = ans  # a repeat of this question is an exact hit before the write lands
+
+    def write():
+        try:
+            store.upsert(question, ans, qn, vector=vector)
+        except Exception as e:
+            print(f"[KB WRITE FAILED] {e}")
+        finally:
+            with _pending_lock:
+                if _pending.get(qn) == ans:
+                    del _pending[qn]
+
+    return _writer.submit(write)
+
+def flush_writes() -> None:
+    """Wait until every queued upsert is in the store."""
+    _writer.submit(lambda: None).result()
+
+atexit.register(_writer.shutdown)  # registered after store.close, so it runs first
 
 ID_REGEX = re.compile(r"^\d{3,}$")  # treat pure 3+ digit strings as possible IDs
+IDS_REGEX = re.compile(r"^\d{3,}(\s*,\s*\d{3,})+$")  # several IDs: '10000, 10001'
+
+_ROUTE_LABELS = {
+    "id": "[KB ID HIT] (no LLM)",
+    "id_miss": "[KB ID MISS] (no answer for that id)",
+    "exact": "[EXACT HIT] (no LLM)",
+    "kb": "[KB HIT] (no LLM)",
+    "llm": "[LLM] (one call, cached in the background)",
+    "agent": "[AGENT] (LLM once, then cached)",
+}
+
+def answer(raw: str, miss_mode: Optional[str] = None) -> Tuple[str, str]:
+    """Answer one input; returns (answer, route) with route in id | id_miss | exact | kb | llm | agent.
+    `miss_mode` overrides KB_MISS_MODE for this call."""
+    # 1) If input looks like a numeric ID (or a comma-separated list) → return by ID (zero LLM, zero embeddings)
+    if ID_REGEX.match(raw):
+        ans = kb_get_by_id.invoke({"id_str": raw})
+        if ans != "__MISS__":
+            return ans, "id"
+        return "", "id_miss"
+    if IDS_REGEX.match(raw):
+        ans = kb_get_by_ids.invoke({"ids": raw})
+        return ans, "id" if any(not line.endswith("__MISS__") for line in ans.splitlines()) else "id_miss"
+
+    # 2) Questions: one Turn per input, so its embedding is computed once and reused by every step below
+    qn = norm(raw)
+    miss_mode = miss_mode or KB_MISS_MODE
+    if miss_mode not in MISS_MODES:
+        raise ValueError(f"miss_mode must be one of {MISS_MODES}, got {miss_mode!r}")
+    token = _turn.set(Turn(qn))
+    try:
+        return _answer_question(raw, qn, miss_mode)
+    finally:
+        _turn.reset(token)
+
+def _answer_question(raw: str, qn: str, miss_mode: str) -> Tuple[str, str]:
+    # Zero-LLM fast path: exact/semantic lookup over QUESTIONS
+    with _pending_lock:
+        pending = _pending.get(qn)
+    if pending is not None:
+        return pending, "exact"
+    rec = store.get_exact(qn)
+    if rec:
+        return rec.answer, "exact"
+
+    pre = _kb_hit(qn)
+    if pre:
+        rec, rel = pre
+        print(f"[KB PRECHECK] relevance={rel:.3f}")
+        return rec.answer, "kb"
+
+    # MISS, direct: the lookup above already missed, so one LLM call and a background upsert
+    if miss_mode == "direct":
+        print("[KB MISS] one LLM call, cached in the background\n")
+        ans = _llm_answer(raw)
+        _write_behind(raw.strip(), ans.strip(), qn, _vector_for(qn))
+        return ans, "llm"
+
+    # MISS, agent: let ReAct agent do: kb_lookup -> llm_answer -> kb_upsert
+    print("[KB MISS] using agent (LLM once, then cache)\n")
+    guidance = (
+        "First call kb_get_by_id if the input looks like an ID (digits). "
+        "If not, call kb_lookup. If it returns '__MISS__', call llm_answer to get the answer, "
+        "then call kb_upsert with 'question|||answer'. Return only the final answer.\n"
+        f"Question: {raw}"
+    )
+    out = _agent().invoke({"input": guidance})
+    ans = out["output"]
+
+    # Safety upsert if agent forgot
+    if not store.get_exact(qn):
+        # auto-ID upsert
+        kb_upsert.invoke({"payload": f"{raw}|||{ans}"})
+    return ans, "agent"
 
 def ask_loop():
-    print("\n--- Semantic KV Cache with IDs (ReAct on MISS) ---")
+    print(f"\n--- Semantic KV Cache with IDs ({'ReAct agent' if KB_MISS_MODE == 'agent' else 'one LLM call'} on MISS) ---")
     print("• Upsert: auto-id via 'question|||answer'  OR custom-id via 'id|||question|||answer'")
-    print("• Ask by ID (e.g., '10000') or by semantic question (typos allowed). Type 'q' to quit.")
+    print("• Ask by ID (e.g., '10000' or '10000, 10001') or by semantic question (typos allowed). 'stats' shows cache counters, 'q' quits.")
 
     while True:
         raw = input("\nYou: ").strip()
         if raw.lower() in {"q", "quit", "exit"}:
             print("Bye! 👋"); break
+        if raw.lower() == "stats":
+            print(store.stats(), "\n"); continue
 
-        # 1) If input looks like a numeric ID → return by ID (zero LLM)
-        if ID_REGEX.match(raw):
-            ans = kb_get_by_id.invoke({"id_str": raw})
-            if ans != "__MISS__":
-                print("[KB ID HIT] (no LLM)\n" + ans + "\n")
-                continue
-            else:
-                print("[KB ID MISS] (no answer for that id)\n")
-                continue
-
-        # 2) Zero-LLM fast path: exact/semantic lookup over QUESTIONS
-        qn = norm(raw)
-        if qn in exact_cache_q2a:
-            print("[EXACT HIT] (no LLM)\n")
-            print(exact_cache_q2a[qn], "\n")
-            continue
-
-        pre = kb.similarity_search_with_relevance_scores(qn, k=1)
-        if pre:
-            doc, rel = pre[0]
-            print(f"[KB PRECHECK] relevance={rel:.3f}")
-            if rel is not None and rel >= REL_THRESHOLD:
-                print("[KB HIT] (no LLM)\n")
-                print((doc.metadata or {}).get("answer", ""), "\n")
-                continue
-
-        # 3) MISS → let ReAct agent do: kb_lookup -> llm_answer -> kb_upsert
-        print("[KB MISS] using agent (LLM once, then cache)\n")
-        guidance = (
-            "First call kb_get_by_id if the input looks like an ID (digits). "
-            "If not, call kb_lookup. If it returns '__MISS__', call llm_answer to get the answer, "
-            "then call kb_upsert with 'question|||answer'. Return only the final answer.\n"
-            f"Question: {raw}"
-        )
-        out = agent.invoke({"input": guidance})
-        ans = out["output"]
-
-        # Safety upsert if agent forgot
-        if norm(raw) not in exact_cache_q2a:
-            # auto-ID upsert
-            kb_upsert.invoke({"payload": f"{raw}|||{ans}"})
-
-        print(ans, "\n")
+        ans, route = answer(raw)
+        print(_ROUTE_LABELS[route] + "\n")
+        if ans:
+            print(ans, "\n")
 
 if __name__ == "__main__":
     ask_loop()
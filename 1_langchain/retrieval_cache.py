@@ -0,0 +1,132 @@
+"""
+Query-level retrieval cache for the RAG demos.
+
+Two tiers in front of the retriever:
+- exact: normalized question text -> retrieved documents. A hit skips both the
+  query embedding and the vector search.
+- semantic (optional): query vector -> retrieved documents for a previous query
+  with cosine similarity >= `similarity_threshold`. A hit skips the vector search.
+
+Entries expire after `ttl_seconds`, the cache holds at most `max_entries`
+(LRU), and every entry is tagged with the ingest generation it was built
+under; when `generation_fn()` changes (new ingest), old entries stop matching.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+_TRAILING_PUNCT = re.compile(r"[\s?!.。]+$")
+
+
+def normalize_query(q: str) -> str:
+    return _TRAILING_PUNCT.sub("", " ".join(q.lower().split()))
+
+
+class RetrievalCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600,
+        similarity_threshold: Optional[float] = 0.95,  # None = exact tier only
+        generation_fn: Callable[[], int] = lambda: 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.generation_fn = generation_fn
+        self.clock = clock
+        # key -> (docs, generation, expires_at, slot in the vector matrix or None)
+        self._entries: "OrderedDict[str, Tuple[List[Document], int, float, Optional[int]]]" = OrderedDict()
+        self._mat: Optional[np.ndarray] = None      # (max_entries, dim) normalized query vectors
+        self._slot_key: List[Optional[str]] = [None] * max_entries
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.exact_hits = self.semantic_hits = self.misses = self.evictions = 0
+
+    # ---- lookups ----
+    def get_exact(self, query: str) -> Optional[List[Document]]:
+        key = normalize_query(query)
+        with self._lock:
+            docs = self._live(key)
+            if docs is not None:
+                self.exact_hits += 1
+            return docs
+
+    def get_similar(self, vector: Sequence[float]) -> Optional[List[Document]]:
+        """Call after an exact miss, with the already computed query vector."""
+        with self._lock:
+            if self.similarity_threshold is None or self._mat is None:
+                self.misses += 1
+                return None
+            q = np.asarray(vector, dtype=np.float32)
+            q = q / max(float(np.linalg.norm(q)), 1e-8)
+            sims = np.where(self._valid, self._mat @ q, -1.0)
+            for slot in np.argsort(-sims)[:4]:  # a stale best match may hide a live runner-up
+                if sims[slot] < self.similarity_threshold:
+                    break
+                docs = self._live(self._slot_key[slot])
+                if docs is not None:
+                    self.semantic_hits += 1
+                    return docs
+            self.misses += 1
+            return None
+
+    # ---- writes ----
+    def put(self, query: str, docs: List[Document], vector: Optional[Sequence[float]] = None) -> None:
+        key = normalize_query(query)
+        with self._lock:
+            self._drop(key)
+            while len(self._entries) >= self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            slot = None
+            if vector is not None and self.similarity_threshold is not None:
+                v = np.asarray(vector, dtype=np.float32)
+                if self._mat is None:
+                    self._mat = np.zeros((self.max_entries, v.shape[0]), dtype=np.float32)
+                slot = self._free.pop()
+                self._mat[slot] = v / max(float(np.linalg.norm(v)), 1e-8)
+                self._slot_key[slot] = key
+                self._valid[slot] = True
+            self._entries[key] = (list(docs), self.generation_fn(), self.clock() + self.ttl_seconds, slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    # ---- internals (lock held) ----
+    def _live(self, key: str) -> Optional[List[Document]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        docs, generation, expires_at, _ = entry
+        if expires_at <= self.clock() or generation != self.generation_fn():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return docs
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry and entry[3] is not None:
+            self._slot_key[entry[3]] = None
+            self._valid[entry[3]] = False
+            self._free.append(entry[3])
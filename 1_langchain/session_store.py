@@ -0,0 +1,133 @@
+"""
+Bounded chat-session store for RunnableWithMessageHistory.
+
+- LRU + idle-TTL eviction: at most `max_sessions` histories live, and sessions
+  untouched for `ttl_seconds` are dropped
+- per-session token budget: once a history exceeds it, the oldest turns are
+  trimmed, or rolled into a running summary when a `summarizer` is given, so the
+  prompt stops growing with conversation length
+- metrics(): live sessions, evictions and average history tokens per request
+
+    store = SessionStore(token_budget=1500, summarizer=my_summarizer)
+    RunnableWithMessageHistory(chain, store.get, ...)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from token_count import count_tokens
+
+# (previous summary, messages being dropped) -> new summary
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+
+class BudgetedChatHistory(BaseChatMessageHistory):
+    def __init__(self, token_budget: int, summarizer: Optional[Summarizer] = None):
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._summary_tokens = 0
+        self._turns: List[Tuple[BaseMessage, int]] = []  # (message, token count)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        head = [SystemMessage(f"Summary of the earlier conversation: {self.summary}")] if self.summary else []
+        return head + [m for m, _ in self._turns]
+
+    @property
+    def tokens(self) -> int:
+        return self._summary_tokens + sum(n for _, n in self._turns)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        for m in messages:
+            text = m.content if isinstance(m.content, str) else str(m.content)
+            self._turns.append((m, count_tokens(text)))
+        self._compact()
+
+    def clear(self) -> None:
+        self.summary, self._summary_tokens, self._turns = "", 0, []
+
+    def _compact(self) -> None:
+        if self.tokens <= self.token_budget:
+            return
+        # drop down to 3/4 of the budget so we don't summarize on every single turn;
+        # always keep the latest question/answer pair
+        target = self.token_budget * 3 // 4
+        n, tokens = 0, self.tokens
+        while len(self._turns) - n > 2 and tokens > target:
+            tokens -= self._turns[n][1]
+            n += 1
+        if n and self.summarizer:
+            # summarize before dropping; if the LLM call fails, fall back to plain trimming
+            # (what summarizer=None does) rather than failing a turn that was already answered
+            try:
+                self.summary = self.summarizer(self.summary, [m for m, _ in self._turns[:n]])
+                self._summary_tokens = count_tokens(self.summary)
+            except Exception as e:
+                print(f"⚠️ History summary failed, trimming {n} old messages instead: {e}")
+        del self._turns[:n]
+
+
+class SessionStore:
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: float = 3600,
+        token_budget: int = 2000,
+        summarizer: Optional[Summarizer] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.clock = clock
+        # session_id -> (history, last access); ordered oldest access first
+        self._sessions: "OrderedDict[str, Tuple[BudgetedChatHistory, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+        self._requests = 0
+        self._history_tokens = 0
+
+    def get(self, session_id: str) -> BudgetedChatHistory:
+        now = self.clock()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.pop(session_id, None)
+            history = entry[0] if entry else BudgetedChatHistory(self.token_budget, self.summarizer)
+            self._sessions[session_id] = (history, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_lru += 1
+            self._requests += 1
+            self._history_tokens += history.tokens
+            return history
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            self._evict_idle(self.clock())
+            return {
+                "live_sessions": len(self._sessions),
+                "evicted_ttl": self.evicted_ttl,
+                "evicted_lru": self.evicted_lru,
+                "avg_history_tokens": self._history_tokens / self._requests if self._requests else 0.0,
+            }
+
+    def _evict_idle(self, now: float) -> None:
+        # LRU order means idle sessions sit at the front
+        while self._sessions:
+            _, (_, last) = next(iter(self._sessions.items()))
+            if now - last < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_ttl += 1
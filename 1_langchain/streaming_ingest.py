@@ -0,0 +1,233 @@
+"""
+Bounded-memory streaming ingest: chunk generator -> batched embed -> batched upsert.
+
+    producer (caller thread)        workers (max_in_flight threads)
+    chunks ─► embed batches ─► Queue(maxsize) ─► embed_fn ─► write_fn per upsert batch ─► on_done
+
+At most `max_in_flight` batches wait in the queue and `max_in_flight` are being
+embedded/upserted, so peak memory is ~2 * max_in_flight * embed_batch chunks no
+matter how big the corpus is. With two or more workers one batch is embedded
+while another is upserted.
+
+`ManifestCheckpoint` records every upserted batch in the ingest manifest, so an
+interrupted ingest resumes where it stopped instead of starting over.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from ingest_manifest import IngestManifest
+
+# (file key, chunk id, document)
+Item = Tuple[str, str, Document]
+EmbedFn = Callable[[List[str]], List[List[float]]]
+WriteFn = Callable[[List[str], List[str], List[Dict[str, Any]], List[List[float]]], None]
+
+_DONE = object()
+
+
+def batched(items: Iterable, n: int) -> Iterator[List]:
+    it = iter(items)
+    while batch := list(itertools.islice(it, n)):
+        yield batch
+
+
+@dataclass
+class IngestStats:
+    added: int = 0
+    skipped: int = 0
+    deleted: int = 0
+
+    @property
+    def total(self) -> int:
+        """Chunks now live in the index (newly added + already present)."""
+        return self.added + self.skipped
+
+
+class StreamingIngestor:
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        write_fn: WriteFn,
+        embed_batch: int = 64,
+        upsert_batch: int = 100,
+        max_in_flight: int = 2,
+        on_done: Optional[Callable[[List[Item]], None]] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.write_fn = write_fn
+        self.embed_batch = embed_batch
+        self.upsert_batch = upsert_batch
+        self.max_in_flight = max(1, max_in_flight)
+        self.on_done = on_done
+
+    def run(self, items: Iterable[Item]) -> int:
+        """Embed + upsert every item; returns how many were written. Re-raises worker errors."""
+        q: "queue.Queue" = queue.Queue(maxsize=self.max_in_flight)
+        errors: List[BaseException] = []
+        written = [0]
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                batch = q.get()
+                if batch is _DONE:
+                    return
+                if errors:
+                    continue  # drain without work once something failed
+                try:
+                    self._process(batch)
+                    with lock:
+                        written[0] += len(batch)
+                except BaseException as e:  # surfaced to the caller below
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.max_in_flight)]
+        for t in threads:
+            t.start()
+        try:
+            for batch in batched(items, self.embed_batch):
+                if errors:
+                    break
+                q.put(batch)  # blocks while the workers are busy → bounded memory
+        finally:
+            for _ in threads:
+                q.put(_DONE)
+            for t in threads:
+                t.join()
+        if errors:
+            raise errors[0]
+        return written[0]
+
+    def _process(self, batch: List[Item]) -> None:
+        texts = [d.page_content for _, _, d in batch]
+        vectors = self.embed_fn(texts)
+        for start in range(0, len(batch), self.upsert_batch):
+            part = batch[start:start + self.upsert_batch]
+            self.write_fn(
+                [i for _, i, _ in part],
+                texts[start:start + self.upsert_batch],
+                [d.metadata for _, _, d in part],
+                vectors[start:start + self.upsert_batch],
+            )
+            if self.on_done:
+                self.on_done(part)
+
+
+class ManifestCheckpoint:
+    """Per-file bookkeeping between the chunk producer and the pipeline workers.
+
+    A file is finished (moved from "pending" to "files" and its stale vectors
+    deleted) once the producer has seen its last chunk and every chunk that needed
+    writing has been upserted.
+
+    With a `flush_fn`, the indexes and the manifest are saved together at most every
+    `save_every` seconds and at the end of the run, never per file: a crash loses at
+    most that much progress, and the manifest never claims chunks the indexes lack.
+    Without one (nothing local to persist) each finished file saves the manifest.
+    """
+
+    def __init__(
+        self,
+        manifest: IngestManifest,
+        params: Dict[str, Any],
+        delete_fn: Callable[[List[str]], None],
+        force: bool = False,
+        save_every: float = 2.0,
+        flush_fn: Optional[Callable[[], None]] = None,
+    ):
+        self.manifest = manifest
+        self.params = params
+        self.delete_fn = delete_fn
+        self.force = force
+        self.save_every = save_every
+        self.flush_fn = flush_fn  # persists the local indexes before each manifest save
+        self.stats = IngestStats()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+
+    def open_file(self, key: str, sha256: str) -> Set[str]:
+        """Register a file; returns chunk IDs that are already in the index."""
+        with self._lock:
+            entry = self.manifest.get(key)
+            old = set(entry["ids"]) if entry else set()
+            # vectors are only reusable if they were produced with the same params
+            reusable = set(old) if entry and entry["params"] == self.params and not self.force else set()
+            partial = self.manifest.pending.get(key)
+            if partial:  # an interrupted run may have written chunks that no longer exist
+                old.update(partial["done"])
+            done = self.manifest.begin(key, sha256, self.params, resume=not self.force)
+            self._files[key] = {"old": old, "ids": [], "outstanding": set(), "closed": False}
+            return reusable | done
+
+    def add(self, key: str, chunk: str, needs_write: bool) -> None:
+        with self._lock:
+            f = self._files[key]
+            f["ids"].append(chunk)
+            if needs_write:
+                f["outstanding"].add(chunk)
+            else:
+                self.stats.skipped += 1
+
+    def close_file(self, key: str) -> None:
+        with self._lock:
+            self._files[key]["closed"] = True
+            self._maybe_finish(key)
+
+    def on_done(self, items: List[Item]) -> None:
+        with self._lock:
+            by_file: Dict[str, List[str]] = {}
+            for key, chunk, _ in items:
+                by_file.setdefault(key, []).append(chunk)
+            for key, ids in by_file.items():
+                self.manifest.mark_done(key, ids)
+                self._files[key]["outstanding"].difference_update(ids)
+                self.stats.added += len(ids)
+                self._maybe_finish(key)
+            self._maybe_save()
+
+    def remove_missing(self, seen: Set[str]) -> None:
+        with self._lock:
+            for key in set(self.manifest.keys()) - seen:
+                gone = self.manifest.remove(key)
+                if gone:
+                    self.delete_fn(gone)
+                self.stats.deleted += len(gone)
+            self._save()
+
+    def _maybe_finish(self, key: str) -> None:
+        f = self._files[key]
+        if not f["closed"] or f["outstanding"]:
+            return
+        stale = sorted(f["old"] - set(f["ids"]))
+        if stale:
+            self.delete_fn(stale)
+        self.stats.deleted += len(stale)
+        self.manifest.finish(key, f["ids"])
+        del self._files[key]
+        if self.flush_fn:
+            self._maybe_save()
+        else:
+            self._save()
+
+    def _maybe_save(self) -> None:
+        if time.monotonic() - self._last_save >= self.save_every:
+            self._save()
+
+    def save(self) -> None:
+        """Persist the indexes and the manifest now, e.g. when the pipeline failed part way."""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        if self.flush_fn:
+            self.flush_fn()
+        self.manifest.save()
+        self._last_save = time.monotonic()
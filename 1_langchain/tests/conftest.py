@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the demos are flat modules run from 1_langchain/ (`python -m benchmarks...` works the same way)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
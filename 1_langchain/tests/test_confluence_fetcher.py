@@ -0,0 +1,32 @@
+from confluence_fetcher import ConfluenceFetcher
+
+
+def fetcher_over(pages, size=10, hidden=()):
+    """Fetcher whose `get` pages through `pages` like Confluence, leaving out `hidden` ids
+    (permission filtering) without changing the offsets."""
+    conf = ConfluenceFetcher("http://confluence.invalid", concurrency=3, rate=0)
+
+    def get(path, params=None, **kwargs):
+        conf._count("requests")
+        start, limit = params["start"], min(params["limit"], size)
+        links = {"next": f"?start={start + limit}"} if start + limit < len(pages) else {}
+        return {"results": [p for p in pages[start:start + limit] if p["id"] not in hidden], "_links": links}
+
+    conf.get = get
+    return conf
+
+
+def test_short_pages_with_next_link_do_not_end_the_crawl():
+    pages = [{"id": str(i)} for i in range(95)]
+    conf = fetcher_over(pages, hidden={"12", "13", "50"})
+    out = conf.fetch_all("rest/api/content", page_size=50)
+    assert [p["id"] for p in out] == [p["id"] for p in pages if p["id"] not in {"12", "13", "50"}]
+    assert out.complete
+    assert conf.requests == 10
+
+
+def test_max_items_marks_the_listing_incomplete():
+    pages = [{"id": str(i)} for i in range(95)]
+    out = fetcher_over(pages).fetch_all("rest/api/content", max_items=30)
+    assert len(out) == 30 and not out.complete
+    assert fetcher_over(pages[:5]).fetch_all("rest/api/content").complete
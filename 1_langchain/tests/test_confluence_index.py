@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.fakes import FakeConfluence, FakeEmbeddings, synthetic_pages
+from confluence_index import ConfluenceChunkIndex
+from confluence_mirror import ConfluenceMirror
+from text_chunker import chunk_spans
+
+
+class FlakyEmbeddings(FakeEmbeddings):
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def embed_documents(self, texts):
+        if self.fail_after <= 0:
+            raise RuntimeError("rate limited")
+        self.fail_after -= 1
+        return super().embed_documents(texts)
+
+
+def test_pages_of_a_failed_batch_are_indexed_by_the_next_refresh(tmp_path):
+    pages, _ = synthetic_pages(40)
+    mirror = ConfluenceMirror(str(tmp_path / "mirror.sqlite"))
+    mirror.sync(FakeConfluence(pages), to_text=str)
+    emb = FlakyEmbeddings(fail_after=1)
+    index = ConfluenceChunkIndex(emb, chunker=lambda t: chunk_spans(t, 900, 120), persist_dir=None, batch_size=16)
+
+    with pytest.raises(RuntimeError):
+        index.refresh(mirror)
+    indexed = [p["id"] for p in pages if index.version(p["id"]) is not None]
+    assert 0 < len(indexed) < 40
+    stored = set(index.store.ids())
+    assert all(set(index._pages[pid][1]) <= stored for pid in indexed)  # recorded pages really have chunks
+
+    emb.fail_after = 10**6
+    stats = index.refresh(mirror)
+    assert stats.pages_added == 40 - len(indexed)
+    assert all(index.version(p["id"]) == 1 for p in pages)
@@ -0,0 +1,37 @@
+import pytest
+
+from benchmarks.fakes import FakeConfluence, synthetic_pages
+from confluence_mirror import ConfluenceMirror
+
+
+def test_sync_fetches_every_body_when_the_server_clamps_limit(tmp_path):
+    pages, _ = synthetic_pages(120)
+    conf = FakeConfluence(pages, max_limit=25)  # Confluence with body expansion
+    mirror = ConfluenceMirror(str(tmp_path / "mirror.sqlite"))
+    stats = mirror.sync(conf, to_text=str, batch_size=50)
+    assert stats.listed == stats.fetched == len(mirror) == 120
+    assert mirror.last_sync() is not None
+
+
+def test_sync_fails_instead_of_recording_missing_bodies(tmp_path):
+    pages, _ = synthetic_pages(30)
+    conf = FakeConfluence(pages)
+    conf.cql = lambda *a, **kw: {"results": []}
+    mirror = ConfluenceMirror(str(tmp_path / "mirror.sqlite"))
+    with pytest.raises(RuntimeError):
+        mirror.sync(conf, to_text=str)
+    assert mirror.last_sync() is None
+
+
+def test_incomplete_listing_deletes_nothing(tmp_path):
+    pages, _ = synthetic_pages(60)
+    mirror = ConfluenceMirror(str(tmp_path / "mirror.sqlite"))
+    mirror.sync(FakeConfluence(pages), to_text=str)
+
+    conf = FakeConfluence(pages)
+    full = conf.fetch_all
+    conf.fetch_all = lambda *a, **kw: full(*a, **{**kw, "max_items": 20})  # cut short
+    assert mirror.sync(conf, to_text=str).deleted == 0
+    assert len(mirror) == 60
+
+    assert mirror.sync(FakeConfluence(pages[:50]), to_text=str).deleted == 10
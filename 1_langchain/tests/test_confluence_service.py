@@ -0,0 +1,27 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("langchain_openai")
+
+from confluence_service import ConfluenceQAService
+from context_packer import ContextPacker, Passage
+
+
+def test_concurrent_requests_report_their_own_packing_stats():
+    packer = ContextPacker(token_budget=4000)
+    both_packed = threading.Barrier(2)
+
+    def answer(question):
+        _, packed = packer.pack([Passage(question * 50), Passage(question * 50)])
+        both_packed.wait(timeout=5)  # the other request packs before this one answers
+        return question, packed
+
+    with ConfluenceQAService(port=0, concurrency=2, answer=answer) as service, ThreadPoolExecutor(2) as pool:
+        results = list(pool.map(service.ask, ["short ", "a much longer question "]))
+
+    (_, small), (_, large) = results
+    assert small["tokens_saved"] < large["tokens_saved"]
+    assert small["context_tokens"] < large["context_tokens"]
@@ -0,0 +1,34 @@
+from context_packer import ContextPacker, Passage
+from token_count import count_tokens
+
+
+def test_truncate_prefers_word_boundaries():
+    packer = ContextPacker()
+    text = " ".join(f"word{i}" for i in range(500))
+    head = packer._truncate(text, 50)
+    assert 0 < count_tokens(head, packer.model) <= 50
+    assert text.startswith(head) and text[len(head)] == " "
+
+
+def test_truncate_cuts_text_without_whitespace():
+    packer = ContextPacker()
+    for text in ["https://example.com/" + "a1b2c3/" * 400, "知识库检索增强生成" * 200]:
+        head = packer._truncate(text, 40)
+        assert head and text.startswith(head)
+        assert count_tokens(head, packer.model) <= 40
+
+
+def test_oversized_unbroken_passage_is_truncated_not_dropped():
+    packer = ContextPacker(token_budget=100)
+    out, stats = packer.pack([Passage("x_" * 2000)])
+    assert len(out) == 1 and out[0].text and out[0].tokens <= 100
+    assert stats.passages_out == 1 and stats.tokens_out <= 100
+
+
+def test_each_call_returns_its_own_stats():
+    packer = ContextPacker(token_budget=1000)
+    _, small = packer.pack([Passage("short passage")])
+    _, large = packer.pack([Passage("alpha beta gamma " * 100), Passage("alpha beta gamma " * 100)])  # duplicate dropped
+    assert small.tokens_in < large.tokens_in
+    assert small.tokens_saved == 0 < large.tokens_saved
+    assert packer.metrics()["queries"] == 2
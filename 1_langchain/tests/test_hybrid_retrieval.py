@@ -0,0 +1,20 @@
+from hybrid_retrieval import BM25Index, tokenize
+
+
+def test_sentence_punctuation_is_not_a_compound():
+    assert tokenize("failed.") == tokenize("failed") == ["failed"]
+    assert tokenize("Retry later: thanks.") == ["retry", "later", "thanks"]
+
+
+def test_identifiers_are_kept_whole_and_split():
+    assert tokenize("ERR-42") == ["err-42", "err", "42"]
+    assert tokenize("see foo.bar.") == ["see", "foo.bar", "foo", "bar"]
+    assert tokenize("err_404") == ["err_404", "err", "404"]
+
+
+def test_prose_length_is_not_inflated():
+    ix = BM25Index()
+    ix.add(["a", "b"], ["The upload failed.", "The upload failed"], [{}, {}])
+    ix.build()
+    scores = dict((d.id, s) for d, s in ix.search("failed"))
+    assert scores["a"] == scores["b"]
@@ -0,0 +1,65 @@
+"""One question embedding per turn in react_pattern_with_knowledgebase (precheck → kb_lookup → kb_upsert)."""
+
+import importlib
+import itertools
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langchain_chroma")
+
+from benchmarks.fakes import FakeEmbeddings, FakeReActChatModel
+
+_collections = itertools.count()
+
+
+@pytest.fixture(scope="module")
+def kbmod(tmp_path_factory):
+    mp = pytest.MonkeyPatch()
+    mp.chdir(tmp_path_factory.mktemp("kb"))  # the module opens its store and Chroma dir on import
+    mp.setenv("OPENAI_API_KEY", "sk-offline-test")
+    yield importlib.import_module("react_pattern_with_knowledgebase")
+    mp.undo()
+
+
+@pytest.fixture
+def kb(kbmod, tmp_path):
+    from langchain.agents import AgentType, initialize_agent
+    from langchain_chroma import Chroma
+
+    from kb_store import KBStore
+
+    emb, chat = FakeEmbeddings(), FakeReActChatModel()
+    kbmod.emb = emb
+    kbmod.kb = Chroma(collection_name=f"test_kb_{next(_collections)}", embedding_function=emb)
+    kbmod.store = KBStore(str(tmp_path / "kb.sqlite"), vectorstore=kbmod.kb)
+    kbmod.llm = chat
+    kbmod.agent = initialize_agent(
+        tools=[kbmod.kb_get_by_id, kbmod.kb_get_by_ids, kbmod.kb_lookup, kbmod.llm_answer, kbmod.kb_upsert],
+        llm=chat,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=False,
+        handle_parsing_errors=True,
+    )
+    yield kbmod, emb
+    kbmod.flush_writes()
+    kbmod.store.close()
+
+
+def embeds(kbmod, emb, question, mode):
+    e0 = emb.calls
+    _, route = kbmod.answer(question, miss_mode=mode)
+    kbmod.flush_writes()  # the direct mode's upsert lands in the background
+    return emb.calls - e0, route
+
+
+@pytest.mark.parametrize("mode", ["direct", "agent"])
+def test_miss_then_hits_embed_the_question_at_most_once(kb, mode):
+    kbmod, emb = kb
+    question = "how do I rotate the staging database password"
+
+    assert embeds(kbmod, emb, question, mode) == (1, "llm" if mode == "direct" else "agent")
+    assert kbmod.store.get_exact(kbmod.norm(question)) is not None  # cached without another embedding
+
+    assert embeds(kbmod, emb, question + " please", mode) == (1, "kb")   # semantic hit
+    assert embeds(kbmod, emb, question, mode) == (0, "exact")           # exact hit
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from local_vectorstore import LocalVectorStore
+
+
+def test_empty_add_is_a_no_op():
+    emb = FakeEmbeddings()
+    store = LocalVectorStore(emb)
+    assert store.add_embeddings([], []) == []
+    assert store.add_texts([]) == []
+    assert emb.calls == 0 and store.ids() == []
+
+
+def test_unknown_filter_operator_raises():
+    store = LocalVectorStore(FakeEmbeddings())
+    store.add_texts(["a", "b"], metadatas=[{"page": 1}, {"page": 2}])
+    assert len(store.similarity_search("a", k=4, filter={"page": {"$in": [2]}})) == 1
+    with pytest.raises(ValueError, match=r"\$gt"):
+        store.similarity_search("a", k=4, filter={"page": {"$gt": 1}})
+
+
+def test_crash_between_renames_is_finished_on_load(tmp_path, monkeypatch):
+    store = LocalVectorStore(FakeEmbeddings(), persist_dir=str(tmp_path))
+    store.add_texts(["old"], ids=["1"])
+    store.save()
+    store.add_texts(["new", "newer"], ids=["1", "2"])
+
+    real_replace = os.replace
+
+    def crash_after_first(src, dst):
+        real_replace(src, dst)
+        raise KeyboardInterrupt  # the process dies between the two renames
+
+    monkeypatch.setattr(os, "replace", crash_after_first)
+    with pytest.raises(KeyboardInterrupt):
+        store.save()
+    monkeypatch.undo()
+
+    reopened = LocalVectorStore(FakeEmbeddings(), persist_dir=str(tmp_path))
+    assert sorted(reopened.ids()) == ["1", "2"]
+    assert [d.page_content for d in reopened.get_by_ids(["1", "2"])] == ["new", "newer"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["docs.jsonl", "vectors.npy"]
+
+
+def test_unfinished_save_keeps_the_previous_pair(tmp_path):
+    store = LocalVectorStore(FakeEmbeddings(), persist_dir=str(tmp_path))
+    store.add_texts(["old"], ids=["1"])
+    store.save()
+    (tmp_path / "docs.jsonl.tmp").write_text("partial")  # died before the commit marker
+
+    reopened = LocalVectorStore(FakeEmbeddings(), persist_dir=str(tmp_path))
+    assert reopened.ids() == ["1"]
+    assert not (tmp_path / "docs.jsonl.tmp").exists()
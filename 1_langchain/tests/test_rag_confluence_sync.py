@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("langchain_openai")
+
+import rag_confluence_example as rag
+from benchmarks.fakes import FakeConfluence, synthetic_pages
+from confluence_mirror import ConfluenceMirror
+
+
+@pytest.fixture
+def stale_mirror(tmp_path, monkeypatch):
+    pages, _ = synthetic_pages(10)
+    m = ConfluenceMirror(str(tmp_path / "mirror.sqlite"))
+    m.sync(FakeConfluence(pages), to_text=str)
+    index = object()
+    monkeypatch.setattr(rag, "mirror", lambda: m)
+    monkeypatch.setattr(rag, "chunk_index", lambda: index)
+    monkeypatch.setattr(rag, "MIRROR_SYNC_INTERVAL", 0)
+    monkeypatch.setattr(rag, "_index_reconciled", True)
+    monkeypatch.setattr(rag, "_sync_thread", None)
+    monkeypatch.setattr(rag, "_sync_started", None)
+    return index
+
+
+def test_stale_mirror_is_served_while_one_background_sync_runs(stale_mirror, monkeypatch):
+    release, calls = threading.Event(), []
+
+    def slow_sync(conf):
+        calls.append(conf)
+        release.wait(timeout=5)
+        return rag.SyncStats(), rag.IndexStats()
+
+    monkeypatch.setattr(rag, "sync_mirror", slow_sync)
+    assert rag.ready_index("conf") is stale_mirror  # returns while the sync is still blocked
+    assert rag.ready_index("conf") is stale_mirror
+    release.set()
+    rag._sync_thread.join(timeout=5)
+    assert calls == ["conf"]
+
+
+def test_failed_background_sync_is_not_retried_on_every_question(stale_mirror, monkeypatch):
+    calls = []
+
+    def failing_sync(conf):
+        calls.append(conf)
+        raise RuntimeError("Confluence down")
+
+    monkeypatch.setattr(rag, "sync_mirror", failing_sync)
+    rag.ready_index("conf")
+    rag._sync_thread.join(timeout=5)
+    rag.ready_index("conf")
+    assert calls == ["conf"]
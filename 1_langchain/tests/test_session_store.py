@@ -0,0 +1,34 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from session_store import BudgetedChatHistory
+
+
+def fill(history, turns=10):
+    for i in range(turns):
+        history.add_messages([HumanMessage(f"question {i} " + "word " * 20), AIMessage(f"answer {i} " + "word " * 20)])
+
+
+def test_summarizer_sees_turns_before_they_are_dropped():
+    seen = []
+
+    def summarize(summary, dropped):
+        seen.extend(dropped)
+        return "summary"
+
+    history = BudgetedChatHistory(token_budget=100, summarizer=summarize)
+    fill(history)
+    assert history.summary == "summary"
+    assert len(seen) + len(history.messages) - 1 == 20  # every message is either kept or summarized
+
+
+def test_failing_summarizer_falls_back_to_trimming():
+    def summarize(summary, dropped):
+        raise TimeoutError("LLM timed out")
+
+    history = BudgetedChatHistory(token_budget=100, summarizer=summarize)
+    fill(history)  # must not raise
+    plain = BudgetedChatHistory(token_budget=100)
+    fill(plain)
+    assert history.summary == ""
+    assert [m.content for m in history.messages] == [m.content for m in plain.messages]
+    assert history.tokens <= 100
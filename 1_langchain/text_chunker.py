@@ -0,0 +1,118 @@
+"""
+Offset-based chunker shared by rag_confluence_example and the TXT branch of doc_loader.
+
+`chunk_spans` returns (start, end) offsets into the source text; strings are sliced only
+when a caller needs them (`chunk_text`), so overlaps never copy text and an index can
+keep offsets next to its vectors. A chunk ends on the strongest boundary found in the
+second half of its window (blank line, then line break, sentence end, then space); the
+next one starts `overlap` earlier, moved forward to the next word.
+
+Size is counted in characters, or in tokens with `unit="tokens"` (tiktoken through
+token_count, whose encoder is cached per model), which keeps chunk token cost, and so
+embedding batch sizes, predictable:
+
+    spans = chunk_spans(text, size=900, overlap=120)                 # characters
+    spans = chunk_spans(text, size=200, overlap=40, unit="tokens")   # tokens
+    chunks = chunk_text(text, 900, 120)                              # the strings
+"""
+
+import re
+from typing import List, Tuple
+
+from token_count import DEFAULT_MODEL, count_tokens
+
+UNITS = ("chars", "tokens")
+
+# strongest first; a chunk ends right after the match
+_BOUNDARIES = (
+    re.compile(r"\n[ \t]*\n\s*"),
+    re.compile(r"\n"),
+    re.compile(r"[.!?;:](?=\s)"),
+    re.compile(r"\s"),
+)
+_SPACE = re.compile(r"\s")
+_NON_SPACE = re.compile(r"\S")
+_FIT_STEPS = 6  # token-window refinements per chunk
+
+
+def _snap_end(text: str, start: int, end: int) -> int:
+    """Last strong boundary in the second half of [start, end), else `end`."""
+    lo = start + (end - start) // 2
+    for pattern in _BOUNDARIES:
+        last = None
+        for last in pattern.finditer(text, lo, end):
+            pass
+        if last is not None and last.end() > start:
+            return last.end()
+    return end
+
+
+def _snap_start(text: str, pos: int, end: int) -> int:
+    """Move `pos` off a partial word and past whitespace (staying before `end`)."""
+    if pos > 0 and not text[pos - 1].isspace():
+        m = _SPACE.search(text, pos, end)
+        if m:
+            pos = m.end()
+    m = _NON_SPACE.search(text, pos, end)
+    return m.start() if m else pos
+
+
+def _token_window(text: str, start: int, size: int, model: str, ratio: float) -> Tuple[int, float]:
+    """End offset of the longest window from `start` that fits `size` tokens (approximately
+    maximal), and the characters-per-token seen, which seeds the next window."""
+    n = len(text)
+    end = min(n, start + max(1, int(size * ratio)))
+    best, best_tokens = start, 0
+    for _ in range(_FIT_STEPS):
+        tokens = count_tokens(text[start:end], model)
+        if tokens <= size:
+            best, best_tokens = end, tokens
+            if end == n or tokens >= size * 0.95:
+                break
+            end = min(n, start + int((end - start) * size / max(tokens, 1)))
+            if end <= best:
+                break
+        else:
+            end = start + max(1, int((end - start) * size / tokens * 0.97))
+            if end <= best:
+                break
+    if best == start:  # a single run longer than `size` tokens: cut it anyway
+        best, best_tokens = end, max(count_tokens(text[start:end], model), 1)
+    return best, (best - start) / max(best_tokens, 1)
+
+
+def chunk_spans(
+    text: str,
+    size: int,
+    overlap: int = 0,
+    unit: str = "chars",
+    model: str = DEFAULT_MODEL,
+    boundaries: bool = True,
+) -> List[Tuple[int, int]]:
+    """(start, end) offsets of overlapping chunks of at most `size` chars/tokens; blank chunks are skipped."""
+    if unit not in UNITS:
+        raise ValueError(f"unit must be one of {UNITS}, got {unit!r}")
+    if size <= 0 or not 0 <= overlap < size:
+        raise ValueError(f"need size > 0 and 0 <= overlap < size, got size={size}, overlap={overlap}")
+    spans: List[Tuple[int, int]] = []
+    n, ratio = len(text), 4.0
+    start = _snap_start(text, 0, n)
+    while start < n:
+        if unit == "tokens":
+            end, ratio = _token_window(text, start, size, model, ratio)
+            back = int(overlap * ratio)
+        else:
+            end, back = min(n, start + size), overlap
+        if boundaries and end < n:
+            end = _snap_end(text, start, end)
+        if _NON_SPACE.search(text, start, end):
+            spans.append((start, end))
+        if end >= n:
+            break
+        nxt = max(end - back, start + 1)
+        start = _snap_start(text, nxt, end) if boundaries else nxt
+    return spans
+
+
+def chunk_text(text: str, size: int, overlap: int = 0, unit: str = "chars", model: str = DEFAULT_MODEL) -> List[str]:
+    return [text[s:e] for s, e in chunk_spans(text, size, overlap, unit, model)]
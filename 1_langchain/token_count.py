@@ -0,0 +1,35 @@
+"""
+Fast token counting shared by the RAG demos.
+
+Uses tiktoken (installed with langchain-openai) with the encoder cached per model;
+falls back to the usual ~4 characters per token estimate if it is missing (or
+its encoding files can't be downloaded, e.g. offline benchmark runs).
+"""
+
+from functools import lru_cache
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # encoding files are downloaded on first use; offline → estimate
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return max(1, len(text) // 4)
+    return len(enc.encode(text, disallowed_special=()))
@@ -1,21 +1,22 @@
 import os
 import re
+import sys
 import json
+from pathlib import Path
 from typing import List, Dict, Any
-import PyPDF2
 from langchain.vectorstores import Chroma
 from langchain.docstore.document import Document
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.llms import Ollama
 
+# shared page-text cache (1_langchain/pdf_text_cache.py): unchanged PDFs are not re-parsed
+sys.path.insert(0, str(Path(__file__).resolve().parents[5] / "1_langchain"))
+from pdf_text_cache import pdf_pages  # noqa: E402
+
 
 # PDF Parsing
 def parse_section_from_pdf(path: str) -> Dict[str, List[str]]:
-    text = ""
-    with open(path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for p in reader.pages:
-            text += "\n " + (p.extract_text() or " ")
+    text = "".join("\n " + (page or " ") for page in pdf_pages(path, extractor="pypdf2"))
     
     sections = {"ticket": [], "refund": [], "tourism": [], "packages": []}
     current = None